@@ -0,0 +1,127 @@
+"""
+Dead reckoning of the whole fleet: per-aircraft Python loop vs utils/dead_reckoning.predict.
+
+Também confere a cota de erro: aeronaves sintéticas em curva padrão
+(3°/s) são simuladas a partir do snapshot e a posição verdadeira precisa
+ficar dentro de ``error_m`` em todos os horizontes.
+
+Uso:
+    python app/benchmarks/bench_dead_reckoning.py [--aircraft 10000] [--horizons 1 5 10 30 60]
+        [--payload states.json]
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from payloads import add_lambda_to_path, load_payload, synthetic_states
+
+add_lambda_to_path("lambda_flights_raw")
+
+from utils.columnar import StateBatch  # noqa: E402
+from utils.dead_reckoning import (  # noqa: E402
+    EARTH_RADIUS_M,
+    ErrorModel,
+    KinematicSnapshot,
+    haversine_m,
+    predict,
+)
+
+
+def best_of(repeat: int, func) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def predict_loop(batch: StateBatch, target_time: float):
+    """Previous approach: one great-circle step per aircraft in Python."""
+    out = []
+    for i in range(len(batch)):
+        lat, lon = batch.latitude[i], batch.longitude[i]
+        velocity, heading = batch.velocity[i], batch.heading[i]
+        ts = batch.time_position[i] or batch.last_contact[i]
+        if lat != lat or velocity != velocity or heading != heading or not ts:
+            out.append((lat, lon))
+            continue
+        delta = velocity * max(target_time - ts, 0.0) / EARTH_RADIUS_M
+        phi1, lam1, theta = math.radians(lat), math.radians(lon), math.radians(heading)
+        phi2 = math.asin(math.sin(phi1) * math.cos(delta) + math.cos(phi1) * math.sin(delta) * math.cos(theta))
+        lam2 = lam1 + math.atan2(
+            math.sin(theta) * math.sin(delta) * math.cos(phi1),
+            math.cos(delta) - math.sin(phi1) * math.sin(phi2),
+        )
+        out.append((math.degrees(phi2), (math.degrees(lam2) + 540.0) % 360.0 - 180.0))
+    return out
+
+
+def turning_truth(snapshot: KinematicSnapshot, target_time: float, turn_deg_s: np.ndarray, step_s: float = 0.5):
+    """True positions of aircraft turning at ``turn_deg_s`` (small-step integration)."""
+    from utils.dead_reckoning import destination
+
+    lat, lon = snapshot.latitude.copy(), snapshot.longitude.copy()
+    heading = snapshot.heading.copy()
+    elapsed = np.maximum(target_time - snapshot.time, 0.0)
+    t = 0.0
+    while np.any(t < elapsed):
+        step = np.clip(elapsed - t, 0.0, step_s)
+        lat, lon = destination(lat, lon, heading + turn_deg_s * step / 2, snapshot.velocity * step)
+        heading = heading + turn_deg_s * step
+        t += step_s
+    return lat, lon
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--aircraft", type=int, default=10_000)
+    parser.add_argument("--payload", help="recorded /states/all JSON")
+    parser.add_argument("--horizons", type=float, nargs="+", default=[1, 5, 10, 30, 60])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    now = int(time.time())
+    rows = load_payload(args.payload, args.aircraft)["states"] if args.payload else synthetic_states(args.aircraft, now=now)["states"]
+    batch = StateBatch.from_api_response(rows)
+    snapshot = KinematicSnapshot.from_batch(batch)
+    print(f"{len(batch):,} aircraft")
+
+    target = now + 5.0
+    loop = predict_loop(batch, target)
+    fast = predict(snapshot, target)
+    expected_lat = np.array([p[0] for p in loop])
+    expected_lon = np.array([p[1] for p in loop])
+    mismatch = np.nanmax(haversine_m(expected_lat, expected_lon, fast.latitude, fast.longitude))
+    assert mismatch < 1e-3, f"vectorized prediction differs by {mismatch} m"
+
+    loop_s = best_of(args.repeat, lambda: predict_loop(batch, target))
+    snapshot_s = best_of(args.repeat, lambda: KinematicSnapshot.from_batch(batch))
+    predict_s = best_of(args.repeat, lambda: predict(snapshot, target))
+    print(f"python loop     {loop_s * 1000:8.2f} ms")
+    print(f"from_batch      {snapshot_s * 1000:8.2f} ms")
+    print(f"predict         {predict_s * 1000:8.2f} ms  ({loop_s / predict_s:.0f}x, "
+          f"{1 / predict_s:,.0f} fleet refreshes/s)")
+
+    # Cota de erro contra aeronaves em curva (até a curva padrão do modelo)
+    model = ErrorModel()
+    rng = np.random.default_rng(3)
+    turn = rng.uniform(-model.turn_rate_deg_s, model.turn_rate_deg_s, len(snapshot))
+    print(f"{'horizon s':>10}{'p50 err m':>11}{'p99 err m':>11}{'p50 bound m':>13}{'outside':>9}")
+    for horizon in args.horizons:
+        target = now + horizon
+        prediction = predict(snapshot, target, model)
+        ok = prediction.valid & ~np.isnan(snapshot.velocity) & ~np.isnan(snapshot.heading)
+        true_lat, true_lon = turning_truth(snapshot, target, turn)
+        error = haversine_m(true_lat, true_lon, prediction.latitude, prediction.longitude)[ok]
+        bound = prediction.error_m[ok]
+        outside = int(np.sum(error > bound))
+        print(f"{horizon:>10g}{np.percentile(error, 50):>11.1f}{np.percentile(error, 99):>11.1f}"
+              f"{np.percentile(bound, 50):>13.1f}{outside:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Firehose transformation: per-record decode/enrich/encode (previous handler) vs FirehoseBatchTransformer.
+
+Monta um evento do Firehose com o tamanho de uma invocação real (3 MB e 6 MB
+de records por padrão) a partir de estados sintéticos ou gravados.
+
+Uso:
+    python app/benchmarks/bench_firehose_transform.py [--payload states.json] [--batch-mb 3 6] [--repeat 5]
+        [--boundaries countries.geojson] [--airports airports.csv]
+"""
+
+import argparse
+import base64
+import json
+import time
+from datetime import datetime, timezone
+
+from payloads import add_lambda_to_path, load_payload
+
+add_lambda_to_path("lambda_flights_enriched")
+
+from utils.airports import AirportEnricher  # noqa: E402
+from utils.geo import GeoEnricher  # noqa: E402
+from utils.transform import FirehoseBatchTransformer, available_backends  # noqa: E402
+
+FIELDS = (
+    "icao24", "callsign", "origin_country", "time_position", "last_contact", "longitude",
+    "latitude", "altitude", "on_ground", "velocity", "heading", "vertical_rate", "sensors",
+    "geo_altitude", "squawk", "spi", "position_source",
+)
+
+
+def state_dict(row: list) -> dict:
+    """Same shape as StateVector.to_dict() in the raw Lambda."""
+    state = dict(zip(FIELDS, row))
+    state["callsign"] = state["callsign"].strip() if state["callsign"] else None
+    for name in ("time_position", "last_contact"):
+        if state[name] is not None:
+            state[name] = datetime.fromtimestamp(state[name]).isoformat()
+    return state
+
+
+def firehose_event(rows: list, target_bytes: int) -> dict:
+    """Firehose records (one state each) until the event reaches ``target_bytes``."""
+    records = []
+    size = 0
+    i = 0
+    while size < target_bytes:
+        data = base64.b64encode(json.dumps(state_dict(rows[i % len(rows)])).encode("utf-8")).decode("ascii")
+        record = {"recordId": f"{i:020d}", "approximateArrivalTimestamp": 0, "data": data}
+        size += len(json.dumps(record))
+        records.append(record)
+        i += 1
+    return {"records": records}
+
+
+def per_record_transform(event: dict) -> list:
+    """Previous handler: b64/json/dict/json/b64 and datetime.now() for every record."""
+    output = []
+    for record in event["records"]:
+        rec_data = json.loads(base64.b64decode(record["data"]).decode("utf-8"))
+        if rec_data.get("latitude") is None or rec_data.get("longitude") is None:
+            output.append({"recordId": record["recordId"], "result": "Dropped"})
+            continue
+        enriched = {
+            "icao24": rec_data.get("icao24"),
+            "callsign": rec_data.get("callsign"),
+            "origin_country": rec_data.get("origin_country"),
+            "latitude": rec_data.get("latitude"),
+            "longitude": rec_data.get("longitude"),
+            "altitude": rec_data.get("altitude"),
+            "velocity": rec_data.get("velocity"),
+            "heading": rec_data.get("heading"),
+            "last_contact": rec_data.get("last_contact"),
+            "event_time": datetime.now(timezone.utc).isoformat(),
+            "location": f"{rec_data.get('latitude')},{rec_data.get('longitude')}",
+        }
+        output.append({
+            "recordId": record["recordId"],
+            "result": "Ok",
+            "data": base64.b64encode(json.dumps(enriched).encode("utf-8")).decode("utf-8"),
+        })
+    return output
+
+
+def best_of(repeat: int, func) -> float:
+    """Best wall time in ms over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def decoded(output: list) -> list:
+    """Output records with data decoded and event_time removed, for comparison."""
+    result = []
+    for record in output:
+        lines = []
+        if "data" in record:
+            for line in base64.b64decode(record["data"]).splitlines():
+                state = json.loads(line)
+                state.pop("event_time")
+                for name in GeoEnricher.FIELDS + AirportEnricher.FIELDS:
+                    state.pop(name, None)
+                lines.append(state)
+        result.append((record["recordId"], record["result"], lines))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payload", help="recorded /states/all JSON (default: synthetic)")
+    parser.add_argument("-n", type=int, default=10_000, help="synthetic state count")
+    parser.add_argument("--batch-mb", type=float, nargs="+", default=[3, 6])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--boundaries", help="countries GeoJSON for the overflown-country lookup")
+    parser.add_argument("--airports", help="OurAirports airports.csv for the nearest-airport lookup")
+    args = parser.parse_args()
+
+    rows = load_payload(args.payload, args.n)["states"]
+    start = time.perf_counter()
+    enrichers = (
+        GeoEnricher.from_env({"GEO_BOUNDARIES_PATH": args.boundaries or ""}),
+        AirportEnricher.from_env({"AIRPORTS_PATH": args.airports or ""}),
+    )
+    print(f"enrichment indexes built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    for batch_mb in args.batch_mb:
+        event = firehose_event(rows, int(batch_mb * 1024 * 1024))
+        records = len(event["records"])
+
+        reference = decoded(per_record_transform(event))
+        cases = {"per-record (previous handler)": lambda e=event: per_record_transform(e)}
+        for backend in available_backends():
+            transformer = FirehoseBatchTransformer(backend)
+            assert decoded(transformer.transform(event["records"])) == reference, backend
+            cases[f"FirehoseBatchTransformer[{backend}]"] = lambda t=transformer, e=event: t.transform(e["records"])
+            enriching = FirehoseBatchTransformer(backend, enrichers=enrichers)
+            assert decoded(enriching.transform(event["records"])) == reference, backend
+            cases[f"FirehoseBatchTransformer[{backend}] + enrichers"] = (
+                lambda t=enriching, e=event: t.transform(e["records"])
+            )
+
+        print(f"\n{batch_mb:g} MB event, {records} records, best of {args.repeat}")
+        print(f"{'path':<46}{'ms':>10}{'us/record':>12}")
+        for name, func in cases.items():
+            ms = best_of(args.repeat, func)
+            print(f"{name:<46}{ms:>10.1f}{1000 * ms / records:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Latest-position store: WCUs and correctness against the DynamoDB stand-in.
+
+Reproduz vários polls do /states/all (sintéticos) como records do Kinesis,
+com uma fração de aeronaves sem contato novo entre polls (mesmo
+last_contact) e records duplicados, e passa cada poll pelo consumidor
+(positions_function: transformer.collect + LatestPositionWriter.flush)
+contra o FakeDynamoDB, com UnprocessedItems e throttling simulados.
+
+Compara as WCUs (tabela + GSI) com a gravação cega de todo estado, confere
+que a tabela termina com o estado mais novo de cada aeronave, roda o modo
+``conditional`` com dois writers recebendo os polls fora de ordem e confere
+o ``query_bbox`` contra uma varredura da tabela.
+
+Uso:
+    python app/benchmarks/bench_latest_positions.py [--aircraft 10000] [--polls 6]
+        [--stale 0.3] [--duplicates 0.05] [--unprocessed 0.05] [--throttle 0.02]
+        [--latency-ms 5] [--min-interval 30] [--workers 8] [--conditional-workers 32]
+"""
+
+import argparse
+import base64
+import json
+import math
+import random
+import time
+from datetime import datetime, timezone
+
+from payloads import add_lambda_to_path, synthetic_states
+from stand_ins import FakeDynamoDB
+
+add_lambda_to_path("lambda_flights_enriched")
+
+from utils.positions import GEOHASH_INDEX, LatestPositionWriter, query_bbox  # noqa: E402
+from utils.transform import FirehoseBatchTransformer  # noqa: E402
+
+TABLE = "flights-latest-positions"
+POLL_INTERVAL_S = 10
+
+# Caixas de consulta (lat_min, lat_max, lon_min, lon_max); a última cruza o antimeridiano
+BOXES = ((45.0, 55.0, 0.0, 15.0), (-30.0, -20.0, -50.0, -40.0), (10.0, 30.0, 170.0, -170.0))
+
+
+def _iso(epoch):
+    return None if epoch is None else datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def polls(aircraft: int, count: int, stale: float, seed: int = 5) -> list:
+    """
+    State dicts (StateVector.to_dict layout) of each poll: the aircraft fly
+    along their heading between polls; ``stale`` of them repeat the previous state.
+    """
+    rng = random.Random(seed)
+    start = int(time.time()) - count * POLL_INTERVAL_S
+    rows = synthetic_states(aircraft, seed=seed, now=start)["states"]
+    previous = None
+    result = []
+    for k in range(count):
+        now = start + k * POLL_INTERVAL_S
+        states = []
+        for i, row in enumerate(rows):
+            if previous is not None and rng.random() < stale:
+                states.append(previous[i])
+                continue
+            if previous is not None and row[5] is not None:
+                # Deslocamento de um intervalo de poll na velocidade e rumo do estado
+                distance = row[9] * POLL_INTERVAL_S / 111_320.0
+                row[6] = max(-89.99, min(89.99, row[6] + distance * math.cos(math.radians(row[10]))))
+                row[5] = (row[5] + distance * math.sin(math.radians(row[10])) / max(0.01, math.cos(math.radians(row[6]))) + 180) % 360 - 180
+            states.append({
+                "icao24": row[0],
+                "callsign": row[1],
+                "origin_country": row[2],
+                "time_position": _iso(row[3] and now - (row[4] - row[3]) - rng.randint(0, 5)),
+                "last_contact": _iso(now - rng.randint(0, 5)),
+                "longitude": row[5],
+                "latitude": row[6],
+                "altitude": row[7],
+                "on_ground": row[8],
+                "velocity": row[9],
+                "heading": row[10],
+                "vertical_rate": row[11],
+            })
+        previous = states
+        result.append(states)
+    return result
+
+
+def kinesis_event(states: list, duplicates: float, rng: random.Random) -> dict:
+    """Event source mapping event with one record per state, plus re-delivered copies."""
+    records = []
+    for state in states:
+        data = base64.b64encode(json.dumps(state).encode("utf-8")).decode("ascii")
+        records.append({"kinesis": {"data": data}})
+        if rng.random() < duplicates:
+            records.append({"kinesis": {"data": data}})
+    return {"Records": records}
+
+
+def newest(all_polls: list) -> dict:
+    """icao24 -> last_contact (epoch) of the newest positioned state."""
+    latest = {}
+    for states in all_polls:
+        for state in states:
+            if state["latitude"] is None or state["longitude"] is None:
+                continue
+            t = datetime.fromisoformat(state["last_contact"]).timestamp()
+            if t > latest.get(state["icao24"], -math.inf):
+                latest[state["icao24"]] = t
+    return latest
+
+
+def check_table(dynamodb: FakeDynamoDB, expected: dict) -> None:
+    table = dynamodb.tables.get(TABLE, {})
+    assert set(table) == set(expected), f"{len(table)} items, expected {len(expected)}"
+    stale = [key for key, item in table.items() if int(item["last_contact"]["N"]) != int(expected[key])]
+    assert not stale, f"{len(stale)} items are not the newest state, e.g. {stale[:3]}"
+
+
+def run(all_polls, events, dynamodb, transformer_for, **writer_args):
+    writer = LatestPositionWriter(TABLE, client=dynamodb, sleep=lambda s: None, **writer_args)
+    transformer = transformer_for(writer)
+    totals = {"written": 0, "skipped": 0, "deduplicated": 0, "conditional": 0, "failed": 0, "requests": 0, "retries": 0,
+              "redelivered": 0}
+    flush_ms = []
+    for event in events:
+        records = [{"data": record["kinesis"]["data"]} for record in event["Records"]]
+        transformer.collect(records)
+        report = writer.flush()
+        for _ in range(3):
+            if report.ok:
+                break
+            # Como o handler: falha o lote e o event source mapping reenvia os records
+            totals["redelivered"] += 1
+            transformer.collect(records)
+            report = writer.flush()
+        flush_ms.append(report.elapsed_ms)
+        totals["written"] += report.written
+        totals["skipped"] += report.skipped
+        totals["deduplicated"] += report.deduplicated
+        totals["conditional"] += report.conditional_skipped
+        totals["failed"] += report.failed
+        totals["requests"] += report.requests
+        totals["retries"] += report.retries
+    return totals, flush_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aircraft", type=int, default=10_000)
+    parser.add_argument("--polls", type=int, default=6)
+    parser.add_argument("--stale", type=float, default=0.3, help="fraction of aircraft without a new contact per poll")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="fraction of records delivered twice")
+    parser.add_argument("--unprocessed", type=float, default=0.05, help="fraction of items left unprocessed")
+    parser.add_argument("--throttle", type=float, default=0.02, help="fraction of calls throttled")
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    parser.add_argument("--min-interval", type=float, default=30.0, help="seconds between writes of one aircraft")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--conditional-workers", type=int, default=32, help="PutItem is one call per item")
+    args = parser.parse_args()
+
+    all_polls = polls(args.aircraft, args.polls, args.stale)
+    rng = random.Random(11)
+    events = [kinesis_event(states, args.duplicates, rng) for states in all_polls]
+    expected = newest(all_polls)
+    total_records = sum(len(event["Records"]) for event in events)
+    print(f"{args.polls} polls of {args.aircraft} aircraft, {total_records} records "
+          f"({args.stale:.0%} stale, {args.duplicates:.0%} duplicated)")
+
+    def stand_in():
+        return FakeDynamoDB(
+            indexes={GEOHASH_INDEX: ("geohash_cell", "KEYS_ONLY")},
+            unprocessed_rate=args.unprocessed,
+            throttle_rate=args.throttle,
+            latency_s=args.latency_ms / 1000,
+        )
+
+    def transformer_for(writer):
+        return FirehoseBatchTransformer("json", sinks=[writer])
+
+    # Gravação cega: cada estado com posição vira um PutItem
+    blind = FakeDynamoDB(indexes={GEOHASH_INDEX: ("geohash_cell", "KEYS_ONLY")})
+    blind_all = FakeDynamoDB(indexes={GEOHASH_INDEX: ("geohash_cell", "ALL")})
+    item_writer = LatestPositionWriter(TABLE)
+    positioned = 0
+    for event in events:
+        for record in event["Records"]:
+            state = json.loads(base64.b64decode(record["kinesis"]["data"]))
+            if state["latitude"] is None or state["longitude"] is None:
+                continue
+            positioned += 1
+            t = datetime.fromisoformat(state["last_contact"]).timestamp()
+            item = item_writer._item(state["icao24"], t, tuple(state.get(name) for name in item_writer.attributes))
+            blind.put_item(TableName=TABLE, Item=item)
+            blind_all.put_item(TableName=TABLE, Item=item)
+    blind_wcu = blind.wcu + blind.gsi_wcu
+    print(f"  blind writes     {positioned:>8} items {blind_wcu:>8} WCU (table {blind.wcu}, GSI {blind.gsi_wcu}; "
+          f"{blind_all.gsi_wcu} with an ALL-projection GSI)")
+
+    for label, min_interval in (("batch", 0.0), (f"batch, {args.min_interval:g}s", args.min_interval)):
+        dynamodb = stand_in()
+        totals, flush_ms = run(all_polls, events, dynamodb, transformer_for,
+                               max_workers=args.workers, min_interval_s=min_interval)
+        wcu = dynamodb.wcu + dynamodb.gsi_wcu
+        print(f"  {label:<16} {totals['written']:>8} items {wcu:>8} WCU (table {dynamodb.wcu}, GSI {dynamodb.gsi_wcu})"
+              f"  {blind_wcu / max(wcu, 1):.1f}x fewer")
+        print(f"    {totals['deduplicated']} duplicates, {totals['skipped']} not newer/too recent, "
+              f"{totals['failed']} failed, {totals['requests']} requests ({totals['retries']} retries, "
+              f"{totals['redelivered']} batches redelivered), "
+              f"flush p50 {sorted(flush_ms)[len(flush_ms) // 2]:.0f} ms, max {max(flush_ms):.0f} ms")
+        assert totals["failed"] == 0, "positions left unwritten after the retries"
+        if not min_interval:
+            check_table(dynamodb, expected)
+            print("    table holds the newest state of every aircraft")
+
+    # Dois containers com o mesmo conjunto de aeronaves, polls em ordens diferentes
+    dynamodb = stand_in()
+    order = list(range(len(events)))
+    shuffled = order[:]
+    random.Random(2).shuffle(shuffled)
+    for label, sequence in (("conditional A", order), ("conditional B", shuffled)):
+        totals, flush_ms = run(all_polls, [events[i] for i in sequence], dynamodb, transformer_for,
+                               mode="conditional", max_workers=args.conditional_workers)
+        print(f"  {label:<16} {totals['written']:>8} items, {totals['conditional']} rejected by the condition, "
+              f"{totals['retries']} retries, flush p50 {sorted(flush_ms)[len(flush_ms) // 2]:.0f} ms")
+        assert totals["failed"] == 0, "positions left unwritten after the retries"
+    check_table(dynamodb, expected)
+    print(f"    table holds the newest state of every aircraft ({dynamodb.wcu + dynamodb.gsi_wcu} WCU for both)")
+
+    table = dynamodb.tables[TABLE]
+    dynamodb.throttle_rate = 0.0
+    for lat_min, lat_max, lon_min, lon_max in BOXES:
+        found = query_bbox(dynamodb, TABLE, lat_min, lat_max, lon_min, lon_max)
+        expected_ids = set()
+        for key, item in table.items():
+            lat, lon = float(item["latitude"]["N"]), float(item["longitude"]["N"])
+            inside_lon = lon_min <= lon <= lon_max if lon_min <= lon_max else (lon >= lon_min or lon <= lon_max)
+            if lat_min <= lat <= lat_max and inside_lon:
+                expected_ids.add(key)
+        assert {row["id"] for row in found} == expected_ids, "bounding-box query mismatch"
+        print(f"  bbox {lat_min:g},{lon_min:g} .. {lat_max:g},{lon_max:g}: {len(found)} aircraft")
+    print(f"    {dynamodb.rcu:.1f} RCU for the {len(BOXES)} queries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Per-object memory footprint of the regular vs compact model classes.
+
+Uso:
+    python app/benchmarks/bench_models_memory.py [--payload states.json] [-n 10000]
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from datetime import datetime
+
+from payloads import add_lambda_to_path, load_payload
+
+add_lambda_to_path("lambda_flights_raw")
+
+from utils.columnar import StateBatch  # noqa: E402
+from utils.models import (  # noqa: E402
+    StateVector,
+    CompactStateVector,
+    FlightTrackPoint,
+    CompactFlightTrackPoint,
+)
+
+
+def measure(build, text: str) -> tuple[int, int]:
+    """
+    Return (bytes retained, object count) for the objects ``build`` creates
+    from a freshly decoded payload. The decoded rows are discarded, so only
+    what the objects themselves keep alive (strings, floats, datetimes) counts.
+
+    A first, untraced build stands for the previous poll still held by a
+    warm container, so the interned-string table is already populated.
+    """
+    previous = build(json.loads(text)["states"])
+    gc.collect()
+    tracemalloc.start()
+    objects = build(json.loads(text)["states"])
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(objects)
+    del objects, previous
+    return current, count
+
+
+def _track_point(row):
+    return FlightTrackPoint(
+        timestamp=datetime.fromtimestamp(row[4]),
+        latitude=row[6], longitude=row[5], altitude=row[7], heading=row[10], on_ground=row[8],
+    )
+
+
+def _compact_track_point(row):
+    return CompactFlightTrackPoint(
+        timestamp=row[4], latitude=row[6], longitude=row[5], altitude=row[7], heading=row[10], on_ground=row[8],
+    )
+
+
+CASES = {
+    "StateVector": lambda rows: [StateVector.from_api_response(r) for r in rows],
+    "CompactStateVector": lambda rows: [CompactStateVector.from_api_response(r) for r in rows],
+    "StateBatch (columnar)": lambda rows: [StateBatch.from_api_response(rows)] * len(rows),
+    "FlightTrackPoint": lambda rows: [_track_point(r) for r in rows if r[5] is not None],
+    "CompactFlightTrackPoint": lambda rows: [_compact_track_point(r) for r in rows if r[5] is not None],
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payload", help="recorded /states/all JSON (default: synthetic)")
+    parser.add_argument("-n", type=int, default=10_000, help="synthetic state count")
+    args = parser.parse_args()
+
+    text = json.dumps(load_payload(args.payload, args.n))
+
+    results = {}
+    print(f"{'model':<26}{'objects':>10}{'total KiB':>12}{'bytes/obj':>12}")
+    for name, build in CASES.items():
+        total, count = measure(build, text)
+        results[name] = total / count if count else 0.0
+        print(f"{name:<26}{count:>10}{total / 1024:>12.1f}{results[name]:>12.1f}")
+
+    for name in ("StateVector", "FlightTrackPoint"):
+        saved = 1 - results[f"Compact{name}"] / results[name]
+        print(f"{name}: compact form uses {100 * saved:.0f}% less memory per object")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Parquet output: size and cost versus the JSON delivered by Firehose.
+
+Transforma um evento do Firehose (estados sintéticos ou gravados) com o
+ParquetPartitionWriter como sink, compara o tamanho dos arquivos Parquet
+(zstd e snappy) com o JSON da saída (cru e gzip) e roda a compactação local
+sobre um dump JSON. Confere que as linhas relidas por partição batem com as
+enviadas e que as colunas de texto repetitivo saíram com dicionário.
+
+Uso:
+    python app/benchmarks/bench_parquet.py [--payload states.json] [--batch-mb 3] [--repeat 3]
+"""
+
+import argparse
+import base64
+import gzip
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from payloads import add_lambda_to_path, load_payload
+
+add_lambda_to_path("lambda_flights_enriched")
+
+import pyarrow.dataset as ds  # noqa: E402
+import pyarrow.parquet as pq  # noqa: E402
+
+from bench_firehose_transform import firehose_event  # noqa: E402
+from compact_parquet import compact  # noqa: E402
+from utils.airports import AirportEnricher  # noqa: E402
+from utils.geo import GeoEnricher  # noqa: E402
+from utils.parquet_writer import ParquetPartitionWriter  # noqa: E402
+from utils.transform import FirehoseBatchTransformer  # noqa: E402
+
+
+def best_of(repeat: int, func):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def tree_bytes(root: str) -> int:
+    return sum(p.stat().st_size for p in Path(root).rglob("*.parquet"))
+
+
+def check_output(root: str, expected_rows: int) -> None:
+    dataset = ds.dataset(root, format="parquet", partitioning="hive")
+    rows = dataset.count_rows()
+    assert rows == expected_rows, f"read back {rows} rows, expected {expected_rows}"
+    sample = next(Path(root).rglob("*.parquet"))
+    column = pq.ParquetFile(sample).metadata.row_group(0).column(0)
+    assert column.path_in_schema == "icao24"
+    assert any("DICTIONARY" in encoding for encoding in column.encodings), column.encodings
+    partitions = {p.parent.relative_to(root).as_posix() for p in Path(root).rglob("*.parquet")}
+    print(f"    read back {rows} rows from {len(partitions)} partitions, e.g. {sorted(partitions)[0]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payload")
+    parser.add_argument("--batch-mb", type=float, default=3.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = load_payload(args.payload)["states"]
+    event = firehose_event(rows, int(args.batch_mb * 1024 * 1024))
+    enrichers = (GeoEnricher.from_env(), AirportEnricher.from_env())
+
+    plain = FirehoseBatchTransformer("json", enrichers=enrichers)
+    t_plain, output = best_of(args.repeat, lambda: plain.transform(event["records"]))
+    lines = b"\n".join(base64.b64decode(r["data"]) for r in output if r["result"] == "Ok") + b"\n"
+    kept = lines.count(b"\n")
+    print(f"{len(event['records'])} records, {kept} enriched states")
+    print(f"  JSON output          {len(lines) / 1e6:8.2f} MB   gzip {len(gzip.compress(lines)) / 1e6:8.2f} MB")
+    print(f"  transform (JSON)     {t_plain * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for compression in ("zstd", "snappy"):
+            root = os.path.join(tmp, f"sink-{compression}")
+
+            def run():
+                writer = ParquetPartitionWriter(root, compression=compression)
+                transformer = FirehoseBatchTransformer("json", enrichers=enrichers, sinks=[writer])
+                transformer.transform(event["records"])
+                return writer.flush()
+
+            # Cada repetição grava arquivos novos: mede o tamanho só da primeira
+            run()
+            size = tree_bytes(root)
+            check_output(root, kept)
+            t_sink, _ = best_of(args.repeat, run)
+            print(f"  Parquet {compression:<6}       {size / 1e6:8.2f} MB   "
+                  f"({len(lines) / size:.1f}x smaller than JSON)")
+            print(f"  transform + Parquet  {t_sink * 1000:8.1f} ms   "
+                  f"(+{(t_sink - t_plain) * 1000:.1f} ms)")
+
+        dump = Path(tmp, "dump", "flights-1")
+        dump.parent.mkdir()
+        # Objetos concatenados, como o Firehose grava sem delimitador
+        dump.write_bytes(lines.replace(b"\n", b""))
+        root = os.path.join(tmp, "compacted")
+        writer = ParquetPartitionWriter(root)
+        start = time.perf_counter()
+        total = compact([str(dump.parent)], writer)
+        elapsed = time.perf_counter() - start
+        print(f"  compaction           {elapsed * 1000:8.1f} ms   "
+              f"({total / elapsed:,.0f} records/s, {writer.files_written} files)")
+        check_output(root, kept)
+
+
+if __name__ == "__main__":
+    main()
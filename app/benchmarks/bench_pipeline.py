@@ -0,0 +1,205 @@
+"""
+Replay of the whole pipeline, offline: OpenSky -> lambda_flights_raw -> Kinesis -> Firehose -> lambda_flights_enriched.
+
+Cada poll passa pelas mesmas funções da Lambda de ingestão
+(get_opensky_states -> convert_states_response_to_json -> send_states_to_kinesis)
+e os records aceitos pelo Kinesis viram eventos do Firehose para o
+lambda_handler da Lambda de enriquecimento. OpenSky, Secrets Manager, Kinesis e
+Firehose são substituídos pelos stand-ins de stand_ins.py; o resto é o código
+de produção. Cada tamanho de frota roda num processo separado, para que o pico
+de RSS seja o daquele tamanho.
+
+Uso:
+    python app/benchmarks/bench_pipeline.py [--aircraft 1000 10000 100000] [--polls 5]
+        [--payload states.json] [--env KINESIS_AGGREGATION=kpl --env DELTA_MODE=memory]
+        [--kinesis-failure-rate 0.01] [--json results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from payloads import load_payload, synthetic_states
+from stand_ins import FakeFirehose, FakeKinesis, FakeOpenSkySession, FakeSecretsManager, LambdaModule
+
+STAGES = ("fetch", "convert", "send", "enrich", "total")
+STREAM_NAME = "replay-flights"
+
+# Ambiente mínimo para importar as Lambdas fora da AWS (boto3 precisa de região)
+REPLAY_ENV = {
+    "AWS_DEFAULT_REGION": "us-east-1",
+    "KINESIS_STREAM": STREAM_NAME,
+    "CLIENT_INIT": "lazy",  # os clients são trocados pelos stand-ins
+    "OPENSKY_SECRET_ARN": "arn:aws:secretsmanager:us-east-1:000000000000:secret:replay",
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss em KB no Linux (bytes no macOS)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_replay(args) -> Dict:
+    """Run ``args.polls`` polls of one fleet size in this process."""
+    for key, value in REPLAY_ENV.items():
+        os.environ.setdefault(key, value)
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+
+    raw = LambdaModule("lambda_flights_raw")
+    enriched = LambdaModule("lambda_flights_enriched")
+    logging.getLogger().setLevel(args.log_level)
+
+    payload = load_payload(args.payload, args.aircraft) if args.payload else synthetic_states(args.aircraft)
+    body = json.dumps(payload).encode("utf-8")
+    kinesis = FakeKinesis(
+        shard_count=args.shards,
+        failure_rate=args.kinesis_failure_rate,
+        latency_s=args.kinesis_latency_ms / 1000,
+    )
+    firehose = FakeFirehose(int(args.firehose_buffer_mb * 1024 * 1024))
+    raw.module.http_session = FakeOpenSkySession(body, latency_s=args.opensky_latency_ms / 1000)
+    raw.module.secrets_client = FakeSecretsManager()
+    raw.module.kinesis_client = kinesis
+
+    timings: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+    counts = {"states": 0, "kinesis_records": 0, "firehose_records": 0, "invocations": 0, "enriched_ok": 0}
+    for _ in range(args.polls):
+        start = time.perf_counter()
+        with raw:
+            token = raw.module.get_opensky_access_token()
+            t0 = time.perf_counter()
+            states = raw.module.get_opensky_states(token)
+            t1 = time.perf_counter()
+            json_resultado = raw.module.convert_states_response_to_json(states)
+            t2 = time.perf_counter()
+            ok = raw.module.send_states_to_kinesis(json_resultado)
+            t3 = time.perf_counter()
+            # Fim da "invocação" da ingestão: emite as métricas EMF (METRICS_ENABLED)
+            raw.module.metrics.flush()
+        if not ok:
+            print("warning: send_states_to_kinesis reported failures", file=sys.stderr)
+
+        records = kinesis.drain(STREAM_NAME)
+        kinesis.streams.clear()  # outros streams (ex.: TRACKS_STREAM) não seguem para o Firehose
+        with enriched:
+            t4 = time.perf_counter()
+            for event in firehose.events(records):
+                result = enriched.module.lambda_handler(event, None) or {"records": []}
+                counts["invocations"] += 1
+                counts["firehose_records"] += len(event["records"])
+                counts["enriched_ok"] += sum(1 for r in result["records"] if r["result"] == "Ok")
+            t5 = time.perf_counter()
+
+        counts["states"] += len(states)
+        counts["kinesis_records"] += len(records)
+        timings["fetch"].append(t1 - t0)
+        timings["convert"].append(t2 - t1)
+        timings["send"].append(t3 - t2)
+        timings["enrich"].append(t5 - t4)
+        timings["total"].append(t5 - start)
+
+    stages = {}
+    for stage, values in timings.items():
+        total = sum(values)
+        stages[stage] = {
+            "records_per_s": counts["states"] / total if total else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    return {
+        "aircraft": args.aircraft,
+        "polls": args.polls,
+        "payload_bytes": len(body),
+        "counts": counts,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_result(result: Dict) -> None:
+    counts = result["counts"]
+    print(
+        f"\n{result['aircraft']:,} aircraft x {result['polls']} polls "
+        f"({result['payload_bytes'] / 1e6:.1f} MB payload): {counts['kinesis_records']:,} Kinesis records, "
+        f"{counts['invocations']} enrichment invocations, peak RSS {result['peak_rss_mb']:.0f} MB"
+    )
+    print(f"{'stage':<10}{'records/s':>14}{'p50 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        s = result["stages"][stage]
+        print(f"{stage:<10}{s['records_per_s']:>14,.0f}{s['p50_ms']:>10.1f}{s['p99_ms']:>10.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--aircraft", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--polls", type=int, default=5)
+    parser.add_argument("--payload", help="recorded /states/all JSON (replaces the synthetic fleet)")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Lambda environment variable (repeatable)")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--kinesis-failure-rate", type=float, default=0.0)
+    parser.add_argument("--kinesis-latency-ms", type=float, default=0.0)
+    parser.add_argument("--opensky-latency-ms", type=float, default=0.0)
+    parser.add_argument("--firehose-buffer-mb", type=float, default=3.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        args.aircraft = args.aircraft[0]
+        json.dump(run_replay(args), sys.stdout)
+        return
+
+    # Um processo por tamanho de frota: RSS de pico isolado e Lambdas "frias"
+    results = []
+    for aircraft in args.aircraft:
+        command = [sys.executable, os.path.abspath(__file__), *_without_option(sys.argv[1:], "--aircraft", "--json"),
+                   "--aircraft", str(aircraft), "--single"]
+        completed = subprocess.run(command, capture_output=True, text=True, check=False)
+        if completed.returncode != 0:
+            sys.stderr.write(completed.stderr)
+            raise SystemExit(f"replay of {aircraft} aircraft failed")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        results.append(result)
+        print_result(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+def _without_option(argv: List[str], *names: str) -> List[str]:
+    """argv without the given options and their values."""
+    out = []
+    skipping = False
+    for item in argv:
+        if item in names:
+            skipping = True
+            continue
+        if skipping and not item.startswith("--"):
+            continue
+        skipping = False
+        out.append(item)
+    return out
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Kinesis ``Data`` serialization: StateVector.to_dict() + json.dumps vs StateSerializer.
+
+Uso:
+    python app/benchmarks/bench_serializer.py [--payload states.json] [-n 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import time
+
+from payloads import add_lambda_to_path, load_payload
+
+add_lambda_to_path("lambda_flights_raw")
+
+from utils.columnar import StateBatch  # noqa: E402
+from utils.models import StateVector  # noqa: E402
+from utils.serializer import StateSerializer, available_backends  # noqa: E402
+
+
+def best_of(repeat: int, func) -> float:
+    """Best wall time in ms over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--payload", help="recorded /states/all JSON (default: synthetic)")
+    parser.add_argument("-n", type=int, default=10_000, help="synthetic state count")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = load_payload(args.payload, args.n)["states"]
+    vectors = [StateVector.from_api_response(r) for r in rows]
+    batch = StateBatch.from_api_response(rows)
+
+    # Conteúdo precisa ser idêntico ao caminho atual
+    reference = [json.loads(json.dumps(v.to_dict())) for v in vectors]
+    for backend in available_backends():
+        encoded = StateSerializer(backend).encode_batch(batch)
+        assert [json.loads(b) for b in encoded] == reference, backend
+
+    cases = {
+        "to_dict + json.dumps (current)": lambda: [json.dumps(v.to_dict()) for v in vectors],
+        "decode + to_dict + json.dumps": lambda: [
+            json.dumps(StateVector.from_api_response(r).to_dict()) for r in rows
+        ],
+    }
+    for backend in available_backends():
+        serializer = StateSerializer(backend)
+        cases[f"StateSerializer[{backend}].encode_batch"] = lambda s=serializer: s.encode_batch(batch)
+        cases[f"decode + StateSerializer[{backend}]"] = lambda s=serializer: s.encode_batch(
+            StateBatch.from_api_response(rows)
+        )
+
+    print(f"{len(rows)} states, best of {args.repeat}")
+    print(f"{'path':<44}{'ms':>10}{'us/record':>12}")
+    for name, func in cases.items():
+        ms = best_of(args.repeat, func)
+        print(f"{name:<44}{ms:>10.1f}{1000 * ms / len(rows):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Density tiles: cost per snapshot and bytes versus shipping raw points.
+
+Gera um snapshot sintético (com tráfego concentrado nos hubs, como o
+simulate_shard_load.py), move as aeronaves ao longo do rumo a cada poll e
+passa cada snapshot pelo DensityTiler (utils/tiles.py) da Lambda de
+ingestão. Mede o tempo de update + drain por snapshot, quantos tiles mudam
+e os bytes enviados (JSON e binário) contra o JSON de pontos que o front-end
+baixa hoje.
+
+Um "cliente" aplica só os tiles alterados de cada poll; ao final de cada
+poll o estado dele tem que bater com um tiler novo construído do zero sobre
+o mesmo snapshot, e o total de aeronaves de cada zoom com as posições.
+
+Uso:
+    python app/benchmarks/bench_tiles.py [--aircraft 10000] [--polls 10] [--zooms 2 4 6]
+        [--bins 32] [--stale 0.2] [--hotspots 0.7]
+"""
+
+import argparse
+import json
+import math
+import random
+import time
+
+from payloads import add_lambda_to_path, synthetic_states
+
+add_lambda_to_path("lambda_flights_raw")
+
+from simulate_shard_load import concentrate  # noqa: E402
+from utils.columnar import StateBatch  # noqa: E402
+from utils.tiles import DensityTile, DensityTiler, encode_tiles  # noqa: E402
+
+POLL_INTERVAL_S = 10
+
+
+def advance(rows: list, rng: random.Random, stale: float) -> list:
+    """Next poll: aircraft fly along their heading; ``stale`` of them are not in the snapshot."""
+    snapshot = []
+    for row in rows:
+        if row[5] is not None:
+            distance = row[9] * POLL_INTERVAL_S / 111_320.0
+            row[6] = max(-89.99, min(89.99, row[6] + distance * math.cos(math.radians(row[10]))))
+            row[5] = (row[5] + distance * math.sin(math.radians(row[10]))
+                      / max(0.01, math.cos(math.radians(row[6]))) + 180) % 360 - 180
+        if rng.random() >= stale:
+            snapshot.append(list(row))
+    return snapshot
+
+
+def tile_state(tiles, state=None) -> dict:
+    """``z/x/y`` -> {(cell, band): count}, applying ``tiles`` over ``state``."""
+    state = {} if state is None else state
+    for tile in tiles:
+        cells = {
+            (int(cell), band): int(count)
+            for cell, row in zip(tile.cells, tile.counts)
+            for band, count in enumerate(row) if count
+        }
+        if cells:
+            state[tile.key] = cells
+        else:
+            state.pop(tile.key, None)
+    return state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--aircraft", type=int, default=10_000)
+    parser.add_argument("--polls", type=int, default=10)
+    parser.add_argument("--zooms", type=int, nargs="+", default=[2, 4, 6])
+    parser.add_argument("--bins", type=int, default=32)
+    parser.add_argument("--stale", type=float, default=0.2, help="fraction of aircraft missing from each poll")
+    parser.add_argument("--hotspots", type=float, default=0.7)
+    parser.add_argument("--max-age", type=float, default=60.0)
+    args = parser.parse_args()
+
+    start = int(time.time())
+    rows = synthetic_states(args.aircraft, now=start)["states"]
+    if args.hotspots:
+        concentrate(rows, args.hotspots)
+    rng = random.Random(9)
+    tiler = DensityTiler(args.zooms, bins=args.bins, max_age_s=args.max_age)
+    client: dict = {}
+    reported: dict = {}
+    timings, changed_tiles, json_bytes, binary_bytes, points_bytes = [], [], [], [], []
+
+    for k in range(args.polls):
+        now = start + k * POLL_INTERVAL_S
+        snapshot = advance(rows, rng, args.stale) if k else [list(row) for row in rows]
+        batch = StateBatch.from_api_response(snapshot)
+
+        t0 = time.perf_counter()
+        tiler.update(batch, now)
+        tiler.expire(now)
+        tiles = tiler.drain()
+        timings.append((time.perf_counter() - t0) * 1000)
+        changed_tiles.append(len(tiles))
+        json_bytes.append(sum(len(data) for _, data in encode_tiles(tiles, "json")))
+        binary_bytes.append(sum(len(data) for _, data in encode_tiles(tiles, "binary")))
+        # O que o front-end baixa hoje: todos os pontos com posição e altitude
+        points_bytes.append(len(json.dumps([
+            [row[0], row[6], row[5], row[7]] for row in rows if row[5] is not None
+        ], separators=(",", ":"))))
+
+        for tile in tiles:
+            decoded = DensityTile.from_bytes(tile.to_bytes())
+            assert decoded.key == tile.key and (decoded.counts == tile.counts).all()
+        client = tile_state(tiles, client)
+
+        # Referência: tiler novo sobre a última posição das aeronaves vistas há até max_age
+        for row in snapshot:
+            reported[row[0]] = (now, row)
+        live = [row for seen, row in reported.values() if seen >= now - args.max_age]
+        fresh = DensityTiler(args.zooms, bins=args.bins)
+        fresh.update(StateBatch.from_api_response(live), now)
+        reference = tile_state(fresh.drain(full=True))
+        assert client == reference, f"poll {k}: incremental tiles differ from a rebuild"
+        positioned = sum(1 for row in live if row[5] is not None)
+        for z in args.zooms:
+            total = sum(sum(cells.values()) for key, cells in client.items() if key.startswith(f"{z}/"))
+            assert total == positioned, f"zoom {z}: {total} aircraft in tiles, {positioned} positioned"
+
+    total_tiles = len(client)
+    print(f"{args.aircraft} aircraft, {args.polls} polls, zooms {args.zooms}, {args.bins}x{args.bins} cells/tile, "
+          f"{total_tiles} non-empty tiles at the end")
+    print(f"  update + drain   first {timings[0]:6.1f} ms   then p50 {sorted(timings[1:])[len(timings[1:]) // 2]:6.1f} ms")
+    later = slice(1, None)
+    print(f"  tiles changed    first {changed_tiles[0]:6d}      then mean {sum(changed_tiles[later]) / max(1, args.polls - 1):8.1f}")
+    print(f"  per poll         points JSON {sum(points_bytes) / args.polls / 1e3:8.1f} KB   "
+          f"tiles JSON {sum(json_bytes[later]) / max(1, args.polls - 1) / 1e3:8.1f} KB   "
+          f"binary {sum(binary_bytes[later]) / max(1, args.polls - 1) / 1e3:8.1f} KB")
+    coarse = [tile for tile in tiler.drain(full=True) if tile.z == args.zooms[0]]
+    print(f"  global view (z={args.zooms[0]}): {len(coarse)} tiles, "
+          f"{sum(len(tile.to_bytes()) for tile in coarse) / 1e3:.1f} KB binary instead of "
+          f"{points_bytes[-1] / 1e3:.1f} KB of points")
+    print("  incremental tiles match a rebuild on every poll")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Track size vs. error: FlightTrack.to_geojson vs simplified GeoJSON, polyline and compress_track.
+
+Por padrão gera um voo longo sintético (subida, cruzeiro com curvas e ruído
+de posição, descida, um ponto a cada 10 s); ``--geojson`` usa um track gravado
+(Feature LineString com coordenadas [lon, lat, alt], como FlightTrack.to_geojson).
+
+Uso:
+    python app/benchmarks/bench_track_compression.py [--hours 10] [--geojson track.json]
+        [--tolerances 0 5 25 100 250]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+import numpy as np
+
+from payloads import add_lambda_to_path
+
+add_lambda_to_path("lambda_flights_raw")
+
+from utils.models import FlightTrack, CompactFlightTrackPoint  # noqa: E402
+from utils.track_compression import (  # noqa: E402
+    compress_track,
+    decompress_track,
+    encode_polyline,
+    max_deviation,
+    simplified_geojson,
+    simplify,
+    track_arrays,
+)
+
+
+def synthetic_track(hours: float, interval_s: int = 10, seed: int = 7) -> FlightTrack:
+    """Long-haul flight with a few heading changes and ~15 m position noise."""
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600 / interval_s)
+    t0 = 1_700_000_000
+    # Rumo muda suavemente ao longo do voo; ~250 m/s no cruzeiro
+    heading = np.deg2rad(60 + np.cumsum(rng.normal(0, 0.15, n)) + 20 * np.sin(np.linspace(0, 6, n)))
+    speed = np.full(n, 250.0)
+    climb = min(n // 4, int(1800 / interval_s))
+    speed[:climb] = np.linspace(80, 250, climb)
+    speed[-climb:] = np.linspace(250, 70, climb)
+    step = speed * interval_s
+    lat = np.empty(n)
+    lon = np.empty(n)
+    lat[0], lon[0] = -23.43, -46.47
+    dlat = step * np.cos(heading) / 111_195.0
+    lat[1:] = lat[0] + np.cumsum(dlat[:-1])
+    dlon = step * np.sin(heading) / (111_195.0 * np.cos(np.deg2rad(lat)))
+    lon[1:] = lon[0] + np.cumsum(dlon[:-1])
+    lon = (lon + 180) % 360 - 180
+    lat += rng.normal(0, 15 / 111_195.0, n)
+    lon += rng.normal(0, 15 / 111_195.0, n)
+    alt = np.full(n, 11_000.0)
+    alt[:climb] = np.linspace(0, 11_000, climb)
+    alt[-climb:] = np.linspace(11_000, 0, climb)
+    alt += rng.normal(0, 8, n)
+    path = [
+        CompactFlightTrackPoint(t0 + i * interval_s, float(lat[i]), float(lon[i]), float(alt[i]), None, False)
+        for i in range(n)
+    ]
+    return FlightTrack("e4812a", "TAM8084", path[0].timestamp, path[-1].timestamp, path)
+
+
+def track_from_geojson(path: str) -> FlightTrack:
+    with open(path, "r", encoding="utf-8") as f:
+        feature = json.load(f)
+    coords = feature["geometry"]["coordinates"]
+    start = datetime.fromisoformat(feature["properties"]["start_time"]).timestamp()
+    end = datetime.fromisoformat(feature["properties"]["end_time"]).timestamp()
+    # GeoJSON não guarda o tempo de cada ponto: distribui entre início e fim
+    times = np.linspace(start, end, len(coords)).astype(np.int64)
+    points = [
+        CompactFlightTrackPoint(int(ts), c[1], c[0], c[2] if len(c) > 2 else None)
+        for ts, c in zip(times, coords)
+    ]
+    props = feature["properties"]
+    return FlightTrack(props.get("icao24", "000000"), props.get("callsign"), points[0].timestamp, points[-1].timestamp, points)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hours", type=float, default=10.0, help="synthetic flight duration")
+    parser.add_argument("--geojson", help="recorded track (GeoJSON Feature)")
+    parser.add_argument("--tolerances", type=float, nargs="+", default=[0, 5, 25, 100, 250])
+    args = parser.parse_args()
+
+    track = track_from_geojson(args.geojson) if args.geojson else synthetic_track(args.hours)
+    t, lat, lon, alt = track_arrays(track)
+    full_geojson = len(json.dumps(track.to_geojson()))
+    print(f"{len(t)} points, FlightTrack.to_geojson = {full_geojson:,} bytes")
+
+    print(f"{'method':<7}{'tol m':>7}{'points':>8}{'max err m':>11}{'geojson B':>11}"
+          f"{'polyline B':>12}{'compact B':>11}{'ratio':>8}{'ms':>8}")
+    for tolerance in args.tolerances:
+        for method in ("dp", "vw"):
+            if tolerance == 0 and method == "vw":
+                continue
+            start = time.perf_counter()
+            kept = simplify(lat, lon, tolerance, method) if tolerance else np.arange(len(t))
+            compact = compress_track(track, tolerance, method)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            # Round trip: o formato compacto precisa voltar aos pontos mantidos
+            restored = decompress_track(compact)
+            assert len(restored.path) == len(kept)
+
+            geojson = len(json.dumps(simplified_geojson(track, tolerance, method)))
+            polyline = len(encode_polyline(lat[kept], lon[kept]))
+            print(
+                f"{method:<7}{tolerance:>7g}{len(kept):>8}{max_deviation(lat, lon, kept):>11.1f}"
+                f"{geojson:>11,}{polyline:>12,}{len(compact):>11,}"
+                f"{full_geojson / len(compact):>7.0f}x{elapsed:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
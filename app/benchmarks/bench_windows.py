@@ -0,0 +1,150 @@
+"""
+Window aggregation engine: throughput, correctness and bounded state.
+
+Gera snapshots enriquecidos sintéticos (uma frota, ``last_contact`` avançando
+a cada poll, alguns records atrasados) e alimenta o WindowAggregator em lotes
+do tamanho de uma invocação. Mede records/s, confere as janelas emitidas
+contra um recálculo ingênuo por janela e acompanha o tamanho do estado ao
+longo do replay. Sai com código 1 abaixo do mínimo de records/s.
+
+Uso:
+    python app/benchmarks/bench_windows.py [--aircraft 10000] [--polls 60] [--interval 10]
+        [--windows 60,300/60] [--lateness 30] [--batch 5000] [--min-rate 50000]
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from payloads import add_lambda_to_path
+
+add_lambda_to_path("lambda_flights_enriched")
+
+from utils.windows import AIRPORT_GROUP, DEFAULT_GROUPS, WindowAggregator, WindowSpec  # noqa: E402
+
+CONTINENTS = {"BR": "SA", "AR": "SA", "US": "NA", "CA": "NA", "DE": "EU", "FR": "EU", "GB": "EU", "CN": "AS", "IN": "AS", "AU": "OC"}
+AIRPORTS = [f"S{chr(65 + i // 26)}{chr(65 + i % 26)}X" for i in range(300)]
+PHASES = ("taxi", "roll", "takeoff", "climb", "cruise", "cruise", "cruise", "descent", "landing")
+FIELDS = ("icao24", "last_contact", "altitude", "velocity", "nearest_airport_icao", "flight_phase") + DEFAULT_GROUPS
+
+
+def snapshots(aircraft: int, polls: int, interval: int, seed: int = 1):
+    """One list of enriched rows per poll (``last_contact`` as ISO strings, like the output)."""
+    rng = random.Random(seed)
+    fleet = []
+    for i in range(aircraft):
+        country = rng.choice(list(CONTINENTS))
+        fleet.append((f"{i:06x}", country, rng.choice(list(CONTINENTS)), rng.choice(AIRPORTS)))
+    start = int(time.time()) - polls * interval
+    for poll in range(polls):
+        now = start + poll * interval
+        rows = []
+        for icao24, origin, overflown, airport in fleet:
+            # 1% chega atrasado (um poll inteiro)
+            lag = interval + rng.randint(0, 5) if rng.random() < 0.01 else rng.randint(0, 5)
+            rows.append({
+                "icao24": icao24,
+                "last_contact": datetime.fromtimestamp(now - lag).isoformat(),
+                "altitude": rng.uniform(0, 12000),
+                "velocity": rng.uniform(0, 280),
+                "nearest_airport_icao": airport,
+                "flight_phase": rng.choice(PHASES),
+                "overflown_country_code": overflown,
+                "overflown_continent": CONTINENTS[overflown],
+                "origin_country_code": origin,
+            })
+        yield rows
+
+
+def naive(rows, spec: WindowSpec, end: int):
+    """Aggregates of one window recomputed from all accepted rows."""
+    start = end - spec.size_s
+    groups = defaultdict(lambda: defaultdict(set))
+    airports = defaultdict(lambda: (set(), set()))
+    for row, t in rows:
+        if not start <= t < end:
+            continue
+        for group in DEFAULT_GROUPS:
+            groups[group][row[group]].add(row["icao24"])
+        if row["flight_phase"] in ("landing", "takeoff"):
+            airports[row["nearest_airport_icao"]][row["flight_phase"] == "takeoff"].add(row["icao24"])
+    return groups, airports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--aircraft", type=int, default=10_000)
+    parser.add_argument("--polls", type=int, default=60)
+    parser.add_argument("--interval", type=int, default=10)
+    parser.add_argument("--windows", default="60,300/60")
+    parser.add_argument("--lateness", type=float, default=30.0)
+    parser.add_argument("--batch", type=int, default=5000, help="records per add_columns call (one invocation)")
+    parser.add_argument("--min-rate", type=float, default=50_000)
+    parser.add_argument("--check", type=int, default=3, help="windows per spec verified against the naive recount")
+    args = parser.parse_args()
+
+    specs = WindowSpec.parse_list(args.windows)
+    engine = WindowAggregator(specs, lateness_s=args.lateness)
+    polls = list(snapshots(args.aircraft, args.polls, args.interval))
+    batches = []
+    for rows in polls:
+        for start in range(0, len(rows), args.batch):
+            chunk = rows[start:start + args.batch]
+            batches.append([[row[name] for row in chunk] for name in FIELDS])
+
+    results = []
+    peak_state = 0
+    elapsed = 0.0
+    for i, columns in enumerate(batches):
+        start = time.perf_counter()
+        engine.add_columns(FIELDS, columns)
+        results.extend(engine.drain())
+        elapsed += time.perf_counter() - start
+        if i % 10 == 0:
+            peak_state = max(peak_state, engine.state_size())
+    start = time.perf_counter()
+    results.extend(engine.flush())
+    elapsed += time.perf_counter() - start
+
+    rate = engine.records / elapsed
+    print(f"{engine.records:,} records in {elapsed:.2f}s -> {rate:,.0f} records/s "
+          f"({', '.join(s.name for s in specs)}; pane {engine.pane_s}s)")
+    print(f"  {len(results):,} window results, {engine.late} late, {engine.dropped} dropped")
+    print(f"  peak state {peak_state:,} aircraft entries, {len(engine._panes)} open panes at the end")
+
+    # Recontagem ingênua: só os records aceitos (os atrasados ficam de fora nos dois lados)
+    accepted = []
+    replay = WindowAggregator(specs, lateness_s=args.lateness)
+    for columns in batches:
+        closed_before = replay._closed_before
+        times = [datetime.fromisoformat(v).replace(tzinfo=timezone.utc).timestamp() for v in columns[1]]
+        for j, t in enumerate(times):
+            if int(t // replay.pane_s) >= closed_before:
+                accepted.append(({name: columns[k][j] for k, name in enumerate(FIELDS)}, t))
+        replay.add_columns(FIELDS, columns)
+    by_window = defaultdict(list)
+    for result in results:
+        by_window[(result["window"], result["window_end"])].append(result)
+    checked = 0
+    for spec in specs:
+        ends = sorted({end for name, end in by_window if name == spec.name})
+        for end_iso in ends[1:1 + args.check]:
+            end = int(datetime.fromisoformat(end_iso).timestamp())
+            groups, airports = naive(accepted, spec, end)
+            for result in by_window[(spec.name, end_iso)]:
+                if result["group"] == AIRPORT_GROUP:
+                    arrivals, departures = airports[result["key"]]
+                    assert (result["arrivals"], result["departures"]) == (len(arrivals), len(departures)), result
+                else:
+                    assert result["aircraft"] == len(groups[result["group"]][result["key"]]), result
+                checked += 1
+    print(f"  {checked} window results match the naive recount")
+
+    if rate < args.min_rate:
+        raise SystemExit(f"below the minimum of {args.min_rate:,.0f} records/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Import-time profile and budget check of both Lambdas (cold start).
+
+Importa ``lambda_function`` num processo novo por execução, com
+``python -X importtime`` e o ambiente de uma Lambda (AWS_LAMBDA_FUNCTION_NAME
+definido: sem .env), e mostra os módulos mais caros. Sai com código 1 se a
+mediana do import passar do orçamento, para rodar no CI antes do deploy.
+O repositório não tem suíte pytest: este script é o teste do orçamento.
+
+Uso:
+    python app/benchmarks/check_import_time.py [--runs 5] [--top 10]
+        [--budget-ms lambda_flights_raw=250 lambda_flights_enriched=120]
+        [--client-init lazy|prewarm|eager]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+from payloads import SRC_DIR
+
+# Orçamento padrão (ms) do import de lambda_function, incluindo o código de módulo
+DEFAULT_BUDGETS_MS = {
+    "lambda_flights_raw": 250.0,
+    "lambda_flights_enriched": 120.0,
+}
+
+_PROBE = (
+    "import time\n"
+    "start = time.perf_counter()\n"
+    "import lambda_function\n"
+    "print(f'INIT_MS {(time.perf_counter() - start) * 1000:.3f}')\n"
+)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float, int]]:
+    """(module, self ms, cumulative ms, depth) for every ``-X importtime`` line."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        head, cumulative_us, name = line.split("|", 2)
+        self_us = float(head.split(":", 1)[1])
+        name = name[1:]  # espaço depois do "|"; o resto da indentação é a profundidade
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((name.strip(), self_us / 1000, float(cumulative_us) / 1000, depth))
+    return entries
+
+
+def direct_imports(entries: List[Tuple[str, float, float, int]], module: str) -> List[Tuple[str, float]]:
+    """(name, cumulative ms) of the modules imported directly by ``module``."""
+    # O -X importtime lista os filhos antes do pai: os imports diretos são as
+    # linhas de profundidade 1 entre a entrada de topo anterior e a do módulo
+    names = [entry[0] for entry in entries]
+    end = names.index(module)
+    out = []
+    for name, _, cumulative_ms, depth in reversed(entries[:end]):
+        if depth == 0:
+            break
+        if depth == 1:
+            out.append((name, cumulative_ms))
+    return out
+
+
+def profile(name: str, client_init: str) -> Tuple[float, List[Tuple[str, float, float, int]]]:
+    """Init wall time (ms) and import-time entries of one cold import."""
+    env = dict(os.environ)
+    env.update({
+        "AWS_LAMBDA_FUNCTION_NAME": f"import-check-{name}",
+        "AWS_DEFAULT_REGION": env.get("AWS_DEFAULT_REGION", "us-east-1"),
+        "CLIENT_INIT": client_init,
+        "PYTHONDONTWRITEBYTECODE": "1",  # não suja o diretório da Lambda com .pyc
+    })
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=SRC_DIR / name,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise SystemExit(f"import of {name} failed:\n{completed.stderr[-2000:]}")
+    init_ms = next(float(line.split()[1]) for line in completed.stdout.splitlines() if line.startswith("INIT_MS"))
+    return init_ms, parse_importtime(completed.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--budget-ms", nargs="+", default=[], metavar="LAMBDA=MS")
+    parser.add_argument("--client-init", default="prewarm", choices=("lazy", "prewarm", "eager"))
+    args = parser.parse_args()
+
+    budgets: Dict[str, float] = dict(DEFAULT_BUDGETS_MS)
+    for item in args.budget_ms:
+        name, _, value = item.partition("=")
+        budgets[name] = float(value)
+
+    failed = False
+    for name, budget in budgets.items():
+        inits = []
+        cumulative: Dict[str, List[float]] = {}
+        for _ in range(args.runs):
+            init_ms, entries = profile(name, args.client_init)
+            inits.append(init_ms)
+            for module, cumulative_ms in direct_imports(entries, "lambda_function"):
+                cumulative.setdefault(module, []).append(cumulative_ms)
+        median = statistics.median(inits)
+        status = "OK" if median <= budget else "OVER BUDGET"
+        failed = failed or median > budget
+        print(f"\n{name}: init {median:.1f} ms (median of {args.runs}, min {min(inits):.1f}) "
+              f"/ budget {budget:.0f} ms -> {status}")
+        ranked = sorted(((statistics.median(v), m) for m, v in cumulative.items()), reverse=True)
+        for ms, module in ranked[:args.top]:
+            print(f"  {ms:8.1f} ms  {module}")
+
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Recorded and synthetic OpenSky /states/all payloads for the benchmarks.
+
+Os benchmarks rodam fora da AWS: este módulo também coloca o diretório de
+cada Lambda no sys.path, do mesmo jeito que o runtime da Lambda faz.
+"""
+
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+COUNTRIES = [
+    ("United States", 40), ("China", 8), ("United Kingdom", 6), ("Germany", 6),
+    ("Ireland", 4), ("France", 4), ("Canada", 4), ("Brazil", 4), ("Spain", 3),
+    ("Turkey", 3), ("India", 3), ("Australia", 3), ("Japan", 3), ("Mexico", 2),
+    ("Kingdom of the Netherlands", 2), ("Switzerland", 2), ("Italy", 2),
+    ("Republic of Korea", 1), ("United Arab Emirates", 1), ("Russian Federation", 1),
+]
+AIRLINES = ["AAL", "DAL", "UAL", "SWA", "RYR", "EZY", "BAW", "DLH", "AFR", "TAM", "GLO", "AZU", "UAE", "CCA", "THY"]
+
+
+def add_lambda_to_path(name: str) -> Path:
+    """Put ``app/src/<name>`` on sys.path so ``import lambda_function`` / ``utils`` work."""
+    path = SRC_DIR / name
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+    return path
+
+
+def synthetic_states(n: int, seed: int = 42, now: int | None = None) -> dict:
+    """Build a /states/all-shaped payload with ``n`` plausible aircraft."""
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    countries = [c for c, _ in COUNTRIES]
+    weights = [w for _, w in COUNTRIES]
+    states = []
+    for i in range(n):
+        on_ground = rng.random() < 0.12
+        has_position = rng.random() > 0.02
+        altitude = None if on_ground else round(rng.uniform(300, 12500), 2)
+        callsign = (
+            f"{rng.choice(AIRLINES)}{rng.randint(1, 9999)}".ljust(8)
+            if rng.random() > 0.05 else None
+        )
+        states.append([
+            f"{(0x400000 + i * 7919) % 0xFFFFFF:06x}",
+            callsign,
+            rng.choices(countries, weights)[0],
+            now - rng.randint(0, 15) if has_position else None,
+            now - rng.randint(0, 5),
+            round(rng.uniform(-180, 180), 4) if has_position else None,
+            round(rng.uniform(-60, 70), 4) if has_position else None,
+            altitude,
+            on_ground,
+            round(rng.uniform(0, 15), 2) if on_ground else round(rng.uniform(80, 280), 2),
+            round(rng.uniform(0, 360), 2),
+            None if on_ground else round(rng.uniform(-15, 15), 2),
+            None,
+            None if altitude is None else round(altitude + rng.uniform(-100, 100), 2),
+            f"{rng.randint(0, 7777):04d}" if rng.random() > 0.3 else None,
+            False,
+            0 if rng.random() > 0.1 else 2,
+        ])
+    return {"time": now, "states": states}
+
+
+def load_payload(path: str | None, n: int = 10_000) -> dict:
+    """Load a recorded /states/all response, or synthesize ``n`` states when no path is given."""
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return synthetic_states(n)
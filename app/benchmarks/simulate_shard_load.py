@@ -0,0 +1,142 @@
+"""
+Per-shard load of a payload under each partitioning strategy.
+
+Monta os records do Kinesis de um snapshot (gravado ou sintético) como a
+ingestão faz, aplica cada estratégia de utils/partitioning.py (mais a chave
+antiga ``icao24 or "unknown"``, como ``legacy``) e mostra, por mapa de shards,
+o desequilíbrio (shard mais carregado / média), a maior fração do limite de
+escrita usada e os shards que seriam limitados. O mapa vem do ListShards do
+FakeKinesis; ``split`` divide o primeiro shard ao meio (mapa desigual, como
+após um SplitShard). Os records também passam pelo FakeKinesis para conferir
+o roteamento do simulador.
+
+Uso:
+    python app/benchmarks/simulate_shard_load.py [--payload states.json] [--aircraft 10000]
+        [--shards 4 8] [--polls 3] [--window-s 1] [--missing-icao24 0.02]
+        [--hotspots 0.7] [--kpl] [--per-shard]
+"""
+
+import argparse
+import random
+
+from payloads import add_lambda_to_path, load_payload
+from stand_ins import MAX_HASH_KEY, FakeKinesis
+
+add_lambda_to_path("lambda_flights_raw")
+
+from utils.aggregation import RecordAggregator  # noqa: E402
+from utils.columnar import StateBatch  # noqa: E402
+from utils.partitioning import PARTITION_STRATEGIES, ShardMap, build_partitioner, simulate_load  # noqa: E402
+from utils.serializer import StateSerializer  # noqa: E402
+
+STREAM_NAME = "shard-load-simulation"
+
+# Centros de tráfego (lat, lon, desvio em graus) para concentrar o payload sintético
+HUBS = (
+    (50.0, 8.0, 6.0),     # Europa central
+    (40.0, -80.0, 7.0),   # leste dos EUA
+    (34.0, -115.0, 5.0),  # oeste dos EUA
+    (30.0, 115.0, 6.0),   # China
+    (25.0, 55.0, 3.0),    # Golfo
+    (-23.5, -46.6, 3.0),  # São Paulo
+)
+
+
+def concentrate(rows: list, fraction: float, seed: int = 7) -> None:
+    """Move ``fraction`` of the positioned aircraft next to the traffic hubs."""
+    rng = random.Random(seed)
+    for row in rows:
+        if row[5] is None or rng.random() >= fraction:
+            continue
+        lat, lon, sigma = rng.choice(HUBS)
+        row[6] = max(-89.9, min(89.9, rng.gauss(lat, sigma)))
+        row[5] = (rng.gauss(lon, sigma * 1.5) + 180) % 360 - 180
+
+
+def shard_maps(shards: int):
+    even = FakeKinesis(shard_count=shards)
+    yield f"{shards} even", even
+    start, end = even.hash_ranges[0]
+    middle = (start + end) // 2
+    split = [(start, middle), (middle + 1, end)] + even.hash_ranges[1:]
+    yield f"{shards} split", FakeKinesis(hash_ranges=split)
+
+
+class LegacyPartitioner:
+    """Key used before utils/partitioning.py: every state without icao24 shares "unknown"."""
+
+    name = "legacy"
+    uses_position = False
+
+    def assign(self, icao24, latitude=None, longitude=None):
+        return [key or "unknown" for key in icao24], None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payload")
+    parser.add_argument("--aircraft", type=int, default=10_000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--polls", type=int, default=3, help="snapshots sent before measuring (geohash adapts)")
+    parser.add_argument("--window-s", type=float, default=1.0, help="time over which one snapshot is sent")
+    parser.add_argument("--missing-icao24", type=float, default=0.02, help="fraction of states without icao24")
+    parser.add_argument("--hotspots", type=float, default=0.7, help="fraction of aircraft moved to traffic hubs")
+    parser.add_argument("--geohash-precision", type=int, default=3)
+    parser.add_argument("--kpl", action="store_true", help="aggregate the records (KINESIS_AGGREGATION=kpl)")
+    parser.add_argument("--per-shard", action="store_true")
+    args = parser.parse_args()
+
+    rows = load_payload(args.payload, args.aircraft)["states"]
+    if args.hotspots:
+        concentrate(rows, args.hotspots)
+    rng = random.Random(3)
+    for row in rows:
+        if rng.random() < args.missing_icao24:
+            row[0] = None
+    batch = StateBatch.from_api_response(rows)
+    payloads = StateSerializer().encode_batch(batch)
+    print(f"{len(batch)} states, {sum(map(len, payloads)) / 1e6:.2f} MB, "
+          f"{sum(1 for key in batch.icao24 if not key)} without icao24, "
+          f"{'KPL aggregated, ' if args.kpl else ''}sent within {args.window_s:g}s")
+
+    for shards in args.shards:
+        for label, kinesis in shard_maps(shards):
+            shard_map = ShardMap.from_kinesis(kinesis, STREAM_NAME)
+            print(f"\n{label} ({len(shard_map)} open shards)")
+            print(f"  {'strategy':<10} {'records':>8} {'imbalance':>10} {'max use':>8}  throttled")
+            partitioners = [LegacyPartitioner()] + [
+                build_partitioner(strategy, shard_map, geohash_precision=args.geohash_precision)
+                for strategy in PARTITION_STRATEGIES
+            ]
+            for partitioner in partitioners:
+                for _ in range(args.polls):
+                    keys, hash_keys = partitioner.assign(batch.icao24, batch.latitude, batch.longitude)
+                records = [{"Data": data, "PartitionKey": key} for data, key in zip(payloads, keys)]
+                if hash_keys is not None:
+                    for record, hash_key in zip(records, hash_keys):
+                        record["ExplicitHashKey"] = hash_key
+                if args.kpl:
+                    records = RecordAggregator(shard_map.ranges).aggregate(records)
+
+                report = simulate_load(shard_map, records)
+                # Confere o simulador contra o roteamento do stand-in
+                kinesis.shard_records = [0] * kinesis.shard_count
+                for start in range(0, len(records), 500):
+                    kinesis.put_records(StreamName=STREAM_NAME, Records=records[start:start + 500])
+                kinesis.drain(STREAM_NAME)
+                assert kinesis.shard_records == [s.records for s in report.shards], "simulator/stand-in mismatch"
+
+                throttled = report.throttled(args.window_s)
+                print(f"  {partitioner.name:<10} {report.records:>8} {report.imbalance():>9.2f}x "
+                      f"{max(report.utilization(args.window_s)):>7.0%}  "
+                      f"{len(throttled)}/{len(shard_map)}")
+                if args.per_shard:
+                    for shard, used in zip(report.shards, report.utilization(args.window_s)):
+                        width = shard_map.shards[report.shards.index(shard)]
+                        share = (width.end - width.start + 1) / (MAX_HASH_KEY + 1)
+                        print(f"      {shard.shard_id}  {shard.records:>7} records {shard.bytes / 1e6:7.2f} MB "
+                              f"{used:>6.0%} of limit  ({share:.0%} of key space)")
+
+
+if __name__ == "__main__":
+    main()
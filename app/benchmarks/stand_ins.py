@@ -0,0 +1,464 @@
+"""
+In-process stand-ins for OpenSky, Secrets Manager, Kinesis, Firehose and DynamoDB.
+
+Só implementam as chamadas que as Lambdas usam, com os mesmos formatos de
+resposta e os limites do serviço real (ex.: 500 records / 5 MB por
+PutRecords), para medir o pipeline sem rede nem conta AWS.
+"""
+
+import base64
+import bisect
+import hashlib
+import importlib
+import json
+import math
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from payloads import SRC_DIR
+
+MAX_HASH_KEY = 2 ** 128 - 1
+
+# Limites do Kinesis Data Streams (PutRecords)
+PUT_RECORDS_MAX_RECORDS = 500
+PUT_RECORDS_MAX_BYTES = 5 * 1024 * 1024
+RECORD_MAX_BYTES = 1024 * 1024
+
+# Limites do DynamoDB (BatchWriteItem, BatchGetItem, item, página do Query)
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_GET_MAX_KEYS = 100
+ITEM_MAX_BYTES = 400 * 1024
+QUERY_PAGE_BYTES = 1024 * 1024
+
+
+class FakeResponse:
+    """Minimal ``requests.Response``: status, headers, body bytes, json() and iter_content()."""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            import requests
+
+            raise requests.HTTPError(f"{self.status_code} from replay stand-in", response=self)
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeOpenSkySession:
+    """
+    Replaces the shared ``requests.Session``: the token endpoint always
+    grants a token and /states/all returns ``payload`` (bytes of a recorded
+    or synthetic response). ``latency_s`` simulates the network per request.
+    """
+
+    def __init__(self, payload: bytes = b'{"time": 0, "states": []}', latency_s: float = 0.0):
+        self.payload = payload
+        self.latency_s = latency_s
+        self.requests = 0
+
+    def post(self, url, data=None, timeout=None, **kwargs) -> FakeResponse:
+        self._wait()
+        body = json.dumps({"access_token": "replay-token", "expires_in": 1800}).encode("utf-8")
+        return FakeResponse(200, body)
+
+    def get(self, url, headers=None, params=None, timeout=None, stream=False, **kwargs) -> FakeResponse:
+        self._wait()
+        return FakeResponse(200, self.payload)
+
+    def _wait(self) -> None:
+        self.requests += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+
+class FakeSecretsManager:
+    """``get_secret_value`` for the OpenSky client credentials secret."""
+
+    def __init__(self, client_id: str = "replay", client_secret: str = "replay"):
+        self.secret = json.dumps({"client_id": client_id, "client_secret": client_secret})
+        self.calls = 0
+
+    def get_secret_value(self, SecretId: str) -> Dict[str, Any]:
+        self.calls += 1
+        return {"ARN": SecretId, "SecretString": self.secret}
+
+
+class FakeKinesis:
+    """
+    ``put_records`` / ``list_shards`` of a Kinesis stream kept in memory.
+
+    Accepted records are appended to ``streams[name]``; ``failure_rate``
+    makes a random fraction of each call fail with
+    ProvisionedThroughputExceededException (partial failure, as the real
+    service does) and ``latency_s`` is slept per call. ``hash_ranges``
+    replaces the even split (e.g. the uneven map left by a shard split);
+    records are routed by ExplicitHashKey or md5(PartitionKey) and counted
+    per shard in ``shard_records``.
+    """
+
+    def __init__(
+        self,
+        shard_count: int = 4,
+        failure_rate: float = 0.0,
+        latency_s: float = 0.0,
+        seed: int = 0,
+        hash_ranges: Optional[List[tuple]] = None,
+    ):
+        if hash_ranges is None:
+            step = (MAX_HASH_KEY + 1) // shard_count
+            hash_ranges = [
+                (i * step, MAX_HASH_KEY if i == shard_count - 1 else (i + 1) * step - 1)
+                for i in range(shard_count)
+            ]
+        self.hash_ranges = sorted(hash_ranges)
+        self.shard_count = len(self.hash_ranges)
+        self.failure_rate = failure_rate
+        self.latency_s = latency_s
+        self.streams: Dict[str, List[Dict[str, Any]]] = {}
+        self.shard_records = [0] * self.shard_count
+        self.calls = 0
+        self._starts = [start for start, _ in self.hash_ranges]
+        self._rng = random.Random(seed)
+
+    def shard_of(self, record: Dict[str, Any]) -> int:
+        explicit = record.get("ExplicitHashKey")
+        if explicit is not None:
+            hash_key = int(explicit)
+        else:
+            hash_key = int.from_bytes(hashlib.md5(record["PartitionKey"].encode("utf-8")).digest(), "big")
+        return bisect.bisect_right(self._starts, hash_key) - 1
+
+    def put_records(self, StreamName: str, Records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        self.calls += 1
+        if len(Records) > PUT_RECORDS_MAX_RECORDS:
+            raise ValueError(f"InvalidArgumentException: {len(Records)} records in one PutRecords")
+        size = 0
+        for record in Records:
+            record_bytes = len(record["Data"]) + len(record["PartitionKey"].encode("utf-8"))
+            if record_bytes > RECORD_MAX_BYTES:
+                raise ValueError(f"InvalidArgumentException: record of {record_bytes} bytes")
+            size += record_bytes
+        if size > PUT_RECORDS_MAX_BYTES:
+            raise ValueError(f"InvalidArgumentException: {size} bytes in one PutRecords")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+        stream = self.streams.setdefault(StreamName, [])
+        entries = []
+        failed = 0
+        for record in Records:
+            if self.failure_rate and self._rng.random() < self.failure_rate:
+                failed += 1
+                entries.append({
+                    "ErrorCode": "ProvisionedThroughputExceededException",
+                    "ErrorMessage": "Rate exceeded for shard (replay stand-in)",
+                })
+                continue
+            stream.append(record)
+            shard = self.shard_of(record)
+            self.shard_records[shard] += 1
+            entries.append({"SequenceNumber": str(len(stream)), "ShardId": f"shardId-{shard:012d}"})
+        return {"FailedRecordCount": failed, "Records": entries}
+
+    def list_shards(self, StreamName: Optional[str] = None, NextToken: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        shards = []
+        for i, (start, end) in enumerate(self.hash_ranges):
+            shards.append({
+                "ShardId": f"shardId-{i:012d}",
+                "HashKeyRange": {"StartingHashKey": str(start), "EndingHashKey": str(end)},
+                "SequenceNumberRange": {"StartingSequenceNumber": "0"},
+            })
+        return {"Shards": shards}
+
+    def drain(self, stream_name: str) -> List[Dict[str, Any]]:
+        """Return and forget the records accepted for a stream."""
+        return self.streams.pop(stream_name, [])
+
+
+class FakeFirehose:
+    """
+    Firehose reading a Kinesis stream: groups the records into Lambda
+    transformation events of up to ``buffer_bytes`` (the processor's
+    BufferSizeInMBs), shaped like the real invocation payload.
+    """
+
+    def __init__(self, buffer_bytes: int = 3 * 1024 * 1024):
+        self.buffer_bytes = buffer_bytes
+        self._next_id = 0
+
+    def events(self, records: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        batch: List[Dict[str, Any]] = []
+        size = 0
+        arrival = int(time.time() * 1000)
+        for record in records:
+            data = base64.b64encode(record["Data"]).decode("ascii")
+            if batch and size + len(data) > self.buffer_bytes:
+                yield {"invocationId": "replay", "records": batch}
+                batch, size = [], 0
+            batch.append({
+                "recordId": f"{self._next_id:056d}",
+                "approximateArrivalTimestamp": arrival,
+                "data": data,
+            })
+            self._next_id += 1
+            size += len(data)
+        if batch:
+            yield {"invocationId": "replay", "records": batch}
+
+
+class FakeClientError(Exception):
+    """Service error shaped like ``botocore.exceptions.ClientError`` (``response["Error"]["Code"]``)."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"An error occurred ({code}): {message}")
+        self.response = {"Error": {"Code": code, "Message": message}}
+
+
+def _item_bytes(item: Dict[str, Dict[str, Any]]) -> int:
+    # Tamanho como o DynamoDB conta: nomes + valores
+    size = 0
+    for name, typed in item.items():
+        (kind, value), = typed.items()
+        size += len(name.encode("utf-8")) + (1 if kind == "BOOL" else len(str(value).encode("utf-8")))
+    return size
+
+
+class FakeDynamoDB:
+    """
+    ``batch_write_item`` / ``put_item`` / ``query`` of on-demand DynamoDB
+    tables kept in memory (``tables[name][hash key]``).
+
+    ``unprocessed_rate`` returns a random fraction of each BatchWriteItem as
+    UnprocessedItems and ``throttle_rate`` fails a random fraction of calls
+    with ProvisionedThroughputExceededException. Write units are counted as
+    the service bills them (1 per KB, rounded up; conditional failures
+    included) in ``wcu``, plus ``gsi_wcu`` for the ``indexes``
+    ({index: (hash key, "ALL" or "KEYS_ONLY")}: 2 writes when an item
+    changes index key, none when a KEYS_ONLY index keeps its key).
+    Conditions support ``attribute_not_exists(a) OR a < :v``; queries
+    support ``key = :v`` on the table or an index; ``batch_get_item`` reads
+    up to 100 keys.
+    """
+
+    _CONDITION = re.compile(r"attribute_not_exists\((\w+)\) OR (\w+) < (:\w+)")
+    _KEY_CONDITION = re.compile(r"(\w+) = (:\w+)")
+
+    def __init__(
+        self,
+        hash_key: str = "id",
+        indexes: Optional[Dict[str, tuple]] = None,
+        unprocessed_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        latency_s: float = 0.0,
+        seed: int = 0,
+    ):
+        self.hash_key = hash_key
+        self.indexes = indexes or {}
+        self.unprocessed_rate = unprocessed_rate
+        self.throttle_rate = throttle_rate
+        self.latency_s = latency_s
+        self.tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.calls = 0
+        self.wcu = 0
+        self.gsi_wcu = 0
+        self.rcu = 0.0
+        self._rng = random.Random(seed)
+        # Os writers chamam de várias threads: contadores e tabelas sob um lock
+        self._lock = threading.Lock()
+
+    def _call(self) -> None:
+        # Chamado com o lock: a latência simulada fica fora dele
+        self.calls += 1
+        if self.throttle_rate and self._rng.random() < self.throttle_rate:
+            raise FakeClientError("ProvisionedThroughputExceededException", "Throughput exceeded (replay stand-in)")
+
+    def _store(self, table_name: str, item: Dict[str, Any]) -> None:
+        size = _item_bytes(item)
+        if size > ITEM_MAX_BYTES:
+            raise FakeClientError("ValidationException", f"Item size of {size} bytes has exceeded the allowed size")
+        table = self.tables.setdefault(table_name, {})
+        key = item[self.hash_key]["S"]
+        previous = table.get(key)
+        table[key] = item
+        self.wcu += math.ceil(size / 1024)
+        for index_hash, projection in self.indexes.values():
+            before = previous is not None and index_hash in previous
+            if index_hash not in item and not before:
+                continue
+            if not before or index_hash not in item:
+                writes = 1
+            elif previous[index_hash] != item[index_hash]:
+                writes = 2  # apaga a entrada antiga e grava a nova
+            elif projection == "ALL" and previous != item:
+                writes = 1
+            else:
+                writes = 0  # chaves e atributos projetados iguais: o índice não muda
+            index_size = size if projection == "ALL" else len(self.hash_key) + len(key) + _item_bytes(
+                {index_hash: item.get(index_hash) or previous[index_hash]}
+            )
+            self.gsi_wcu += math.ceil(index_size / 1024) * writes
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict[str, Any]]], **kwargs) -> Dict[str, Any]:
+        total = sum(len(requests) for requests in RequestItems.values())
+        if total > BATCH_WRITE_MAX_ITEMS:
+            raise FakeClientError("ValidationException", f"{total} items in one BatchWriteItem")
+        for requests in RequestItems.values():
+            keys = [request["PutRequest"]["Item"][self.hash_key]["S"] for request in requests]
+            if len(set(keys)) != len(keys):
+                raise FakeClientError("ValidationException", "Provided list of item keys contains duplicates")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self._call()
+            unprocessed: Dict[str, List[Dict[str, Any]]] = {}
+            for table_name, requests in RequestItems.items():
+                for request in requests:
+                    if self.unprocessed_rate and self._rng.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(request)
+                        continue
+                    self._store(table_name, request["PutRequest"]["Item"])
+        return {"UnprocessedItems": unprocessed}
+
+    def put_item(
+        self,
+        TableName: str,
+        Item: Dict[str, Any],
+        ConditionExpression: Optional[str] = None,
+        ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self._call()
+            self._put(TableName, Item, ConditionExpression, ExpressionAttributeValues)
+        return {}
+
+    def _put(self, TableName, Item, ConditionExpression, ExpressionAttributeValues) -> None:
+        if ConditionExpression:
+            match = self._CONDITION.fullmatch(ConditionExpression.strip())
+            if match is None or match.group(1) != match.group(2):
+                raise NotImplementedError(f"condition not supported by the stand-in: {ConditionExpression}")
+            current = self.tables.get(TableName, {}).get(Item[self.hash_key]["S"])
+            name, placeholder = match.group(1), match.group(3)
+            if current is not None and name in current:
+                limit = float(ExpressionAttributeValues[placeholder]["N"])
+                if not float(current[name]["N"]) < limit:
+                    self.wcu += math.ceil(_item_bytes(Item) / 1024)
+                    raise FakeClientError("ConditionalCheckFailedException", "The conditional request failed")
+        self._store(TableName, Item)
+
+    def query(
+        self,
+        TableName: str,
+        KeyConditionExpression: str,
+        ExpressionAttributeValues: Dict[str, Any],
+        IndexName: Optional[str] = None,
+        ExclusiveStartKey: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        with self._lock:
+            self._call()
+        match = self._KEY_CONDITION.fullmatch(KeyConditionExpression.strip())
+        if match is None:
+            raise NotImplementedError(f"key condition not supported by the stand-in: {KeyConditionExpression}")
+        name, value = match.group(1), ExpressionAttributeValues[match.group(2)]
+        items = sorted(
+            (item for item in self.tables.get(TableName, {}).values() if item.get(name) == value),
+            key=lambda item: item[self.hash_key]["S"],
+        )
+        if IndexName and self.indexes[IndexName][1] == "KEYS_ONLY":
+            items = [{self.hash_key: item[self.hash_key], name: item[name]} for item in items]
+        if ExclusiveStartKey is not None:
+            start = ExclusiveStartKey[self.hash_key]["S"]
+            position = next(i for i, item in enumerate(items) if item[self.hash_key]["S"] == start)
+            items = items[position + 1:]
+        page, size = [], 0
+        for item in items:
+            if page and size + _item_bytes(item) > QUERY_PAGE_BYTES:
+                break
+            page.append(item)
+            size += _item_bytes(item)
+        # Leitura eventualmente consistente: 0,5 RCU por 4 KB lidos
+        self.rcu += math.ceil(size / 4096) / 2
+        response = {"Items": page, "Count": len(page)}
+        if len(page) < len(items):
+            response["LastEvaluatedKey"] = {self.hash_key: page[-1][self.hash_key]}
+        return response
+
+    def batch_get_item(self, RequestItems: Dict[str, Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        total = sum(len(request["Keys"]) for request in RequestItems.values())
+        if total > BATCH_GET_MAX_KEYS:
+            raise FakeClientError("ValidationException", f"{total} keys in one BatchGetItem")
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self._call()
+        responses: Dict[str, List[Dict[str, Any]]] = {}
+        for table_name, request in RequestItems.items():
+            table = self.tables.get(table_name, {})
+            found = responses.setdefault(table_name, [])
+            for key in request["Keys"]:
+                item = table.get(key[self.hash_key]["S"])
+                if item is not None:
+                    found.append(item)
+                    self.rcu += math.ceil(_item_bytes(item) / 4096) / 2
+        return {"Responses": responses, "UnprocessedKeys": {}}
+
+
+class LambdaModule:
+    """
+    One Lambda's ``lambda_function`` module, imported with its own ``utils``.
+
+    Both Lambdas have a top-level ``utils`` package, so each one gets its own
+    copy of the ``utils*`` / ``lambda_function`` entries of sys.modules;
+    ``with module:`` swaps them (and the Lambda directory on sys.path) in,
+    which also keeps lazy imports inside utils resolving to the right package.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.path = str(SRC_DIR / name)
+        self.modules: Dict[str, Any] = {}
+        self._saved: Dict[str, Any] = {}
+        with self:
+            self.module = importlib.import_module("lambda_function")
+
+    @staticmethod
+    def _owned(name: str) -> bool:
+        return name in ("lambda_function", "utils") or name.startswith("utils.")
+
+    def __enter__(self):
+        self._saved = {k: sys.modules.pop(k) for k in list(sys.modules) if self._owned(k)}
+        sys.modules.update(self.modules)
+        sys.path.insert(0, self.path)
+        return getattr(self, "module", None)
+
+    def __exit__(self, *exc):
+        self.modules = {k: sys.modules.pop(k) for k in list(sys.modules) if self._owned(k)}
+        sys.modules.update(self._saved)
+        sys.path.remove(self.path)
+        return False
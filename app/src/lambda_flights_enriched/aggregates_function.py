@@ -0,0 +1,162 @@
+"""
+Consumidor Kinesis com agregações em janelas (alternativa à aplicação Flink).
+
+Mesmo pacote da Lambda flights_enriched, com outro handler
+(``aggregates_function.lambda_handler``) ligado ao stream de estados por um
+event source mapping. Os records passam pelo mesmo enriquecimento da
+transformação do Firehose (país/continente, aeroporto, fase do voo) e
+alimentam o WindowAggregator (utils/windows.py), que fica na memória do
+container entre invocações. As janelas fechadas vão como JSON (uma linha por
+resultado) para o Firehose de AGGREGATES_DELIVERY_STREAM, ou para o stdout
+(CloudWatch Logs) se não estiver definido.
+
+Cada container agrega só os shards que processa: com PARTITION_STRATEGY
+icao24/balanced na ingestão uma aeronave fica sempre no mesmo shard, e os
+resultados de containers diferentes para a mesma janela podem ser somados.
+
+Resultados que o Firehose rejeita voltam para a fila do agregador e o lote
+falha, para o event source mapping reenviar; records já somados (número de
+sequência até o último visto no shard) são ignorados no reenvio, então as
+contagens não dobram.
+
+Variáveis: AGGREGATION_WINDOWS (padrão ``60,300/60``), AGGREGATION_GROUPS,
+AGGREGATION_LATENESS_S, AGGREGATES_DELIVERY_STREAM, além das de
+enriquecimento (GEO_BOUNDARIES_PATH, AIRPORTS_PATH, ...).
+"""
+
+import json
+import logging
+import os
+import random
+import sys
+import time
+
+from utils.transform import FirehoseBatchTransformer
+from utils.geo import GeoEnricher
+from utils.airports import AirportEnricher
+from utils.metrics import Metrics
+from utils.windows import WindowAggregator, WindowSpec
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+DEFAULT_WINDOWS = "60,300/60"
+
+# Limite do PutRecordBatch do Firehose
+FIREHOSE_MAX_RECORDS = 500
+FIREHOSE_MAX_ATTEMPTS = 3
+
+metrics = Metrics.from_env()
+
+# Estado das janelas: vive no container quente entre invocações
+aggregator = WindowAggregator.from_env() or WindowAggregator(WindowSpec.parse_list(DEFAULT_WINDOWS))
+
+transformer = FirehoseBatchTransformer(
+    os.environ.get("SERIALIZER_BACKEND") or None,
+    logger=logger,
+    enrichers=(GeoEnricher.from_env(logger=logger), AirportEnricher.from_env(logger=logger)),
+    metrics=metrics,
+    sinks=[aggregator],
+)
+
+# Cliente do Firehose criado no primeiro envio (boto3 fora do init)
+_firehose_client = None
+
+# Maior número de sequência já somado, por shard (eventSourceARN + shardId)
+_checkpoints = {}
+
+
+def _shard(record: dict) -> str:
+    return f"{record.get('eventSourceARN', '')}/{record.get('eventID', '').split(':', 1)[0]}"
+
+
+def _new_records(event_records: list) -> list:
+    """Records ainda não somados: no reenvio de um lote, os já vistos ficam de fora."""
+    fresh = []
+    for record in event_records:
+        sequence = record["kinesis"].get("sequenceNumber")
+        if sequence is not None and int(sequence) <= _checkpoints.get(_shard(record), -1):
+            continue
+        fresh.append(record)
+    return fresh
+
+
+def _advance_checkpoints(event_records: list) -> None:
+    for record in event_records:
+        sequence = record["kinesis"].get("sequenceNumber")
+        if sequence is not None:
+            shard = _shard(record)
+            _checkpoints[shard] = max(_checkpoints.get(shard, -1), int(sequence))
+
+
+def _put_batch(delivery_stream: str, results: list) -> list:
+    """PutRecordBatch com novas tentativas das entradas rejeitadas; retorna as que sobraram."""
+    pending = results
+    for attempt in range(FIREHOSE_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(random.uniform(0, 0.1 * 2 ** attempt))
+        records = [{"Data": (json.dumps(result, separators=(",", ":")) + "\n").encode("utf-8")} for result in pending]
+        try:
+            response = _firehose_client.put_record_batch(DeliveryStreamName=delivery_stream, Records=records)
+        except Exception as e:
+            logger.warning(f"PutRecordBatch attempt {attempt + 1} to '{delivery_stream}' failed: {e}")
+            continue
+        if not response.get("FailedPutCount", 0):
+            return []
+        pending = [
+            result for result, entry in zip(pending, response.get("RequestResponses", [])) if entry.get("ErrorCode")
+        ]
+    return pending
+
+
+def _write_results(results: list) -> list:
+    """Envia os resultados; retorna os que não foram entregues."""
+    if not results:
+        return []
+    delivery_stream = os.environ.get("AGGREGATES_DELIVERY_STREAM")
+    if not delivery_stream:
+        sys.stdout.write("".join(json.dumps(result, separators=(",", ":")) + "\n" for result in results))
+        sys.stdout.flush()
+        return []
+
+    global _firehose_client
+    if _firehose_client is None:
+        import boto3
+
+        _firehose_client = boto3.client("firehose")
+    unwritten = []
+    for start in range(0, len(results), FIREHOSE_MAX_RECORDS):
+        unwritten.extend(_put_batch(delivery_stream, results[start:start + FIREHOSE_MAX_RECORDS]))
+    if unwritten:
+        logger.error(f"{len(unwritten)} of {len(results)} window results were not delivered to '{delivery_stream}'")
+    return unwritten
+
+
+@metrics.handler
+def lambda_handler(event, context):
+    # Records do event source mapping do Kinesis (base64, KPL agregado ou não)
+    event_records = event.get("Records", [])
+    fresh = _new_records(event_records)
+    records = [{"data": record["kinesis"]["data"]} for record in fresh]
+    late_before = aggregator.late
+    enriched = transformer.collect(records)
+    _advance_checkpoints(fresh)
+    results = aggregator.drain()
+    unwritten = _write_results(results)
+
+    metrics.count("RecordsIn", len(event_records))
+    metrics.count("RecordsRedelivered", len(event_records) - len(fresh))
+    metrics.count("RecordsEnriched", enriched)
+    metrics.count("WindowResults", len(results))
+    metrics.count("WindowResultsFailed", len(unwritten))
+    metrics.count("LateRecords", aggregator.late - late_before)
+    logger.info(
+        f"Aggregated {enriched} states from {len(records)} records "
+        f"({len(event_records) - len(fresh)} already aggregated), "
+        f"{len(results) - len(unwritten)} window results emitted (watermark {aggregator.watermark})"
+    )
+    if unwritten:
+        # Voltam para a fila; o reenvio do lote tenta de novo sem somar os records outra vez
+        aggregator.requeue(unwritten)
+        raise RuntimeError(f"{len(unwritten)} window results could not be delivered")
+    return {"records": len(event_records), "enriched": enriched, "window_results": len(results)}
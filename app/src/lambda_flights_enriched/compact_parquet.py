@@ -0,0 +1,118 @@
+"""
+Compactação local dos dumps JSON do Firehose em Parquet particionado.
+
+Lê os objetos entregues pelo Firehose no S3 (baixados localmente: JSON
+concatenado ou um por linha, opcionalmente .gz) e arquivos Parquet pequenos
+gerados pela Lambda, e regrava tudo em arquivos maiores particionados por
+``dt=/hour=/continent=`` (veja utils/parquet_writer.py). Requer pyarrow.
+
+Uso:
+    python compact_parquet.py DUMP_DIR_OU_ARQUIVO... --output DIR|s3://bucket/prefixo
+        [--compression zstd|snappy|gzip|none] [--max-rows 500000] [--chunk-rows 50000]
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from utils.parquet_writer import COMPRESSIONS, ParquetPartitionWriter, is_available
+
+logger = logging.getLogger("compact_parquet")
+
+
+def input_files(paths: List[str]) -> Iterator[Path]:
+    """Every file under ``paths`` (directories are walked recursively), sorted."""
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(p for p in path.rglob("*") if p.is_file() and not p.name.startswith("."))
+        else:
+            yield path
+
+
+def read_json_objects(path: Path) -> Iterator[Dict[str, Any]]:
+    """JSON objects of a Firehose dump: concatenated (``}{``) or one per line."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    position, end = 0, len(text)
+    while position < end:
+        # Pula espaços/quebras de linha entre objetos
+        while position < end and text[position].isspace():
+            position += 1
+        if position >= end:
+            break
+        try:
+            obj, position = decoder.raw_decode(text, position)
+        except ValueError as e:
+            logger.warning(f"{path}: invalid JSON at offset {position} ({e}), skipping rest of file")
+            return
+        if isinstance(obj, dict):
+            yield obj
+
+
+def read_parquet_rows(path: Path) -> List[Dict[str, Any]]:
+    import pyarrow.parquet as pq
+
+    rows = pq.read_table(path).to_pylist()
+    # Timestamps voltam como datetime; o writer aceita ISO 8601
+    for row in rows:
+        for name, value in row.items():
+            if hasattr(value, "isoformat"):
+                row[name] = value.isoformat()
+    return rows
+
+
+def compact(paths: List[str], writer: ParquetPartitionWriter, chunk_rows: int = 50_000) -> int:
+    """Feed every record under ``paths`` to ``writer``; returns the record count."""
+    total = 0
+    chunk: List[Dict[str, Any]] = []
+    for path in input_files(paths):
+        if path.suffix == ".parquet":
+            records = read_parquet_rows(path)
+        else:
+            records = read_json_objects(path)
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_rows:
+                writer.add(chunk)
+                total += len(chunk)
+                chunk = []
+    if chunk:
+        writer.add(chunk)
+        total += len(chunk)
+    writer.flush()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--compression", default="zstd", choices=COMPRESSIONS)
+    parser.add_argument("--max-rows", type=int, default=500_000, help="rows buffered before writing files")
+    parser.add_argument("--chunk-rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    if not is_available():
+        raise SystemExit("pyarrow is not installed")
+
+    writer = ParquetPartitionWriter(args.output, compression=args.compression, max_rows=args.max_rows, logger=logger)
+    start = time.perf_counter()
+    total = compact(args.inputs, writer, args.chunk_rows)
+    elapsed = time.perf_counter() - start
+    input_bytes = sum(os.path.getsize(p) for p in input_files(args.inputs))
+    logger.info(
+        f"Compacted {total} records ({input_bytes / 1e6:.1f} MB input) into {writer.files_written} "
+        f"file(s) in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} records/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,68 @@
-import json
+import os
 import logging
-import base64
-from datetime import datetime, timezone
+from collections import Counter
+from utils.transform import FirehoseBatchTransformer
+from utils.geo import GeoEnricher
+from utils.airports import AirportEnricher
+from utils.metrics import Metrics
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Métricas por etapa em CloudWatch EMF (METRICS_ENABLED); desligadas, os
+# timers são no-op
+metrics = Metrics.from_env()
+
+# Enriquecimento geográfico: código ISO/continente do país de origem (CSV
+# empacotado) e país sobrevoado (GEO_BOUNDARIES_PATH); índices carregados uma
+# vez por container
+geo_enricher = GeoEnricher.from_env(logger=logger)
+
+# Aeroporto mais próximo (KD-tree sobre AIRPORTS_PATH) e fase do voo
+airport_enricher = AirportEnricher.from_env(logger=logger)
+
+# Saída Parquet particionada (dt=/hour=/continent=) em PARQUET_OUTPUT_URI, ao
+# lado do JSON entregue pelo Firehose; o pyarrow só é importado se configurada
+parquet_writer = None
+if os.environ.get("PARQUET_OUTPUT_URI"):
+    from utils.parquet_writer import ParquetPartitionWriter
+    parquet_writer = ParquetPartitionWriter.from_env(logger=logger)
+
+# Transformação em lote: um parse por invocação, event_time único por lote e
+# serializador rápido (orjson se instalado, senão json)
+transformer = FirehoseBatchTransformer(
+    os.environ.get("SERIALIZER_BACKEND") or None,
+    logger=logger,
+    enrichers=(geo_enricher, airport_enricher),
+    metrics=metrics,
+    sinks=[parquet_writer] if parquet_writer is not None else [],
+)
+
+
+@metrics.handler
 def lambda_handler(event, context):
-    output = []
-
-    for record in event["records"]:
-        raw = record["data"]
-        rec_data = json.loads(
-            base64.b64decode(raw).decode("utf-8")
-        )
-
-        if rec_data.get("latitude") is None or rec_data.get("longitude") is None:
-            result = {
-                "recordId:": record["recordId"],
-                "result": "Dropped"
-            }
-        else:
-            rec_enriched = {
-                "icao24":         rec_data.get("icao24"),
-                "callsign":       rec_data.get("callsign"),
-                "origin_country": rec_data.get("origin_country"),
-                "latitude":       rec_data.get("latitude"),
-                "longitude":      rec_data.get("longitude"),
-                "altitude":       rec_data.get("altitude"),
-                "velocity":       rec_data.get("velocity"),
-                "heading":        rec_data.get("heading"),
-                "last_contact":   rec_data.get("last_contact"),
-                "event_time":     datetime.now(timezone.utc).isoformat(),
-                "location":       f"{rec_data.get('latitude')},{rec_data.get('longitude')}"
-            }
-            result = {
-                "recordId:": record["recordId"],
-                "result": "Ok",
-                "data": base64.b64encode(json.dumps(rec_enriched).encode("utf-8")).decode("utf-8")
-            }
-
-        output.append(result)
+    # Records agregados (KPL) trazem vários estados; os enriquecidos
+    # voltam no mesmo recordId, um JSON por linha
+    output = transformer.transform(event["records"])
+    if parquet_writer is not None:
+        # Um arquivo por partição e invocação; falha aqui não devolve o lote ao
+        # Firehose (o JSON já está pronto), só é registrada
+        try:
+            with metrics.timer("ParquetWriteMs"):
+                parquet_writer.flush()
+        except Exception as e:
+            metrics.count("ParquetWriteErrors")
+            logger.error(f"Failed to write Parquet output: {e}")
+    if metrics.enabled:
+        results = Counter(record["result"] for record in output)
+        metrics.count("RecordsIn", len(event["records"]))
+        metrics.count("RecordsOk", results["Ok"])
+        metrics.count("RecordsDropped", results["Dropped"])
+        metrics.count("RecordsFailed", results["ProcessingFailed"])
 
     if not output:
         logger.info("No records to send to output stream")
         return
     else:
         logger.info(f"Enriquecimento concluído, preparando para enviar {len(output)} registros")
-        return {"records": output}
\ No newline at end of file
+        return {"records": output}
@@ -0,0 +1,70 @@
+"""
+Consumidor Kinesis que mantém a última posição de cada aeronave no DynamoDB.
+
+Mesmo pacote da Lambda flights_enriched, com outro handler
+(``positions_function.lambda_handler``) ligado ao stream de estados por um
+event source mapping. Os records são decodificados como na transformação do
+Firehose (KPL agregado ou não, só estados com posição) e vão para o
+LatestPositionWriter (utils/positions.py): um item por icao24 na tabela de
+DYNAMODB_TABLE, só quando o last_contact é mais novo que o já gravado.
+
+Sem enriquecimento: a consulta "onde está a aeronave X" só precisa da
+posição, e itens menores custam menos WCU. O cache de last_contact vive no
+container quente; com PARTITION_STRATEGY icao24/balanced na ingestão uma
+aeronave fica sempre no mesmo shard, então um container só concorre com ele
+mesmo. Com outras estratégias use POSITIONS_WRITE_MODE=conditional.
+
+Variáveis: DYNAMODB_TABLE, POSITIONS_WRITE_MODE (``batch``/``conditional``),
+POSITIONS_MIN_INTERVAL_S, POSITIONS_TTL_S, POSITIONS_MAX_WORKERS.
+"""
+
+import logging
+import os
+
+from utils.transform import FirehoseBatchTransformer
+from utils.metrics import Metrics
+from utils.positions import LatestPositionWriter
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+metrics = Metrics.from_env()
+
+# Buffer e cache de last_contact: vivem no container quente entre invocações
+writer = LatestPositionWriter.from_env(logger=logger)
+
+transformer = FirehoseBatchTransformer(
+    os.environ.get("SERIALIZER_BACKEND") or None,
+    logger=logger,
+    metrics=metrics,
+    sinks=[writer] if writer is not None else [],
+)
+
+
+@metrics.handler
+def lambda_handler(event, context):
+    if writer is None:
+        raise RuntimeError("DYNAMODB_TABLE environment variable is not set")
+
+    # Records do event source mapping do Kinesis (base64, KPL agregado ou não)
+    records = [{"data": record["kinesis"]["data"]} for record in event.get("Records", [])]
+    positioned = transformer.collect(records)
+    with metrics.timer("DynamoWriteMs"):
+        report = writer.flush()
+
+    metrics.count("RecordsIn", len(records))
+    metrics.count("PositionsReceived", report.received)
+    metrics.count("PositionsSkipped", report.deduplicated + report.skipped + report.conditional_skipped)
+    metrics.count("PositionsWritten", report.written)
+    metrics.count("PositionsFailed", report.failed)
+    metrics.count("DynamoRetries", report.retries)
+    logger.info(
+        f"{positioned} positioned states from {len(records)} records: {report.written} written, "
+        f"{report.deduplicated} duplicates, {report.skipped} not newer, "
+        f"{report.conditional_skipped} rejected by condition, {report.failed} failed "
+        f"({report.requests} requests, {report.elapsed_ms:.0f} ms)"
+    )
+    if report.failed:
+        # Falha o lote: o event source mapping reenvia os records (o cache evita regravar o resto)
+        raise RuntimeError(f"{report.failed} positions could not be written to '{writer.table_name}'")
+    return {"records": len(records), "positions": positioned, "written": report.written}
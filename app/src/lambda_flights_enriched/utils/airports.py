@@ -0,0 +1,282 @@
+"""
+Nearest-airport lookup and flight-phase classification for the enrichment stage.
+
+Airports come from an OurAirports-format CSV (``airports.csv``) and are
+indexed once per container in a static KD-tree over unit-sphere (x, y, z)
+coordinates, so nearest-neighbour queries are O(log n) and behave the same
+near the poles and the antimeridian.
+"""
+
+import csv
+import math
+import os
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Iterable
+
+EARTH_RADIUS_M = 6371008.8
+FEET_TO_METERS = 0.3048
+
+DEFAULT_AIRPORT_TYPES = ("large_airport", "medium_airport", "small_airport")
+
+# Limiares da classificação de fase (SI: m, m/s)
+TAXI_MAX_SPEED_MS = 30.0
+LEVEL_MAX_VERTICAL_RATE_MS = 2.5
+TERMINAL_MAX_HEIGHT_M = 1000.0
+TERMINAL_MAX_DISTANCE_M = 20000.0
+
+PHASES = ("taxi", "roll", "takeoff", "climb", "cruise", "descent", "landing")
+
+
+@dataclass(slots=True)
+class AirportPoint:
+    """
+    Entry of the nearest-airport index (an OurAirports CSV row).
+
+    Not the ``Airport`` model of lambda_flights_raw/utils/models.py: each
+    Lambda is packaged on its own, so the enriched one cannot import it.
+    """
+
+    icao: str
+    iata: Optional[str] = None
+    name: Optional[str] = None
+    city: Optional[str] = None
+    country: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    altitude: Optional[float] = None  # in meters
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_meters(chord_sq: float) -> float:
+    """Great-circle distance for a squared chord length on the unit sphere."""
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(chord_sq) / 2))
+
+
+def load_ourairports_csv(path, types: Optional[Iterable[str]] = DEFAULT_AIRPORT_TYPES) -> List[AirportPoint]:
+    """Airports of the given ``type`` values from an OurAirports ``airports.csv``."""
+    allowed = set(types) if types else None
+    airports = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if allowed is not None and row.get("type") not in allowed:
+                continue
+            try:
+                lat = float(row["latitude_deg"])
+                lon = float(row["longitude_deg"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            elevation = row.get("elevation_ft")
+            airports.append(AirportPoint(
+                icao=row.get("icao_code") or row.get("gps_code") or row.get("ident") or "",
+                iata=row.get("iata_code") or None,
+                name=row.get("name") or None,
+                city=row.get("municipality") or None,
+                country=row.get("iso_country") or None,
+                latitude=lat,
+                longitude=lon,
+                altitude=float(elevation) * FEET_TO_METERS if elevation else None,
+            ))
+    return airports
+
+
+class AirportIndex:
+    """
+    Static KD-tree of airports on the unit sphere.
+
+    The tree is implicit: points are reordered so the node of every
+    ``[lo, hi)`` range sits at its middle, split on the axis stored in
+    ``_axes``. No per-node objects are allocated.
+    """
+
+    def __init__(self, airports: Sequence[AirportPoint]):
+        points = [
+            (*_unit_vector(a.latitude, a.longitude), a)
+            for a in airports
+            if a.latitude is not None and a.longitude is not None
+        ]
+        self._axes = [0] * len(points)
+        self._build(points, 0, len(points))
+        self._xs = [p[0] for p in points]
+        self._ys = [p[1] for p in points]
+        self._zs = [p[2] for p in points]
+        self.airports: List[AirportPoint] = [p[3] for p in points]
+
+    def __len__(self) -> int:
+        return len(self.airports)
+
+    @classmethod
+    def from_csv(cls, path, types: Optional[Iterable[str]] = DEFAULT_AIRPORT_TYPES) -> "AirportIndex":
+        return cls(load_ourairports_csv(path, types))
+
+    def _build(self, points: list, lo: int, hi: int) -> None:
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= 1:
+                continue
+            segment = points[lo:hi]
+            # Divide no eixo de maior extensão do trecho
+            spreads = [max(p[k] for p in segment) - min(p[k] for p in segment) for k in range(3)]
+            axis = spreads.index(max(spreads))
+            segment.sort(key=itemgetter(axis))
+            points[lo:hi] = segment
+            mid = (lo + hi) // 2
+            self._axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[AirportPoint, float]]:
+        """(airport, great-circle distance in meters) closest to the point, or None if empty."""
+        if not self.airports:
+            return None
+        query = _unit_vector(lat, lon)
+        qx, qy, qz = query
+        xs, ys, zs, axes = self._xs, self._ys, self._zs, self._axes
+        coords = (xs, ys, zs)
+        best = math.inf
+        best_index = -1
+        stack = [(0, len(xs), 0.0)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            lo, hi, bound = pop()
+            if bound >= best:
+                continue
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                dx = xs[mid] - qx
+                dy = ys[mid] - qy
+                dz = zs[mid] - qz
+                d2 = dx * dx + dy * dy + dz * dz
+                if d2 < best:
+                    best = d2
+                    best_index = mid
+                axis = axes[mid]
+                diff = query[axis] - coords[axis][mid]
+                # Desce pelo lado do ponto; o outro lado só é visitado se o
+                # plano de corte estiver mais perto que o melhor candidato
+                if diff < 0:
+                    if mid + 1 < hi and diff * diff < best:
+                        push((mid + 1, hi, diff * diff))
+                    hi = mid
+                else:
+                    if lo < mid and diff * diff < best:
+                        push((lo, mid, diff * diff))
+                    lo = mid + 1
+        return self.airports[best_index], _chord_to_meters(best)
+
+
+def flight_phase(
+    on_ground: Optional[bool],
+    altitude: Optional[float],
+    vertical_rate: Optional[float],
+    velocity: Optional[float],
+    height_above_airport: Optional[float] = None,
+    airport_distance: Optional[float] = None,
+) -> Optional[str]:
+    """
+    Phase of flight from a single state; None when there is not enough data.
+
+    On the ground: taxi below ``TAXI_MAX_SPEED_MS``, otherwise takeoff or
+    landing roll told apart by the sign of the vertical rate; without one the
+    direction is unknown and the phase is a neutral "roll".
+    Airborne close to and low over the nearest airport: takeoff when
+    climbing, landing when descending. Elsewhere: climb / descent / cruise
+    by vertical rate.
+    """
+    if on_ground:
+        if velocity is None or velocity < TAXI_MAX_SPEED_MS:
+            return "taxi"
+        # Sem taxa vertical não dá para saber se acelera ou freia
+        if vertical_rate is None or vertical_rate == 0:
+            return "roll"
+        return "takeoff" if vertical_rate > 0 else "landing"
+    if altitude is None and vertical_rate is None:
+        return None
+
+    rate = vertical_rate or 0.0
+    terminal = (
+        height_above_airport is not None
+        and airport_distance is not None
+        and height_above_airport < TERMINAL_MAX_HEIGHT_M
+        and airport_distance < TERMINAL_MAX_DISTANCE_M
+    )
+    if rate > LEVEL_MAX_VERTICAL_RATE_MS:
+        return "takeoff" if terminal else "climb"
+    if rate < -LEVEL_MAX_VERTICAL_RATE_MS:
+        return "landing" if terminal else "descent"
+    return "cruise"
+
+
+class AirportEnricher:
+    """Column-wise nearest-airport and flight-phase enrichment."""
+
+    FIELDS = ("nearest_airport_icao", "nearest_airport_iata", "nearest_airport_distance_m", "flight_phase")
+
+    def __init__(self, index: Optional[AirportIndex] = None):
+        self.index = index
+
+    @classmethod
+    def from_env(cls, environ=None, logger=None) -> "AirportEnricher":
+        """Index from ``AIRPORTS_PATH`` (types in ``AIRPORT_TYPES``, comma separated), if set."""
+        environ = os.environ if environ is None else environ
+        path = environ.get("AIRPORTS_PATH")
+        index = None
+        if path:
+            types = [t.strip() for t in environ.get("AIRPORT_TYPES", "").split(",") if t.strip()]
+            try:
+                index = AirportIndex.from_csv(path, types or DEFAULT_AIRPORT_TYPES)
+            except (OSError, ValueError, KeyError) as e:
+                if logger is not None:
+                    logger.error(f"Failed to load airports from {path}: {e}")
+        return cls(index)
+
+    def columns(self, states: Sequence[Dict[str, Any]]) -> List[List[Any]]:
+        """Values for ``FIELDS``, one column per field."""
+        icao: List[Optional[str]] = []
+        iata: List[Optional[str]] = []
+        distance: List[Optional[float]] = []
+        phase: List[Optional[str]] = []
+        nearest = self.index.nearest if self.index is not None and len(self.index) else None
+
+        for state in states:
+            altitude = state.get("altitude")
+            found = None
+            if nearest is not None:
+                try:
+                    found = nearest(state["latitude"], state["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    found = None
+            if found is None:
+                icao.append(None)
+                iata.append(None)
+                distance.append(None)
+                height = airport_distance = None
+            else:
+                airport, airport_distance = found
+                icao.append(airport.icao or None)
+                iata.append(airport.iata)
+                distance.append(round(airport_distance, 1))
+                height = (
+                    altitude - (airport.altitude or 0.0)
+                    if isinstance(altitude, (int, float)) else None
+                )
+            try:
+                phase.append(flight_phase(
+                    state.get("on_ground"),
+                    altitude,
+                    state.get("vertical_rate"),
+                    state.get("velocity"),
+                    height,
+                    airport_distance,
+                ))
+            except TypeError:
+                phase.append(None)
+        return [icao, iata, distance, phase]
@@ -0,0 +1,46 @@
+"""Small helpers shared by the enriched-state consumers (windows, positions)."""
+
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# Erros em que vale tentar de novo: throughput, falha transitória do serviço
+# ou da conexão (a mesma lista de utils/sender.py na Lambda de ingestão, mais
+# o limite de requisições da conta do DynamoDB)
+RETRYABLE_ERROR_CODES = frozenset({
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+    "ThrottlingException",
+    "KMSThrottlingException",
+    "InternalFailure",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "EndpointConnectionError",
+    "ConnectionClosedError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+})
+
+
+def epoch(value: Any) -> Optional[float]:
+    """Epoch seconds of an ISO 8601 string (StateVector.to_dict) or a number; None if unparseable."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    # Sem fuso = UTC
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def error_code(error: Exception) -> str:
+    """Service error code of a botocore ClientError (``response["Error"]["Code"]``), else the exception name."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") or type(error).__name__
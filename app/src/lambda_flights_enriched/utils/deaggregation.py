@@ -0,0 +1,82 @@
+"""De-aggregation of KPL aggregated Kinesis records (see lambda_flights_raw/utils/aggregation.py)."""
+
+import hashlib
+from typing import List, Tuple
+
+KPL_MAGIC = b"\xf3\x89\x9a\xc2"
+DIGEST_SIZE = 16
+
+
+def is_aggregated(data: bytes) -> bool:
+    """Whether ``data`` is a KPL aggregated record (magic prefix and valid md5)."""
+    if len(data) <= len(KPL_MAGIC) + DIGEST_SIZE or not data.startswith(KPL_MAGIC):
+        return False
+    body = data[len(KPL_MAGIC):-DIGEST_SIZE]
+    return hashlib.md5(body).digest() == data[-DIGEST_SIZE:]
+
+
+def _read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _fields(buf: bytes):
+    """Yield (field_number, wire_type, value) for a protobuf message."""
+    pos = 0
+    end = len(buf)
+    while pos < end:
+        key, pos = _read_varint(buf, pos)
+        field_number, wire_type = key >> 3, key & 0x07
+        if wire_type == 0:
+            value, pos = _read_varint(buf, pos)
+        elif wire_type == 2:
+            length, pos = _read_varint(buf, pos)
+            value = buf[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            value = buf[pos:pos + 8]
+            pos += 8
+        elif wire_type == 5:
+            value = buf[pos:pos + 4]
+            pos += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield field_number, wire_type, value
+
+
+def deaggregate_with_keys(data: bytes) -> List[Tuple[str, bytes]]:
+    """(partition_key, data) of each user record; non-aggregated data is returned as is."""
+    if not is_aggregated(data):
+        return [("", data)]
+
+    partition_keys: List[str] = []
+    records: List[Tuple[int, bytes]] = []
+    for field_number, _, value in _fields(data[len(KPL_MAGIC):-DIGEST_SIZE]):
+        if field_number == 1:
+            partition_keys.append(value.decode("utf-8"))
+        elif field_number == 3:
+            key_index = 0
+            payload = b""
+            for sub_field, _, sub_value in _fields(value):
+                if sub_field == 1:
+                    key_index = sub_value
+                elif sub_field == 3:
+                    payload = sub_value
+            records.append((key_index, payload))
+
+    return [
+        (partition_keys[index] if index < len(partition_keys) else "", payload)
+        for index, payload in records
+    ]
+
+
+def deaggregate(data: bytes) -> List[bytes]:
+    """User record payloads contained in ``data`` (a single item when not aggregated)."""
+    return [payload for _, payload in deaggregate_with_keys(data)]
@@ -0,0 +1,308 @@
+"""
+Geospatial lookups for the enrichment stage.
+
+- ``CountryTable``: ISO code / continent of ``origin_country`` from the bundled
+  countries CSV (OurAirports format), with aliases for the names OpenSky uses.
+- ``RegionIndex``: country actually being overflown, from a boundaries GeoJSON,
+  through a grid-bucketed polygon index. Grid cells entirely inside one
+  country answer directly; only cells crossed by a border fall back to a
+  point-in-polygon test, and that test only looks at the edges in the
+  point's latitude band.
+"""
+
+import csv
+import json
+import math
+import os
+import unicodedata
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Iterable
+
+DEFAULT_COUNTRIES_CSV = Path(__file__).resolve().parent.parent / "data" / "countries.csv"
+
+# Nomes usados pela OpenSky (tabela de alocação ICAO) que não batem com o CSV
+COUNTRY_ALIASES = {
+    "Kingdom of the Netherlands": "NL",
+    "Republic of Korea": "KR",
+    "Democratic People's Republic of Korea": "KP",
+    "Russian Federation": "RU",
+    "Iran, Islamic Republic of": "IR",
+    "Islamic Republic of Iran": "IR",
+    "Viet Nam": "VN",
+    "Republic of Moldova": "MD",
+    "Syrian Arab Republic": "SY",
+    "Lao People's Democratic Republic": "LA",
+    "Brunei Darussalam": "BN",
+    "Libyan Arab Jamahiriya": "LY",
+    "United Republic of Tanzania": "TZ",
+    "The former Yugoslav Republic of Macedonia": "MK",
+    "Micronesia, Federated States of": "FM",
+    "Cote d'Ivoire": "CI",
+    "Congo": "CG",
+    "Cabo Verde": "CV",
+    "Swaziland": "SZ",
+    "Türkiye": "TR",
+    "Czechia": "CZ",
+    "Bolivia, Plurinational State of": "BO",
+    "Venezuela, Bolivarian Republic of": "VE",
+    "United States of America": "US",
+    "United Kingdom of Great Britain and Northern Ireland": "GB",
+}
+
+# Propriedades com o código ISO nos GeoJSON mais comuns (Natural Earth, geoBoundaries, ...)
+CODE_PROPERTIES = ("ISO_A2_EH", "ISO_A2", "iso_a2", "code", "iso_code", "ISO3166-1-Alpha-2")
+
+DEFAULT_CELL_DEGREES = 0.5
+
+Edge = Tuple[float, float, float, float]
+
+
+def _normalize(name: str) -> str:
+    """Case- and accent-insensitive key for country names."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold().strip()
+
+
+class CountryTable:
+    """Country name -> (ISO code, continent) lookup."""
+
+    def __init__(self, rows: Iterable[Tuple[str, str, str]], aliases: Optional[Dict[str, str]] = None):
+        self.by_code: Dict[str, Tuple[str, str]] = {}
+        self._by_name: Dict[str, Tuple[str, str]] = {}
+        for code, name, continent in rows:
+            self.by_code[code] = (code, continent)
+            self._by_name[_normalize(name)] = (code, continent)
+        for alias, code in (aliases or {}).items():
+            if code in self.by_code:
+                self._by_name.setdefault(_normalize(alias), self.by_code[code])
+        # Nomes exatos já vistos (evita normalizar de novo a cada lote)
+        self._cache: Dict[Optional[str], Tuple[Optional[str], Optional[str]]] = {None: (None, None)}
+
+    @classmethod
+    def from_csv(cls, path=DEFAULT_COUNTRIES_CSV, aliases: Optional[Dict[str, str]] = COUNTRY_ALIASES) -> "CountryTable":
+        """Load a countries CSV with ``code``, ``name`` and ``continent`` columns."""
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = [(r["code"], r["name"], r["continent"]) for r in csv.DictReader(f)]
+        return cls(rows, aliases)
+
+    def lookup(self, name: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(ISO code, continent) for a country name; (None, None) when unknown."""
+        found = self._cache.get(name)
+        if found is None:
+            found = self._by_name.get(_normalize(name), (None, None)) if isinstance(name, str) else (None, None)
+            self._cache[name] = found
+        return found
+
+    def continent_of(self, code: Optional[str]) -> Optional[str]:
+        entry = self.by_code.get(code)
+        return entry[1] if entry else None
+
+
+class _Polygon:
+    """One country (possibly multipolygon), with its edges bucketed by latitude band."""
+
+    __slots__ = ("code", "bbox", "rows")
+
+    def __init__(self, code: str, rings: List[List[Sequence[float]]], cell: float):
+        self.code = code
+        self.rows: Dict[int, List[Edge]] = {}
+        min_x = min_y = math.inf
+        max_x = max_y = -math.inf
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                if y1 == y2 and x1 == x2:
+                    continue
+                edge = (x1, y1, x2, y2)
+                for row in range(_cell(min(y1, y2), cell), _cell(max(y1, y2), cell) + 1):
+                    self.rows.setdefault(row, []).append(edge)
+                min_x, max_x = min(min_x, x1), max(max_x, x1)
+                min_y, max_y = min(min_y, y1), max(max_y, y1)
+        self.bbox = (min_x, min_y, max_x, max_y)
+
+    def contains(self, lon: float, lat: float, row: int) -> bool:
+        """Even-odd ray casting (eastward), using only the edges of the point's band."""
+        inside = False
+        for x1, y1, x2, y2 in self.rows.get(row, ()):
+            if (y1 > lat) != (y2 > lat) and lon < x1 + (lat - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+
+def _cell(value: float, cell: float) -> int:
+    return math.floor(value / cell)
+
+
+def _rings(geometry: Dict[str, Any]) -> List[List[Sequence[float]]]:
+    """All rings (outer and holes) of a Polygon/MultiPolygon, without the closing vertex."""
+    if geometry is None:
+        return []
+    kind = geometry.get("type")
+    if kind == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif kind == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        return []
+    rings = []
+    for polygon in polygons:
+        for ring in polygon:
+            points = [tuple(p[:2]) for p in ring]
+            if len(points) > 1 and points[0] == points[-1]:
+                points.pop()
+            if len(points) >= 3:
+                rings.append(points)
+    return rings
+
+
+class RegionIndex:
+    """
+    Grid-bucketed point-in-country index.
+
+    Every grid cell maps either to a single country code (cell entirely
+    inside it), to nothing (ocean), or to the candidate polygons whose
+    borders cross it.
+    """
+
+    def __init__(self, polygons: List[_Polygon], cell: float = DEFAULT_CELL_DEGREES):
+        self.cell = cell
+        self.polygons = polygons
+        self.interior: Dict[Tuple[int, int], str] = {}
+        self.boundary: Dict[Tuple[int, int], List[_Polygon]] = {}
+        for polygon in polygons:
+            self._index(polygon)
+
+    @classmethod
+    def from_geojson(cls, path, cell: float = DEFAULT_CELL_DEGREES, code_property: Optional[str] = None) -> "RegionIndex":
+        """Build the index from a FeatureCollection of country (Multi)Polygons with an ISO code property."""
+        with open(path, "r", encoding="utf-8") as f:
+            collection = json.load(f)
+        keys = (code_property,) if code_property else CODE_PROPERTIES
+        polygons = []
+        for feature in collection.get("features", []):
+            properties = feature.get("properties") or {}
+            code = next((properties[k] for k in keys if properties.get(k) not in (None, "", "-99")), None)
+            rings = _rings(feature.get("geometry"))
+            if code and rings:
+                polygons.append(_Polygon(str(code), rings, cell))
+        return cls(polygons, cell)
+
+    def _index(self, polygon: _Polygon) -> None:
+        cell = self.cell
+        # Células tocadas por alguma aresta (bbox inclusivo da aresta: conservador)
+        crossed: Dict[int, set] = {}
+        for edges in polygon.rows.values():
+            for x1, y1, x2, y2 in edges:
+                for row in range(_cell(min(y1, y2), cell), _cell(max(y1, y2), cell) + 1):
+                    crossed.setdefault(row, set()).update(
+                        range(_cell(min(x1, x2), cell), _cell(max(x1, x2), cell) + 1)
+                    )
+        for row, cols in crossed.items():
+            for col in cols:
+                self.boundary.setdefault((row, col), []).append(polygon)
+
+        # Células sem aresta estão inteiras dentro ou fora; numa linha, o estado
+        # só muda ao atravessar uma célula de fronteira, então basta um teste
+        # por trecho contínuo de células livres
+        min_x, min_y, max_x, max_y = polygon.bbox
+        first_col, last_col = _cell(min_x, cell), _cell(max_x, cell)
+        for row in range(_cell(min_y, cell), _cell(max_y, cell) + 1):
+            row_crossed = crossed.get(row, ())
+            col = first_col
+            while col <= last_col:
+                if col in row_crossed:
+                    col += 1
+                    continue
+                start = col
+                while col <= last_col and col not in row_crossed:
+                    col += 1
+                center_lon = (start + 0.5) * cell
+                center_lat = (row + 0.5) * cell
+                if polygon.contains(center_lon, center_lat, _cell(center_lat, cell)):
+                    for inside in range(start, col):
+                        self.interior[(row, inside)] = polygon.code
+
+    def lookup(self, lon: float, lat: float) -> Optional[str]:
+        """ISO code of the country containing the point, or None (ocean / not covered)."""
+        cell = self.cell
+        row = _cell(lat, cell)
+        key = (row, _cell(lon, cell))
+        code = self.interior.get(key)
+        if code is not None:
+            return code
+        for polygon in self.boundary.get(key, ()):
+            if polygon.contains(lon, lat, row):
+                return polygon.code
+        return None
+
+    def lookup_many(self, lons: Sequence[Any], lats: Sequence[Any]) -> List[Optional[str]]:
+        """``lookup`` for columns of coordinates; non-numeric entries give None."""
+        cell = self.cell
+        interior = self.interior
+        boundary = self.boundary
+        floor = math.floor
+        out: List[Optional[str]] = []
+        append = out.append
+        for lon, lat in zip(lons, lats):
+            try:
+                row = floor(lat / cell)
+                key = (row, floor(lon / cell))
+            except (TypeError, ValueError, OverflowError):
+                append(None)
+                continue
+            code = interior.get(key)
+            if code is None:
+                for polygon in boundary.get(key, ()):
+                    if polygon.contains(lon, lat, row):
+                        code = polygon.code
+                        break
+            append(code)
+        return out
+
+
+class GeoEnricher:
+    """Column-wise geo enrichment: origin country code/continent and overflown country/continent."""
+
+    FIELDS = ("origin_country_code", "origin_continent", "overflown_country_code", "overflown_continent")
+
+    def __init__(self, countries: CountryTable, regions: Optional[RegionIndex] = None):
+        self.countries = countries
+        self.regions = regions
+
+    @classmethod
+    def from_env(cls, environ=None, logger=None) -> "GeoEnricher":
+        """
+        Bundled countries CSV (or ``GEO_COUNTRIES_PATH``) plus, when
+        ``GEO_BOUNDARIES_PATH`` is set, the overflown-country index
+        (cell size ``GEO_INDEX_CELL_DEGREES``).
+        """
+        environ = os.environ if environ is None else environ
+        countries = CountryTable.from_csv(environ.get("GEO_COUNTRIES_PATH") or DEFAULT_COUNTRIES_CSV)
+        regions = None
+        boundaries = environ.get("GEO_BOUNDARIES_PATH")
+        if boundaries:
+            try:
+                regions = RegionIndex.from_geojson(
+                    boundaries, float(environ.get("GEO_INDEX_CELL_DEGREES", DEFAULT_CELL_DEGREES))
+                )
+            except (OSError, ValueError) as e:
+                if logger is not None:
+                    logger.error(f"Failed to load boundaries from {boundaries}: {e}")
+        return cls(countries, regions)
+
+    def columns(self, states: Sequence[Dict[str, Any]]) -> List[List[Optional[str]]]:
+        """Values for ``FIELDS``, one column per field."""
+        origin_countries = [s.get("origin_country") for s in states]
+        lookup = self.countries.lookup
+        origin = {name: lookup(name) for name in set(origin_countries)}
+        origin_code = [origin[name][0] for name in origin_countries]
+        origin_continent = [origin[name][1] for name in origin_countries]
+
+        if self.regions is None:
+            overflown = [None] * len(states)
+        else:
+            overflown = self.regions.lookup_many(
+                [s.get("longitude") for s in states], [s.get("latitude") for s in states]
+            )
+        continent_of = self.countries.continent_of
+        continents = {code: continent_of(code) for code in set(overflown)}
+        return [origin_code, origin_continent, overflown, [continents[code] for code in overflown]]
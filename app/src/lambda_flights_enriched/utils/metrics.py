@@ -0,0 +1,180 @@
+"""
+Stage timers and counters emitted as CloudWatch Embedded Metric Format (EMF).
+
+Os valores são acumulados durante a invocação e escritos como uma única
+linha JSON no stdout ao final (``flush``); o CloudWatch Logs extrai as
+métricas sem chamadas PutMetricData. Desligado (padrão), ``timer`` devolve
+um context manager vazio compartilhado e ``count`` retorna de imediato.
+
+Mesmo módulo em lambda_flights_raw e lambda_flights_enriched (cada Lambda é
+empacotada separadamente).
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, Callable
+
+DEFAULT_NAMESPACE = "FlightRadar"
+
+MILLISECONDS = "Milliseconds"
+COUNT = "Count"
+BYTES = "Bytes"
+
+# O EMF aceita no máximo 100 métricas por diretiva
+_MAX_METRICS = 100
+
+
+class _NoopTimer:
+    """Shared no-op context manager used while metrics are disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self.metrics = metrics
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = self.metrics.clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.put(self.name, (self.metrics.clock() - self.start) * 1000, MILLISECONDS)
+        return False
+
+
+class Metrics:
+    """
+    Per-invocation metric accumulator.
+
+    ``timer(name)`` adds the elapsed milliseconds of a block to ``name``,
+    ``count(name, n)`` adds to a counter; repeated values of the same metric
+    in one invocation are summed. ``handler`` wraps a Lambda handler to time
+    the whole invocation and flush at the end, even on error.
+    """
+
+    def __init__(
+        self,
+        namespace: str = DEFAULT_NAMESPACE,
+        dimensions: Optional[Dict[str, str]] = None,
+        enabled: bool = False,
+        stream=None,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        self.namespace = namespace
+        self.dimensions = dict(dimensions or {})
+        self.enabled = enabled
+        self.stream = stream
+        self.clock = clock
+        self.values: Dict[str, float] = {}
+        self.units: Dict[str, str] = {}
+        # O poller mede o download e o envio em threads diferentes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, environ=None) -> 'Metrics':
+        """``METRICS_ENABLED`` turns emission on; ``METRICS_NAMESPACE`` overrides the namespace."""
+        environ = os.environ if environ is None else environ
+        return cls(
+            namespace=environ.get("METRICS_NAMESPACE") or DEFAULT_NAMESPACE,
+            dimensions={"FunctionName": environ.get("AWS_LAMBDA_FUNCTION_NAME") or "local"},
+            enabled=environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes"),
+        )
+
+    def timer(self, name: str):
+        """Context manager adding the block's duration (ms) to ``name``."""
+        if not self.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name: str):
+        """Decorator form of ``timer``."""
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, name: str, value: float = 1, unit: str = COUNT) -> None:
+        if self.enabled:
+            self.put(name, value, unit)
+
+    def put(self, name: str, value: float, unit: str = COUNT) -> None:
+        with self._lock:
+            values = self.values
+            if name in values:
+                values[name] += value
+            elif len(values) < _MAX_METRICS:
+                values[name] = value
+                self.units[name] = unit
+
+    def document(self, timestamp_ms: Optional[int] = None) -> Dict[str, Any]:
+        """EMF document for the accumulated values."""
+        doc: Dict[str, Any] = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000) if timestamp_ms is None else timestamp_ms,
+                "CloudWatchMetrics": [{
+                    "Namespace": self.namespace,
+                    "Dimensions": [list(self.dimensions)],
+                    "Metrics": [{"Name": name, "Unit": self.units[name]} for name in self.values],
+                }],
+            },
+        }
+        doc.update(self.dimensions)
+        for name, value in self.values.items():
+            doc[name] = round(value, 3) if isinstance(value, float) else value
+        return doc
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Write the EMF line (when enabled and there is something to report) and reset."""
+        with self._lock:
+            if not self.enabled or not self.values:
+                self.values.clear()
+                return None
+            doc = self.document()
+            self.values = {}
+            self.units = {}
+        stream = self.stream or sys.stdout
+        # Linha JSON pura: o formato do logger (prefixos) impediria a extração
+        stream.write(json.dumps(doc, separators=(",", ":")) + "\n")
+        stream.flush()
+        return doc
+
+    def handler(self, func):
+        """Decorator for a Lambda handler: ``InvocationMs`` plus flush at the end."""
+
+        @functools.wraps(func)
+        def wrapper(event, context):
+            if not self.enabled:
+                return func(event, context)
+            try:
+                with _Timer(self, "InvocationMs"):
+                    return func(event, context)
+            finally:
+                self.flush()
+
+        return wrapper
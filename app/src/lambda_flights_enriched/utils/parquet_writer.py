@@ -0,0 +1,267 @@
+"""
+Partitioned Parquet output for enriched states (optional pyarrow).
+
+Records are buffered column-wise per Hive partition
+``dt=YYYY-MM-DD/hour=HH/continent=XX`` (observation time from
+``last_contact``, continent from ``origin_continent``) and written as one
+Parquet file per partition on ``flush``, with dictionary encoding for the
+repetitive string columns and zstd/snappy compression.
+"""
+
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Iterable
+
+try:
+    import pyarrow as pa
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende do layer da Lambda
+    pa = None
+
+# Tipos das colunas: os mesmos de StateVector (lambda_flights_raw/utils/models.py)
+# mais os campos do enriquecimento. Campos fora desta tabela não são gravados
+COLUMN_TYPES = {
+    "icao24": "string",
+    "callsign": "string",
+    "origin_country": "string",
+    "time_position": "timestamp",
+    "last_contact": "timestamp",
+    "longitude": "double",
+    "latitude": "double",
+    "altitude": "double",
+    "on_ground": "bool",
+    "velocity": "double",
+    "heading": "double",
+    "vertical_rate": "double",
+    "geo_altitude": "double",
+    "squawk": "string",
+    "spi": "bool",
+    "position_source": "int8",
+    "event_time": "timestamp",
+    "location": "string",
+    "origin_country_code": "string",
+    "origin_continent": "string",
+    "overflown_country_code": "string",
+    "overflown_continent": "string",
+    "nearest_airport_icao": "string",
+    "nearest_airport_iata": "string",
+    "nearest_airport_distance_m": "double",
+    "flight_phase": "string",
+}
+
+# Colunas com poucos valores distintos por arquivo: dicionário + índices
+DICTIONARY_COLUMNS = (
+    "icao24", "callsign", "origin_country", "origin_country_code", "origin_continent",
+    "overflown_country_code", "overflown_continent", "nearest_airport_icao",
+    "nearest_airport_iata", "flight_phase", "squawk",
+)
+
+COMPRESSIONS = ("zstd", "snappy", "gzip", "none")
+UNKNOWN_PARTITION = "unknown"
+
+Partition = Tuple[str, str, str]
+
+
+def is_available() -> bool:
+    return pa is not None
+
+
+def _arrow_type(name: str):
+    return {
+        "string": pa.string(),
+        "double": pa.float64(),
+        "bool": pa.bool_(),
+        "int8": pa.int8(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[name]
+
+
+def arrow_schema(fields: Sequence[str]):
+    """pyarrow schema for the known ``fields``, in that order."""
+    return pa.schema([(name, _arrow_type(COLUMN_TYPES[name])) for name in fields if name in COLUMN_TYPES])
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    # ISO 8601 (StateVector.to_dict) ou epoch; sem fuso = UTC (horário da Lambda)
+    if value is None:
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value, tz=timezone.utc)
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+def _timestamps(values: Sequence[Any]) -> List[Optional[datetime]]:
+    # Um parse por valor distinto: event_time é único por lote e last_contact
+    # se repete entre as aeronaves do mesmo snapshot
+    parsed: Dict[Any, Optional[datetime]] = {}
+    out = []
+    for value in values:
+        if value not in parsed:
+            parsed[value] = _timestamp(value)
+        out.append(parsed[value])
+    return out
+
+
+def partition_of(time_value: Any, continent: Any) -> Partition:
+    """(dt, hour, continent) for an ISO timestamp (or epoch) and a continent code."""
+    if isinstance(time_value, str) and len(time_value) >= 13 and time_value[10] in "T ":
+        # Caminho rápido: o prefixo da string ISO já é a partição
+        dt, hour = time_value[:10], time_value[11:13]
+        if time_value[19:].lstrip(".0123456789"):
+            # Com fuso explícito (+00:00, -03:00, Z): converte para UTC
+            parsed = _timestamp(time_value)
+            if parsed is not None:
+                parsed = parsed.astimezone(timezone.utc)
+                dt, hour = parsed.strftime("%Y-%m-%d"), f"{parsed.hour:02d}"
+    else:
+        parsed = _timestamp(time_value)
+        if parsed is None:
+            dt = hour = UNKNOWN_PARTITION
+        else:
+            dt, hour = parsed.strftime("%Y-%m-%d"), f"{parsed.hour:02d}"
+    return dt, hour, continent if isinstance(continent, str) and continent else UNKNOWN_PARTITION
+
+
+class ParquetPartitionWriter:
+    """
+    Buffers enriched states and writes one Parquet file per partition.
+
+    ``root`` is a local directory or a pyarrow filesystem URI
+    (``s3://bucket/prefix``). ``add_columns`` takes column-wise data (what
+    FirehoseBatchTransformer computes), ``add`` takes row dicts (JSON dumps).
+    ``add_columns`` only buffers, so a write error never surfaces inside the
+    transformer; ``add`` flushes once the buffers pass ``max_rows`` rows.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        compression: str = "zstd",
+        time_field: str = "last_contact",
+        fallback_time_field: str = "event_time",
+        partition_field: str = "origin_continent",
+        max_rows: int = 500_000,
+        row_group_rows: int = 128 * 1024,
+        logger=None,
+    ):
+        if pa is None:
+            raise RuntimeError("pyarrow is not installed (required for Parquet output)")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}' (expected one of {COMPRESSIONS})")
+        if "://" in root:
+            self.filesystem, self.root = pafs.FileSystem.from_uri(root)
+        else:
+            self.filesystem, self.root = pafs.LocalFileSystem(), os.path.abspath(root)
+        self.compression = compression
+        self.time_field = time_field
+        self.fallback_time_field = fallback_time_field
+        self.partition_field = partition_field
+        self.max_rows = max_rows
+        self.row_group_rows = row_group_rows
+        self.logger = logger
+        self._buffers: Dict[Partition, Dict[str, list]] = {}
+        self._rows = 0
+        self.files_written = 0
+        self.rows_written = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def add_columns(self, fields: Sequence[str], columns: Sequence[Sequence[Any]]) -> None:
+        """Buffer rows given as one column per field (all columns the same length)."""
+        index = {name: i for i, name in enumerate(fields)}
+        if not columns or not len(columns[0]):
+            return
+        n = len(columns[0])
+        times = columns[index[self.time_field]] if self.time_field in index else [None] * n
+        fallback = columns[index[self.fallback_time_field]] if self.fallback_time_field in index else [None] * n
+        continents = columns[index[self.partition_field]] if self.partition_field in index else [None] * n
+
+        groups: Dict[Partition, List[int]] = {}
+        seen: Dict[Tuple[Any, Any], List[int]] = {}
+        for i, (ts, fb, continent) in enumerate(zip(times, fallback, continents)):
+            key = (ts if ts is not None else fb, continent)
+            rows = seen.get(key)
+            if rows is None:
+                rows = seen[key] = groups.setdefault(partition_of(*key), [])
+            rows.append(i)
+
+        kept = [(name, columns[i]) for name, i in index.items() if name in COLUMN_TYPES]
+        for partition, rows in groups.items():
+            buffer = self._buffers.setdefault(partition, {})
+            filled = len(next(iter(buffer.values()))) if buffer else 0
+            for name, column in kept:
+                values = buffer.get(name)
+                if values is None:
+                    # Coluna nova nesta partição: completa as linhas anteriores com nulos
+                    values = buffer[name] = [None] * filled
+                values.extend([column[i] for i in rows])
+            for name, values in buffer.items():
+                if len(values) < filled + len(rows):
+                    values.extend([None] * (filled + len(rows) - len(values)))
+        self._rows += n
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Buffer row dicts (e.g. the JSON objects delivered by Firehose)."""
+        rows = list(rows)
+        if not rows:
+            return
+        fields = [name for name in COLUMN_TYPES if any(name in row for row in rows[:100])]
+        fields += [name for name in COLUMN_TYPES if name not in fields and any(name in row for row in rows)]
+        self.add_columns(fields, [[row.get(name) for row in rows] for name in fields])
+        if self._rows >= self.max_rows:
+            self.flush()
+
+    def flush(self) -> List[str]:
+        """Write every buffered partition; returns the written paths."""
+        written = []
+        buffers, self._buffers, self._rows = self._buffers, {}, 0
+        for (dt, hour, continent), columns in buffers.items():
+            table = self._table(columns)
+            directory = f"{self.root}/dt={dt}/hour={hour}/continent={continent}"
+            path = f"{directory}/part-{int(time.time())}-{uuid.uuid4().hex[:12]}.parquet"
+            self.filesystem.create_dir(directory, recursive=True)
+            pq.write_table(
+                table,
+                path,
+                filesystem=self.filesystem,
+                compression=None if self.compression == "none" else self.compression,
+                use_dictionary=[name for name in DICTIONARY_COLUMNS if name in columns],
+                row_group_size=self.row_group_rows,
+            )
+            written.append(path)
+            self.files_written += 1
+            self.rows_written += table.num_rows
+        if written and self.logger is not None:
+            self.logger.info(f"Wrote {len(written)} Parquet file(s) under {self.root}")
+        return written
+
+    def _table(self, columns: Dict[str, list]):
+        schema = arrow_schema([name for name in COLUMN_TYPES if name in columns])
+        arrays = []
+        for field in schema:
+            values = columns[field.name]
+            if COLUMN_TYPES[field.name] == "timestamp":
+                values = _timestamps(values)
+            arrays.append(pa.array(values, type=field.type, from_pandas=True))
+        return pa.Table.from_arrays(arrays, schema=schema)
+
+    @classmethod
+    def from_env(cls, environ=None, logger=None) -> Optional['ParquetPartitionWriter']:
+        """Writer for ``PARQUET_OUTPUT_URI`` (compression ``PARQUET_COMPRESSION``), if set and pyarrow is installed."""
+        environ = os.environ if environ is None else environ
+        uri = environ.get("PARQUET_OUTPUT_URI")
+        if not uri:
+            return None
+        if pa is None:
+            if logger is not None:
+                logger.error("PARQUET_OUTPUT_URI is set but pyarrow is not installed; Parquet output disabled")
+            return None
+        return cls(uri, compression=environ.get("PARQUET_COMPRESSION", "zstd"), logger=logger)
@@ -0,0 +1,525 @@
+"""
+Latest position per aircraft in DynamoDB: one item per ``icao24``.
+
+Writes are cut down before they reach the table: a batch keeps only the
+newest state of each aircraft, and a per-container cache of the
+``last_contact`` already written skips states that are not newer (or newer
+by less than ``min_interval_s``). What is left goes out as parallel
+BatchWriteItem requests of 25 items; UnprocessedItems are resubmitted with
+exponential backoff and full jitter, like utils/sender.py in the ingestion
+Lambda. BatchWriteItem has no conditions, so the ``conditional`` mode uses
+PutItem with ``last_contact < :lc`` instead, for when several writers may
+hold the same aircraft (the cache only sees its own container's writes).
+
+Items carry ``geohash`` (``geohash_precision`` digits) and ``geohash_cell``
+(its first ``cell_precision`` digits), the partition key of the
+``geohash-index`` GSI. The index projects only the keys, so an update is
+written to it only when the aircraft changes cell (about 150 km at
+precision 3), not on every position; ``query_bbox`` queries the cells
+covering a bounding box, fetches the items with BatchGetItem and filters
+the exact box. ``expires_at`` (TTL) removes aircraft that stopped reporting.
+"""
+
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Optional, List, Dict, Any, Callable, Iterable, Sequence, Tuple
+
+from .common import RETRYABLE_ERROR_CODES, epoch, error_code
+
+WRITE_MODES = ("batch", "conditional")
+
+# Limites do BatchWriteItem / BatchGetItem
+MAX_ITEMS_PER_REQUEST = 25
+MAX_KEYS_PER_GET = 100
+
+GEOHASH_INDEX = "geohash-index"
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Atributos gravados além de id, last_contact, geohash, geohash_cell e expires_at
+ITEM_ATTRIBUTES = (
+    "callsign",
+    "origin_country",
+    "latitude",
+    "longitude",
+    "altitude",
+    "velocity",
+    "heading",
+)
+
+_CONDITION = "attribute_not_exists(last_contact) OR last_contact < :lc"
+
+
+def _spread(value: int) -> int:
+    # Intercala zeros entre os bits (até 32 bits)
+    value &= 0xFFFFFFFF
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    return (value | value << 1) & 0x5555555555555555
+
+
+def _cell_bits(precision: int) -> Tuple[int, int]:
+    bits = 5 * precision
+    return (bits + 1) // 2, bits // 2
+
+
+def _geohash_text(x: int, y: int, precision: int) -> str:
+    # O geohash começa pela longitude: com total ímpar de bits ela fica nos pares
+    if precision % 2:
+        code = _spread(x) | _spread(y) << 1
+    else:
+        code = _spread(x) << 1 | _spread(y)
+    return "".join(_BASE32[(code >> shift) & 31] for shift in range(5 * (precision - 1), -1, -5))
+
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 7) -> str:
+    """Geohash of a position (same cells as utils/geohash.py of the ingestion Lambda)."""
+    lon_bits, lat_bits = _cell_bits(precision)
+    x = min(max(int((longitude + 180.0) / 360.0 * (1 << lon_bits)), 0), (1 << lon_bits) - 1)
+    y = min(max(int((latitude + 90.0) / 180.0 * (1 << lat_bits)), 0), (1 << lat_bits) - 1)
+    return _geohash_text(x, y, precision)
+
+
+def bbox_cells(lat_min: float, lat_max: float, lon_min: float, lon_max: float, precision: int = 3) -> List[str]:
+    """
+    Geohash cells of ``precision`` digits covering a bounding box.
+
+    ``lon_min > lon_max`` is a box crossing the antimeridian.
+    """
+    lon_bits, lat_bits = _cell_bits(precision)
+    lon_cells, lat_cells = 1 << lon_bits, 1 << lat_bits
+
+    def lon_cell(lon):
+        return min(max(int((lon + 180.0) / 360.0 * lon_cells), 0), lon_cells - 1)
+
+    def lat_cell(lat):
+        return min(max(int((lat + 90.0) / 180.0 * lat_cells), 0), lat_cells - 1)
+
+    if lon_min <= lon_max:
+        xs = range(lon_cell(lon_min), lon_cell(lon_max) + 1)
+    else:
+        xs = list(range(lon_cell(lon_min), lon_cells)) + list(range(0, lon_cell(lon_max) + 1))
+    ys = range(lat_cell(min(lat_min, lat_max)), lat_cell(max(lat_min, lat_max)) + 1)
+    return [_geohash_text(x, y, precision) for x in xs for y in ys]
+
+
+def _attribute(value: Any) -> Optional[Dict[str, Any]]:
+    """DynamoDB typed value; None for missing/non-finite values (not written)."""
+    cls = value.__class__
+    if cls is str:
+        return {"S": value} if value else None
+    if cls is bool:
+        return {"BOOL": value}
+    if cls is int:
+        return {"N": str(value)}
+    if cls is float:
+        return {"N": repr(value)} if math.isfinite(value) else None
+    return None
+
+
+def _plain(item: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Typed item back to a plain dict."""
+    out = {}
+    for name, typed in item.items():
+        (kind, value), = typed.items()
+        if kind == "N":
+            out[name] = float(value) if any(c in value for c in ".eE") else int(value)
+        else:
+            out[name] = value
+    return out
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float, rng: random.Random) -> float:
+    """Exponential backoff with full jitter before retry number ``attempt`` (1-based)."""
+    return rng.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of one group of items (a BatchWriteItem request or a run of PutItem calls)."""
+
+    index: int
+    items: int
+    written: List[Tuple[str, float]] = field(default_factory=list)
+    conditional_skipped: List[Tuple[str, float]] = field(default_factory=list)
+    failed: int = 0
+    requests: int = 0
+    retries: int = 0
+    error_codes: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class WriteReport:
+    """Outcome of one ``flush``."""
+
+    received: int = 0
+    deduplicated: int = 0
+    skipped: int = 0
+    written: int = 0
+    conditional_skipped: int = 0
+    failed: int = 0
+    requests: int = 0
+    retries: int = 0
+    elapsed_ms: float = 0.0
+    error_codes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+
+class LatestPositionWriter:
+    """
+    Upserts the newest position of each aircraft.
+
+    ``add_columns(fields, columns)`` matches the transformer sink interface
+    (utils/transform.py) and ``add(rows)`` takes state dicts; both only
+    buffer. ``flush()`` writes the buffer and returns a ``WriteReport``.
+    The boto3 client is created on the first flush unless one is given.
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        client=None,
+        mode: str = "batch",
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 0.05,
+        max_delay: float = 1.0,
+        geohash_precision: int = 7,
+        cell_precision: int = 3,
+        ttl_s: int = 3600,
+        min_interval_s: float = 0.0,
+        cache_size: int = 200_000,
+        attributes: Sequence[str] = ITEM_ATTRIBUTES,
+        time_field: str = "last_contact",
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+        logger=None,
+    ):
+        if mode not in WRITE_MODES:
+            raise ValueError(f"Unknown write mode '{mode}' (expected one of {WRITE_MODES})")
+        if not 1 <= cell_precision <= geohash_precision <= 12:
+            raise ValueError("expected 1 <= cell_precision <= geohash_precision <= 12")
+        self.table_name = table_name
+        self._client = client
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.geohash_precision = geohash_precision
+        self.cell_precision = cell_precision
+        self.ttl_s = ttl_s
+        self.min_interval_s = min_interval_s
+        self.cache_size = cache_size
+        self.attributes = tuple(attributes)
+        if "latitude" not in self.attributes or "longitude" not in self.attributes:
+            raise ValueError("attributes must include latitude and longitude")
+        self._lat = self.attributes.index("latitude")
+        self._lon = self.attributes.index("longitude")
+        self.time_field = time_field
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.logger = logger
+        # icao24 -> (last_contact, valores de ``attributes``) do estado mais novo do lote
+        self._pending: Dict[str, Tuple[float, tuple]] = {}
+        # icao24 -> last_contact já gravado por este container (ordem de inserção = LRU)
+        self._written: Dict[str, float] = {}
+        self._received = 0
+        self._deduplicated = 0
+        self._skipped = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+
+            self._client = boto3.client("dynamodb")
+        return self._client
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        fields = ("icao24", self.time_field) + self.attributes
+        self.add_columns(fields, [[row.get(name) for row in rows] for name in fields])
+
+    def add_columns(self, fields: Sequence[str], columns: Sequence[Sequence[Any]]) -> None:
+        """Buffer the newest state of each aircraft that is newer than what this container wrote."""
+        if not columns or not len(columns[0]):
+            return
+        index = {name: i for i, name in enumerate(fields)}
+        n = len(columns[0])
+        if "latitude" not in index or "longitude" not in index:
+            raise ValueError("positions need the latitude and longitude columns")
+
+        def column(name):
+            return columns[index[name]] if name in index else [None] * n
+
+        # Um parse por valor distinto: last_contact se repete no mesmo snapshot
+        epochs: Dict[Any, Optional[float]] = {}
+        for value in column(self.time_field):
+            if value not in epochs:
+                epochs[value] = epoch(value)
+
+        icao24 = column("icao24")
+        times = column(self.time_field)
+        latitude = columns[index["latitude"]]
+        longitude = columns[index["longitude"]]
+        values = list(zip(*[column(name) for name in self.attributes]))
+        pending = self._pending
+        written = self._written
+        min_interval = self.min_interval_s
+        deduplicated = skipped = 0
+
+        for i in range(n):
+            key = icao24[i]
+            t = epochs[times[i]]
+            if not key or t is None or latitude[i] is None or longitude[i] is None:
+                continue
+            self._received += 1
+            previous = pending.get(key)
+            if previous is not None:
+                deduplicated += 1
+                if previous[0] >= t:
+                    continue
+            last = written.get(key)
+            if last is not None and (t <= last or t - last < min_interval):
+                skipped += 1
+                continue
+            pending[key] = (t, values[i])
+        self._deduplicated += deduplicated
+        self._skipped += skipped
+
+    def _item(self, key: str, t: float, values: tuple) -> Dict[str, Dict[str, Any]]:
+        item = {"id": {"S": key}, "last_contact": {"N": str(int(t))}}
+        for name, value in zip(self.attributes, values):
+            typed = _attribute(value)
+            if typed is not None:
+                item[name] = typed
+        geohash = geohash_encode(values[self._lat], values[self._lon], self.geohash_precision)
+        item["geohash"] = {"S": geohash}
+        item["geohash_cell"] = {"S": geohash[:self.cell_precision]}
+        if self.ttl_s:
+            item["expires_at"] = {"N": str(int(t + self.ttl_s))}
+        return item
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (1-based)."""
+        return backoff_delay(attempt, self.base_delay, self.max_delay, self.rng)
+
+    def flush(self) -> WriteReport:
+        """Write the buffered positions; returns the report (counters since the previous flush)."""
+        start = time.perf_counter()
+        report = WriteReport(received=self._received, deduplicated=self._deduplicated, skipped=self._skipped)
+        pending, self._pending = self._pending, {}
+        self._received = self._deduplicated = self._skipped = 0
+
+        items = [(key, t, self._item(key, t, values)) for key, (t, values) in pending.items()]
+        groups = [items[i:i + MAX_ITEMS_PER_REQUEST] for i in range(0, len(items), MAX_ITEMS_PER_REQUEST)]
+        write = self._write_batch if self.mode == "batch" else self._write_conditional
+        if self.max_workers == 1 or len(groups) <= 1:
+            results = [write(i, group) for i, group in enumerate(groups)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as pool:
+                results = list(pool.map(write, range(len(groups)), groups))
+
+        for result in results:
+            # Só o que foi aceito entra no cache: o que falhou volta com o próximo estado
+            for key, t in result.written + result.conditional_skipped:
+                self._remember(key, t)
+            report.written += len(result.written)
+            report.conditional_skipped += len(result.conditional_skipped)
+            report.failed += result.failed
+            report.requests += result.requests
+            report.retries += result.retries
+            for code, count in result.error_codes.items():
+                report.error_codes[code] = report.error_codes.get(code, 0) + count
+        if report.failed and self.logger is not None:
+            self.logger.error(
+                f"{report.failed} of {len(items)} positions were not written to '{self.table_name}' "
+                f"after {self.max_attempts} attempts: {report.error_codes}"
+            )
+        report.elapsed_ms = (time.perf_counter() - start) * 1000
+        return report
+
+    def _remember(self, key: str, t: float) -> None:
+        written = self._written
+        written.pop(key, None)
+        written[key] = t
+        if len(written) > self.cache_size:
+            # Descarta as aeronaves gravadas há mais tempo
+            for stale in list(islice(written, len(written) - self.cache_size)):
+                del written[stale]
+
+    def _write_batch(self, index: int, group: List[Tuple[str, float, dict]]) -> BatchResult:
+        result = BatchResult(index=index, items=len(group))
+        times = {key: t for key, t, _ in group}
+        requests = [{"PutRequest": {"Item": item}} for _, _, item in group]
+        client = self.client
+
+        attempts = 0
+        while requests and attempts < self.max_attempts:
+            if attempts:
+                result.retries += 1
+                self.sleep(self.backoff(attempts))
+            attempts += 1
+            result.requests += 1
+            try:
+                response = client.batch_write_item(RequestItems={self.table_name: requests})
+            except Exception as e:
+                # Falha da requisição inteira: só throttling/falha transitória é reenviada
+                code = error_code(e)
+                result.error_codes[code] = result.error_codes.get(code, 0) + 1
+                retryable = code in RETRYABLE_ERROR_CODES
+                if self.logger is not None:
+                    action = "retrying" if retryable and attempts < self.max_attempts else "giving up"
+                    self.logger.warning(
+                        f"Batch {index} - attempt {attempts} failed for {len(requests)} positions ({code}), "
+                        f"{action}: {e}"
+                    )
+                if not retryable:
+                    break
+                continue
+            unprocessed = response.get("UnprocessedItems", {}).get(self.table_name, [])
+            left = {request["PutRequest"]["Item"]["id"]["S"] for request in unprocessed}
+            for request in requests:
+                key = request["PutRequest"]["Item"]["id"]["S"]
+                if key not in left:
+                    result.written.append((key, times[key]))
+            if unprocessed:
+                result.error_codes["UnprocessedItems"] = result.error_codes.get("UnprocessedItems", 0) + len(unprocessed)
+            requests = unprocessed
+
+        result.failed = len(requests)
+        return result
+
+    def _write_conditional(self, index: int, group: List[Tuple[str, float, dict]]) -> BatchResult:
+        result = BatchResult(index=index, items=len(group))
+        client = self.client
+        for key, t, item in group:
+            attempts = 0
+            done = False
+            while not done and attempts < self.max_attempts:
+                if attempts:
+                    result.retries += 1
+                    self.sleep(self.backoff(attempts))
+                attempts += 1
+                result.requests += 1
+                try:
+                    client.put_item(
+                        TableName=self.table_name,
+                        Item=item,
+                        ConditionExpression=_CONDITION,
+                        ExpressionAttributeValues={":lc": item["last_contact"]},
+                    )
+                except Exception as e:
+                    code = error_code(e)
+                    if code == "ConditionalCheckFailedException":
+                        # A tabela já tem um estado igual ou mais novo
+                        result.conditional_skipped.append((key, t))
+                        done = True
+                        break
+                    result.error_codes[code] = result.error_codes.get(code, 0) + 1
+                    if code not in RETRYABLE_ERROR_CODES:
+                        break
+                    continue
+                result.written.append((key, t))
+                done = True
+            if not done:
+                result.failed += 1
+        return result
+
+    @classmethod
+    def from_env(cls, environ=None, client=None, logger=None) -> Optional['LatestPositionWriter']:
+        """Writer for ``DYNAMODB_TABLE``, if set."""
+        environ = os.environ if environ is None else environ
+        table_name = environ.get("DYNAMODB_TABLE")
+        if not table_name:
+            return None
+        return cls(
+            table_name,
+            client=client,
+            mode=environ.get("POSITIONS_WRITE_MODE") or "batch",
+            max_workers=int(environ.get("POSITIONS_MAX_WORKERS", "4")),
+            min_interval_s=float(environ.get("POSITIONS_MIN_INTERVAL_S", "0")),
+            ttl_s=int(environ.get("POSITIONS_TTL_S", "3600")),
+            logger=logger,
+        )
+
+
+def query_bbox(
+    client,
+    table_name: str,
+    lat_min: float,
+    lat_max: float,
+    lon_min: float,
+    lon_max: float,
+    cell_precision: int = 3,
+    index_name: str = GEOHASH_INDEX,
+    max_attempts: int = 5,
+    base_delay: float = 0.05,
+    max_delay: float = 1.0,
+    sleep: Callable[[float], None] = time.sleep,
+    rng: Optional[random.Random] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Aircraft inside a bounding box, through the geohash GSI (plain dicts).
+
+    UnprocessedKeys of BatchGetItem are retried with full-jitter backoff;
+    keys still unprocessed after ``max_attempts`` raise RuntimeError rather
+    than returning an incomplete box.
+    """
+    rng = rng or random.Random()
+    keys = []
+    for cell in bbox_cells(lat_min, lat_max, lon_min, lon_max, cell_precision):
+        kwargs = {
+            "TableName": table_name,
+            "IndexName": index_name,
+            "KeyConditionExpression": "geohash_cell = :cell",
+            "ExpressionAttributeValues": {":cell": {"S": cell}},
+        }
+        while True:
+            response = client.query(**kwargs)
+            keys.extend({"id": item["id"]} for item in response.get("Items", []))
+            if "LastEvaluatedKey" not in response:
+                break
+            kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    # O índice só tem as chaves: busca os itens
+    items = []
+    for start in range(0, len(keys), MAX_KEYS_PER_GET):
+        request = {table_name: {"Keys": keys[start:start + MAX_KEYS_PER_GET]}}
+        for attempt in range(max_attempts):
+            if attempt:
+                sleep(backoff_delay(attempt, base_delay, max_delay, rng))
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(response.get("Responses", {}).get(table_name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+        if request:
+            left = len(request.get(table_name, {}).get("Keys", []))
+            raise RuntimeError(f"{left} items of '{table_name}' still unprocessed after {max_attempts} BatchGetItem attempts")
+
+    lat_low, lat_high = min(lat_min, lat_max), max(lat_min, lat_max)
+    found = []
+    for item in items:
+        row = _plain(item)
+        lat, lon = row.get("latitude"), row.get("longitude")
+        if lat is None or lon is None or not lat_low <= lat <= lat_high:
+            continue
+        inside = lon_min <= lon <= lon_max if lon_min <= lon_max else (lon >= lon_min or lon <= lon_max)
+        if inside:
+            found.append(row)
+    return found
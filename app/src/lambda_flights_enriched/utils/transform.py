@@ -0,0 +1,236 @@
+"""Batch transformation of Firehose records: bulk decode, column-wise filter/projection, fast encode."""
+
+import binascii
+import json
+from datetime import datetime, timezone
+from json.encoder import encode_basestring_ascii
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+from .deaggregation import KPL_MAGIC, deaggregate
+from .metrics import Metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do layer da Lambda
+    orjson = None
+
+
+BACKENDS = ("orjson", "json")
+
+# Campos copiados do estado de origem, na ordem da saída
+PROJECTED_FIELDS = (
+    "icao24",
+    "callsign",
+    "origin_country",
+    "latitude",
+    "longitude",
+    "altitude",
+    "velocity",
+    "heading",
+    "last_contact",
+)
+OUTPUT_FIELDS = PROJECTED_FIELDS + ("event_time", "location")
+
+_NULL = "null"
+_INF = float("inf")
+
+
+def _row_template(fields: Sequence[str]) -> str:
+    """Same layout as json.dumps of the enriched dict: default separators."""
+    return "{" + ", ".join(f'"{name}": %s' for name in fields) + "}"
+
+
+def available_backends() -> List[str]:
+    """Backends importable in this environment, fastest first."""
+    return ["orjson", "json"] if orjson is not None else ["json"]
+
+
+def _json_column(values: Sequence[Any]) -> List[str]:
+    """JSON text of each value, same output as json.dumps."""
+    out = []
+    append = out.append
+    encode_str = encode_basestring_ascii
+    float_repr = float.__repr__
+    for value in values:
+        cls = value.__class__
+        if cls is str:
+            append(encode_str(value))
+        elif value is None:
+            append(_NULL)
+        elif cls is float and -_INF < value < _INF:
+            append(float_repr(value))
+        else:
+            append(json.dumps(value))
+    return out
+
+
+class FirehoseBatchTransformer:
+    """
+    Enriches a whole Firehose ``records`` list at once.
+
+    All payloads of the invocation (including the ones inside KPL aggregated
+    records) are parsed with a single ``loads`` call, ``event_time`` is taken
+    once per batch, and the drop filter and projection run column by column.
+    Enriched states go back under their source ``recordId``, one JSON per
+    line. The ``json`` backend emits the same bytes as ``json.dumps`` of the
+    enriched dict; orjson emits compact JSON with the same content
+    (non-finite floats become null).
+
+    ``enrichers`` add fields after the projection: each has a ``FIELDS``
+    tuple and a ``columns(states)`` method returning one column per field for
+    the kept source states (see utils/geo.py and utils/airports.py).
+
+    ``sinks`` receive the enriched columns of every batch through
+    ``add_columns(fields, columns)`` (see utils/parquet_writer.py and
+    utils/windows.py); ``collect`` feeds them without encoding the output.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[str] = None,
+        logger=None,
+        enrichers: Sequence[Any] = (),
+        metrics: Optional[Metrics] = None,
+        sinks: Sequence[Any] = (),
+    ):
+        backend = backend or available_backends()[0]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown serializer backend '{backend}' (expected one of {BACKENDS})")
+        if backend not in available_backends():
+            raise ValueError(f"Serializer backend '{backend}' is not installed")
+        self.backend = backend
+        self.logger = logger
+        self.metrics = metrics or Metrics()
+        self.enrichers = tuple(enrichers)
+        self.sinks = tuple(sinks)
+        self.fields = OUTPUT_FIELDS + tuple(name for e in self.enrichers for name in e.FIELDS)
+        self._template = _row_template(self.fields)
+        self._loads = orjson.loads if backend == "orjson" else json.loads
+
+    def transform(self, records: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Firehose output records (Ok / Dropped / ProcessingFailed) for ``records``, in order."""
+        payloads, bounds = self._payloads(records)
+
+        metrics = self.metrics
+        with metrics.timer("DecodeMs"):
+            states, invalid = self._decode(payloads)
+        with metrics.timer("EncodeMs"):
+            encoded = self._encode(states, (now or datetime.now(timezone.utc)).isoformat())
+        metrics.count("RecordsDecoded", len(payloads))
+
+        output = []
+        b2a_base64 = binascii.b2a_base64
+        for record, (start, end) in zip(records, bounds):
+            record_id = record["recordId"]
+            if invalid and any(states[i] is None for i in range(start, end)):
+                # Payload inválido: o Firehose grava o record original no prefixo de erro
+                output.append({"recordId": record_id, "result": "ProcessingFailed", "data": record["data"]})
+                continue
+            if end - start == 1:
+                line = encoded[start]
+                lines = [line] if line is not None else None
+            else:
+                lines = [line for line in encoded[start:end] if line is not None]
+            if not lines:
+                output.append({"recordId": record_id, "result": "Dropped"})
+            else:
+                output.append({
+                    "recordId": record_id,
+                    "result": "Ok",
+                    "data": b2a_base64(b"\n".join(lines), newline=False).decode("ascii"),
+                })
+        return output
+
+    def collect(self, records: Sequence[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+        """
+        Decode and enrich ``records`` (base64 ``data``, KPL aggregated or not)
+        for the sinks only; returns the number of enriched states.
+        """
+        payloads, _ = self._payloads(records)
+        with self.metrics.timer("DecodeMs"):
+            states, _ = self._decode(payloads)
+        self.metrics.count("RecordsDecoded", len(payloads))
+        keep, _ = self._columns(states, (now or datetime.now(timezone.utc)).isoformat())
+        return len(keep)
+
+    @staticmethod
+    def _payloads(records: Sequence[Dict[str, Any]]) -> Tuple[List[bytes], List[Tuple[int, int]]]:
+        """Every payload (KPL aggregates expanded) and the payload range of each record."""
+        payloads: List[bytes] = []
+        bounds: List[Tuple[int, int]] = []
+        a2b_base64 = binascii.a2b_base64
+        for record in records:
+            start = len(payloads)
+            raw = a2b_base64(record["data"])
+            if raw.startswith(KPL_MAGIC):
+                payloads.extend(deaggregate(raw))
+            else:
+                payloads.append(raw)
+            bounds.append((start, len(payloads)))
+        return payloads, bounds
+
+    def _decode(self, payloads: List[bytes]) -> Tuple[List[Optional[Dict[str, Any]]], bool]:
+        """
+        Parse every payload; entries that are not a JSON object come back as None.
+
+        The flag tells whether there was any such entry.
+        """
+        if not payloads:
+            return [], False
+        loads = self._loads
+        try:
+            # Um único parse para o lote inteiro
+            states = loads(b"[" + b",".join(payloads) + b"]")
+            if len(states) == len(payloads) and all(type(s) is dict for s in states):
+                return states, False
+        except ValueError:
+            pass
+
+        # Algum payload quebrado: volta ao parse individual para isolá-lo. O json
+        # da stdlib também aceita NaN/Infinity, que o orjson rejeita
+        states = []
+        for payload in payloads:
+            try:
+                state = json.loads(payload)
+            except ValueError:
+                state = None
+            states.append(state if type(state) is dict else None)
+        invalid = sum(s is None for s in states)
+        if invalid and self.logger is not None:
+            self.logger.warning(f"{invalid} of {len(payloads)} payloads are not valid JSON objects")
+        return states, invalid > 0
+
+    def _columns(self, states: List[Optional[Dict[str, Any]]], event_time: str) -> Tuple[List[int], List[List[Any]]]:
+        """Indices of the kept states and their enriched columns (``fields`` order), also handed to the sinks."""
+        latitude = [s.get("latitude") if s is not None else None for s in states]
+        longitude = [s.get("longitude") if s is not None else None for s in states]
+        keep = [i for i, (lat, lon) in enumerate(zip(latitude, longitude)) if lat is not None and lon is not None]
+
+        kept = [states[i] for i in keep]
+        columns = [[s.get(name) for s in kept] for name in PROJECTED_FIELDS]
+        columns.append([event_time] * len(kept))
+        columns.append([f"{latitude[i]},{longitude[i]}" for i in keep])
+        for enricher in self.enrichers:
+            with self.metrics.timer(f"{type(enricher).__name__}Ms"):
+                columns.extend(enricher.columns(kept))
+        if kept:
+            for sink in self.sinks:
+                with self.metrics.timer(f"{type(sink).__name__}Ms"):
+                    sink.add_columns(self.fields, columns)
+        return keep, columns
+
+    def _encode(self, states: List[Optional[Dict[str, Any]]], event_time: str) -> List[Optional[bytes]]:
+        """Encoded enriched state per input state; None for the dropped ones."""
+        keep, columns = self._columns(states, event_time)
+        if self.backend == "orjson":
+            dumps = orjson.dumps
+            fields = self.fields
+            rows = [dumps(dict(zip(fields, values))) for values in zip(*columns)]
+        else:
+            template = self._template
+            rows = [(template % row).encode("ascii") for row in zip(*map(_json_column, columns))]
+
+        encoded: List[Optional[bytes]] = [None] * len(states)
+        for i, row in zip(keep, rows):
+            encoded[i] = row
+        return encoded
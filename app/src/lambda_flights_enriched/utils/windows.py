@@ -0,0 +1,324 @@
+"""
+Tumbling/sliding window aggregates over enriched states, in process.
+
+Event time is ``last_contact``. Records are folded into fixed panes of
+``gcd`` of every window size/slide, so each record is touched once whatever
+the number of windows; a window is the merge of its panes and is emitted
+when the watermark (latest event time minus ``lateness_s``) passes its end.
+Records older than the watermark are counted as late and dropped, and panes
+no window still needs are freed, so the state is bounded by the longest
+window plus the lateness.
+
+Per window and group key (country, continent, ...): distinct aircraft,
+observations and average altitude/velocity. Per nearest airport: distinct
+aircraft landing (arrivals) and taking off (departures).
+"""
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import reduce
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Iterable
+
+from .common import epoch
+
+# Agrupamentos padrão (campos de GeoEnricher)
+DEFAULT_GROUPS = ("overflown_country_code", "overflown_continent", "origin_country_code")
+AIRPORT_GROUP = "airport"
+OTHER_KEY = "__other__"
+
+_ARRIVAL_PHASE = "landing"
+_DEPARTURE_PHASE = "takeoff"
+
+
+@dataclass(slots=True)
+class WindowSpec:
+    """Window of ``size_s`` seconds every ``slide_s`` seconds (tumbling when equal)."""
+
+    size_s: int
+    slide_s: int
+
+    def __post_init__(self):
+        if self.size_s <= 0 or self.slide_s <= 0 or self.size_s % self.slide_s:
+            raise ValueError(f"window size ({self.size_s}s) must be a positive multiple of the slide ({self.slide_s}s)")
+
+    @property
+    def name(self) -> str:
+        if self.size_s == self.slide_s:
+            return f"tumbling_{self.size_s}s"
+        return f"sliding_{self.size_s}s_{self.slide_s}s"
+
+    @classmethod
+    def parse(cls, text: str) -> 'WindowSpec':
+        """``"60"`` (tumbling) or ``"300/60"`` (size/slide, seconds)."""
+        size, _, slide = text.strip().partition("/")
+        return cls(int(size), int(slide or size))
+
+    @classmethod
+    def parse_list(cls, text: str) -> List['WindowSpec']:
+        return [cls.parse(item) for item in text.split(",") if item.strip()]
+
+
+class _Pane:
+    """Aggregates of one pane: per group, key -> [aircraft set, obs, alt sum, alt n, vel sum, vel n]."""
+
+    __slots__ = ("groups", "airports")
+
+    def __init__(self, group_count: int):
+        self.groups: List[Dict[Any, list]] = [{} for _ in range(group_count)]
+        # aeroporto -> [chegadas, partidas] (conjuntos de icao24)
+        self.airports: Dict[str, Tuple[set, set]] = {}
+
+
+def _isoformat(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+class WindowAggregator:
+    """
+    Incremental window aggregation engine.
+
+    ``add_columns(fields, columns)`` matches the transformer sink interface
+    (utils/transform.py); ``add(rows)`` takes enriched dicts. Closed windows
+    accumulate in ``results`` until ``drain()``; ``flush()`` closes every
+    window at shutdown.
+    """
+
+    def __init__(
+        self,
+        windows: Sequence[WindowSpec] = (WindowSpec(60, 60),),
+        groups: Sequence[str] = DEFAULT_GROUPS,
+        lateness_s: float = 30.0,
+        max_future_s: float = 300.0,
+        max_keys: int = 10_000,
+        time_field: str = "last_contact",
+    ):
+        if not windows:
+            raise ValueError("at least one window is required")
+        self.windows = list(windows)
+        self.groups = tuple(groups)
+        self.lateness_s = lateness_s
+        self.max_future_s = max_future_s
+        self.max_keys = max_keys
+        self.time_field = time_field
+        # Painel comum a todas as janelas: cada record só é somado uma vez
+        self.pane_s = reduce(math.gcd, [n for w in self.windows for n in (w.size_s, w.slide_s)])
+        self._panes: Dict[int, _Pane] = {}
+        self.max_event_time: Optional[float] = None
+        # Próximo fim de janela a emitir, por janela (epoch s)
+        self._next_end: List[Optional[int]] = [None] * len(self.windows)
+        self._closed_before = -math.inf  # painéis abaixo deste índice já não aceitam records
+        self.results: List[Dict[str, Any]] = []
+        self.records = 0
+        self.late = 0
+        self.dropped = 0
+
+    @property
+    def watermark(self) -> Optional[float]:
+        return None if self.max_event_time is None else self.max_event_time - self.lateness_s
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        rows = list(rows)
+        fields = ("icao24", self.time_field, "altitude", "velocity", "nearest_airport_icao", "flight_phase") + self.groups
+        self.add_columns(fields, [[row.get(name) for row in rows] for name in fields])
+
+    def add_columns(self, fields: Sequence[str], columns: Sequence[Sequence[Any]]) -> None:
+        """Fold a batch given as one column per field, then close the windows the watermark passed."""
+        index = {name: i for i, name in enumerate(fields)}
+        if not columns or not len(columns[0]):
+            return
+        n = len(columns[0])
+
+        def column(name):
+            return columns[index[name]] if name in index else [None] * n
+
+        # Um parse por valor distinto: last_contact se repete no mesmo snapshot
+        epochs: Dict[Any, Optional[float]] = {}
+        for value in column(self.time_field):
+            if value not in epochs:
+                epochs[value] = epoch(value)
+        times = [epochs[value] for value in column(self.time_field)]
+
+        # Relógio da OpenSky não está no futuro: além de max_future_s é lixo
+        horizon = time.time() + self.max_future_s
+        latest = max((t for t in times if t is not None and t <= horizon), default=None)
+        if latest is not None and (self.max_event_time is None or latest > self.max_event_time):
+            self.max_event_time = latest
+
+        self._fold(
+            times,
+            column("icao24"),
+            column("altitude"),
+            column("velocity"),
+            column("nearest_airport_icao"),
+            column("flight_phase"),
+            [column(name) for name in self.groups],
+            horizon,
+        )
+        self.records += n
+        self._close(self.watermark)
+
+    def _fold(self, times, icao24, altitude, velocity, airports, phases, group_columns, horizon) -> None:
+        panes = self._panes
+        pane_s = self.pane_s
+        closed_before = self._closed_before
+        max_keys = self.max_keys
+        group_count = len(group_columns)
+        group_ids = range(group_count)
+        last_index = None
+        pane = None
+        late = dropped = 0
+
+        for i, t in enumerate(times):
+            if t is None or t > horizon:
+                dropped += 1
+                continue
+            p = int(t // pane_s)
+            if p != last_index:
+                if p < closed_before:
+                    late += 1
+                    continue
+                pane = panes.get(p)
+                if pane is None:
+                    pane = panes[p] = _Pane(group_count)
+                last_index = p
+            aircraft = icao24[i]
+            alt = altitude[i]
+            vel = velocity[i]
+            for g in group_ids:
+                key = group_columns[g][i]
+                if key is None:
+                    continue
+                stats = pane.groups[g].get(key)
+                if stats is None:
+                    keys = pane.groups[g]
+                    if len(keys) >= max_keys:
+                        key = OTHER_KEY
+                        stats = keys.get(key)
+                    if stats is None:
+                        stats = keys[key] = [set(), 0, 0.0, 0, 0.0, 0]
+                stats[0].add(aircraft)
+                stats[1] += 1
+                if alt is not None:
+                    stats[2] += alt
+                    stats[3] += 1
+                if vel is not None:
+                    stats[4] += vel
+                    stats[5] += 1
+            phase = phases[i]
+            if phase == _ARRIVAL_PHASE or phase == _DEPARTURE_PHASE:
+                airport = airports[i]
+                if airport is not None:
+                    entry = pane.airports.get(airport)
+                    if entry is None:
+                        entry = pane.airports[airport] = (set(), set())
+                    entry[0 if phase == _ARRIVAL_PHASE else 1].add(aircraft)
+        self.late += late
+        self.dropped += dropped
+
+    def _close(self, watermark: Optional[float]) -> None:
+        """Emit every window ending at or before ``watermark``, then free the panes."""
+        if watermark is None or not self._panes:
+            return
+        first_pane = min(self._panes)
+        for w, spec in enumerate(self.windows):
+            end = self._next_end[w]
+            if end is None:
+                # Primeira janela que contém o painel mais antigo
+                end = (first_pane * self.pane_s // spec.slide_s + 1) * spec.slide_s
+            while end <= watermark:
+                self._emit(spec, end)
+                end += spec.slide_s
+            self._next_end[w] = end
+
+        # Painéis de que nenhuma janela pendente precisa
+        keep_from = min(
+            (end - spec.size_s) // self.pane_s for spec, end in zip(self.windows, self._next_end)
+        )
+        self._closed_before = max(self._closed_before, int(watermark // self.pane_s))
+        keep_from = min(keep_from, self._closed_before)
+        for p in [p for p in self._panes if p < keep_from]:
+            del self._panes[p]
+
+    def _emit(self, spec: WindowSpec, end: int) -> None:
+        start = end - spec.size_s
+        panes = [self._panes[p] for p in range(start // self.pane_s, end // self.pane_s) if p in self._panes]
+        if not panes:
+            return
+        base = {"window": spec.name, "window_start": _isoformat(start), "window_end": _isoformat(end)}
+        for g, group in enumerate(self.groups):
+            merged: Dict[Any, list] = {}
+            for pane in panes:
+                for key, stats in pane.groups[g].items():
+                    total = merged.get(key)
+                    if total is None:
+                        merged[key] = [set(stats[0]), *stats[1:]]
+                    else:
+                        total[0] |= stats[0]
+                        for k in range(1, 6):
+                            total[k] += stats[k]
+            for key, (aircraft, observations, alt_sum, alt_n, vel_sum, vel_n) in merged.items():
+                self.results.append({
+                    **base,
+                    "group": group,
+                    "key": key,
+                    "aircraft": len(aircraft),
+                    "observations": observations,
+                    "avg_altitude": round(alt_sum / alt_n, 1) if alt_n else None,
+                    "avg_velocity": round(vel_sum / vel_n, 2) if vel_n else None,
+                })
+        airports: Dict[str, Tuple[set, set]] = {}
+        for pane in panes:
+            for airport, (arrivals, departures) in pane.airports.items():
+                total = airports.get(airport)
+                if total is None:
+                    airports[airport] = (set(arrivals), set(departures))
+                else:
+                    total[0].update(arrivals)
+                    total[1].update(departures)
+        for airport, (arrivals, departures) in airports.items():
+            self.results.append({
+                **base,
+                "group": AIRPORT_GROUP,
+                "key": airport,
+                "arrivals": len(arrivals),
+                "departures": len(departures),
+            })
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Closed window results since the last call."""
+        results, self.results = self.results, []
+        return results
+
+    def requeue(self, results: Sequence[Dict[str, Any]]) -> None:
+        """Put back results that could not be delivered; the next ``drain()`` returns them first."""
+        self.results[:0] = results
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close every window that has data (shutdown / end of a replay)."""
+        if self.max_event_time is not None:
+            longest = max(spec.size_s for spec in self.windows)
+            self._close(self.max_event_time + longest)
+        return self.drain()
+
+    def state_size(self) -> int:
+        """Aircraft entries held in the open panes (memory bound check)."""
+        return sum(
+            len(stats[0]) for pane in self._panes.values() for group in pane.groups for stats in group.values()
+        ) + sum(len(a) + len(d) for pane in self._panes.values() for a, d in pane.airports.values())
+
+    @classmethod
+    def from_env(cls, environ=None) -> Optional['WindowAggregator']:
+        """Engine for ``AGGREGATION_WINDOWS`` (e.g. ``60,300/60``), if set."""
+        environ = os.environ if environ is None else environ
+        windows = environ.get("AGGREGATION_WINDOWS")
+        if not windows:
+            return None
+        groups = [g.strip() for g in environ.get("AGGREGATION_GROUPS", "").split(",") if g.strip()]
+        return cls(
+            WindowSpec.parse_list(windows),
+            groups=groups or DEFAULT_GROUPS,
+            lateness_s=float(environ.get("AGGREGATION_LATENESS_S", "30")),
+        )
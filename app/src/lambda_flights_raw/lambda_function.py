@@ -1,18 +1,36 @@
 import os
 import sys
 import json
+import time
 import logging
-import boto3
 import requests
 from datetime import datetime
-from dotenv import load_dotenv
 from utils.models import StateVector
-
-load_dotenv()
-
-# AWS clients
-secrets_client = boto3.client("secretsmanager")
-kinesis_client = boto3.client("kinesis")
+from utils.columnar import StateBatch, StateRecords
+from utils.serializer import StateSerializer
+from utils.delta import DeltaFilter
+from utils.sender import KinesisSender
+from utils.streaming import iter_state_rows, iter_state_batches
+from utils.auth import ExpiringCache
+from utils.http_session import DnsCache, RateLimitState, build_session, states_query_params
+from utils.diagnostics import run_health_check
+from utils.clients import LazyClient, init_clients
+from utils.metrics import Metrics, BYTES
+from utils.tracks import TrackBuilder, encode_tracks
+from utils.aggregation import RecordAggregator, DEFAULT_AGGREGATE_BYTES
+from utils.partitioning import ShardMap, build_partitioner
+
+# .env só no desenvolvimento local: na Lambda a configuração vem do ambiente
+if not os.environ.get("AWS_LAMBDA_FUNCTION_NAME"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+# AWS clients: criados no primeiro uso ou, com CLIENT_INIT=prewarm (padrão), numa
+# thread em background enquanto o handler autentica e baixa os estados da OpenSky
+secrets_client = LazyClient("secretsmanager")
+kinesis_client = LazyClient("kinesis")
+init_clients(secrets_client, kinesis_client)
 
 # OpenSky OAuth2 + API endpoints
 OPENSKY_TOKEN_URL = (
@@ -20,6 +38,58 @@ OPENSKY_TOKEN_URL = (
 )
 OPENSKY_STATES_URL = "https://opensky-network.org/api/states/all"
 
+# Últimos headers de rate limit da OpenSky (créditos restantes / retry-after),
+# usados pelo poller para ajustar a cadência
+rate_limit = RateLimitState()
+
+# Sessão HTTP compartilhada: pool de conexões keep-alive reaproveitado entre
+# invocações quentes, gzip e retries com backoff em 429/5xx. Novas conexões
+# resolvem o host pelo cache de DNS (também aquecido pelo health check).
+# requests/urllib3 (~100 ms do import) ficam no init de propósito: toda
+# invocação autentica e baixa os estados com esta sessão, então adiar o
+# import só moveria o custo para o handler da primeira invocação
+dns_cache = DnsCache(ttl=float(os.environ.get("DNS_CACHE_TTL", "300")))
+http_session = build_session(dns_cache=dns_cache, rate_limit=rate_limit)
+
+# Tempo de cache do secret (s) e validade assumida do token quando a
+# resposta não traz expires_in
+OPENSKY_SECRET_TTL = float(os.environ.get("OPENSKY_SECRET_TTL", "900"))
+OPENSKY_DEFAULT_TOKEN_TTL = 300.0
+
+# Tamanho dos chunks lidos do socket no modo streaming
+STREAM_CHUNK_BYTES = 64 * 1024
+
+# Serializador dos records do Kinesis (orjson/msgspec se instalados, senão json)
+serializer = StateSerializer(os.environ.get("SERIALIZER_BACKEND") or None)
+
+# Modo delta (DELTA_MODE=memory|sqlite): o snapshot anterior fica em memória
+# entre invocações "quentes" e só os estados que mudaram são enviados
+delta_filter = DeltaFilter.from_env()
+
+# Agregação KPL (KINESIS_AGGREGATION=kpl) e particionamento dos records
+# (PARTITION_STRATEGY=icao24|balanced|geohash); o mapa de shards é lido uma vez
+# por container, só quando algum dos dois precisa dele
+_shard_map = None
+_shard_map_loaded_at = 0.0
+_record_aggregator = None
+_partitioner = None
+
+# Releitura do mapa de shards (s) em containers longos/poller, após resharding
+SHARD_MAP_TTL = float(os.environ.get("SHARD_MAP_TTL", "3600"))
+
+# Montagem incremental de tracks (TRACKS_STREAM): os tracks abertos ficam na
+# memória do container quente e os concluídos vão para o stream de tracks
+track_builder = TrackBuilder.from_env() if os.environ.get("TRACKS_STREAM") else None
+
+# Tiles de densidade (TILES_STREAM): o tiler guarda a célula de cada aeronave
+# entre snapshots e só os tiles alterados são enviados; criado no primeiro
+# snapshot (numpy fora do init)
+_tiler = None
+
+# Métricas por etapa em CloudWatch EMF (METRICS_ENABLED); desligadas, os
+# timers são no-op
+metrics = Metrics.from_env()
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -60,13 +130,24 @@ def _get_opensky_credentials_from_secret():
         logger.error(f"Error retrieving OpenSky credentials from Secrets Manager: {e}")
         return None, None
 
-def get_opensky_access_token():
-    """
-    Autentica na OpenSky via OAuth2 Client Credentials e retorna o access_token (Bearer).
-    """
+def _load_opensky_credentials():
+    """Loader do cache de credenciais: ((client_id, client_secret), ttl) ou None."""
     client_id, client_secret = _get_opensky_credentials_from_secret()
     if not client_id or not client_secret:
         return None
+    return (client_id, client_secret), OPENSKY_SECRET_TTL
+
+
+def _request_opensky_token():
+    """
+    Faz o POST no token endpoint (OAuth2 Client Credentials).
+
+    Retorna (access_token, expires_in) ou None em caso de falha.
+    """
+    credentials = _credentials_cache.get()
+    if not credentials:
+        return None
+    client_id, client_secret = credentials
 
     data = {
         "grant_type": "client_credentials",
@@ -75,33 +156,159 @@ def get_opensky_access_token():
     }
 
     try:
-        resp = requests.post(OPENSKY_TOKEN_URL, data=data, timeout=60)
+        resp = http_session.post(OPENSKY_TOKEN_URL, data=data, timeout=60)
+        if resp.status_code in (400, 401):
+            # Credenciais podem ter sido rotacionadas: relê o secret na próxima tentativa
+            _credentials_cache.invalidate()
         resp.raise_for_status()
-        access_token = resp.json().get("access_token")
+        body = resp.json()
+        access_token = body.get("access_token")
         if not access_token:
             logger.error("No access_token in OpenSky auth response")
             return None
-        logger.info("Successfully obtained OpenSky access token")
-        return access_token
+        expires_in = float(body.get("expires_in") or OPENSKY_DEFAULT_TOKEN_TTL)
+        logger.info(f"Successfully obtained OpenSky access token (expires in {expires_in:.0f}s)")
+        return access_token, expires_in
     except requests.RequestException as e:
         logger.error(f"Error obtaining OpenSky access token: {e}")
         return None
 
 
-def convert_states_response_to_json(states: list[StateVector]) -> dict:
+# Cache de credenciais e do access token entre invocações "quentes" do container
+_credentials_cache = ExpiringCache(_load_opensky_credentials, safety_margin=0, refresh_ahead=0)
+_token_cache = ExpiringCache(
+    _request_opensky_token,
+    safety_margin=float(os.environ.get("OPENSKY_TOKEN_SAFETY_MARGIN", "60")),
+)
+
+
+def get_opensky_access_token(force_refresh: bool = False):
+    """
+    Autentica na OpenSky via OAuth2 Client Credentials e retorna o access_token (Bearer).
+
+    O token fica em cache no container e é renovado antes de expirar
+    (expires_in menos a margem de segurança); force_refresh ignora o cache.
+    """
+    with metrics.timer("AuthMs"):
+        return _token_cache.get(force_refresh=force_refresh)
+
+
+def auth_cache_stats() -> dict:
+    """Contadores dos caches de credenciais/token (hits, misses, refreshes...)."""
+    return {
+        "token": _token_cache.stats.as_dict(),
+        "credentials": _credentials_cache.stats.as_dict(),
+    }
+
+
+def _get_states_response(access_token, params=None, stream: bool = False):
+    """
+    GET em /api/states/all. Em caso de 401 (token expirado/revogado),
+    renova o token uma vez e repete a chamada.
+    """
+    resp = http_session.get(
+        OPENSKY_STATES_URL,
+        headers={"Authorization": f"Bearer {access_token}"},
+        params=params,
+        timeout=15,
+        stream=stream,
+    )
+    if resp.status_code == 401:
+        logger.warning("OpenSky states API returned 401, refreshing access token")
+        resp.close()
+        access_token = get_opensky_access_token(force_refresh=True)
+        if access_token:
+            resp = http_session.get(
+                OPENSKY_STATES_URL,
+                headers={"Authorization": f"Bearer {access_token}"},
+                params=params,
+                timeout=15,
+                stream=stream,
+            )
+    rate_limit.observe(resp.status_code, resp.headers)
+    resp.raise_for_status()
+    return resp
+
+
+def opensky_query_params(event=None) -> list:
+    """
+    Parâmetros opcionais de /api/states/all (time, bounding box, icao24).
+
+    Vêm da chave "opensky" do evento, ex.:
+    {"opensky": {"time": 1700000000, "bbox": [-34, -74, 6, -34], "icao24": ["e4912d"]}}
+    ou, para a bounding box, da variável OPENSKY_BBOX ("lamin,lomin,lamax,lomax").
+    """
+    options = dict((event or {}).get("opensky") or {})
+    return states_query_params(
+        time=options.get("time"),
+        bbox=options.get("bbox") or os.environ.get("OPENSKY_BBOX") or None,
+        icao24=options.get("icao24"),
+        extended=bool(options.get("extended", False)),
+    )
+
+
+@metrics.timed("ConvertMs")
+def convert_states_response_to_json(states: StateBatch | list[StateVector]) -> dict:
     json_data = {
         "timestamp": datetime.now().isoformat(),
         "total_states": 0,
         "states": [],
     }
-    for state in states:
-        # if state.origin_country != "Brazil":
-        #     continue
-        json_data["states"].append(state.to_dict())
+    if isinstance(states, StateBatch):
+        # Caminho colunar: os dicts só são gerados se alguém acessar os records
+        json_data["states"] = StateRecords(states)
+    else:
+        for state in states:
+            # if state.origin_country != "Brazil":
+            #     continue
+            json_data["states"].append(state.to_dict())
 
     json_data["total_states"] = len(json_data["states"])
     return json_data
 
+def _get_shard_map(stream_name: str) -> ShardMap:
+    """Shards abertos do stream (ListShards), ou KINESIS_SHARD_COUNT shards iguais."""
+    global _shard_map, _shard_map_loaded_at, _record_aggregator, _partitioner
+    now = time.monotonic()
+    if _shard_map is None or now - _shard_map_loaded_at > SHARD_MAP_TTL:
+        shard_map = ShardMap.load(kinesis_client, stream_name, logger=logger)
+        if _shard_map is not None and shard_map.ranges != _shard_map.ranges:
+            # Resharding: agregador e particionador são refeitos com o mapa novo
+            logger.info(f"Shard map of '{stream_name}' changed: {len(_shard_map)} -> {len(shard_map)} shards")
+            _record_aggregator = _partitioner = None
+        _shard_map, _shard_map_loaded_at = shard_map, now
+    return _shard_map
+
+
+def _get_record_aggregator(stream_name: str):
+    """
+    Retorna o RecordAggregator do container se KINESIS_AGGREGATION=kpl,
+    agrupando pelos hash ranges dos shards abertos (ListShards).
+    """
+    global _record_aggregator
+    if (os.environ.get("KINESIS_AGGREGATION") or "").lower() != "kpl":
+        return None
+    if _record_aggregator is None:
+        _record_aggregator = RecordAggregator(
+            _get_shard_map(stream_name).ranges,
+            max_bytes=int(os.environ.get("KINESIS_AGGREGATION_BYTES", DEFAULT_AGGREGATE_BYTES)),
+        )
+    return _record_aggregator
+
+
+def _get_partitioner(stream_name: str):
+    """Estratégia de PartitionKey/ExplicitHashKey do container (PARTITION_STRATEGY)."""
+    global _partitioner
+    if _partitioner is None:
+        strategy = (os.environ.get("PARTITION_STRATEGY") or "icao24").lower()
+        _partitioner = build_partitioner(
+            strategy,
+            _get_shard_map(stream_name) if strategy != "icao24" else None,
+            geohash_precision=int(os.environ.get("GEOHASH_PRECISION", "3")),
+        )
+    return _partitioner
+
+
 def send_states_to_kinesis(json_resultado: dict, batch_size: int = 500) -> bool:
     """
     Envia todos os estados para o Kinesis usando PutRecords em batch.
@@ -120,109 +327,312 @@ def send_states_to_kinesis(json_resultado: dict, batch_size: int = 500) -> bool:
 
     logger.info(f"Sending {len(states)} states to Kinesis stream '{stream_name}' in batches of {batch_size}...")
 
-    all_ok = True
+    if _shard_map is not None:
+        _get_shard_map(stream_name)  # relê o mapa se o TTL venceu
+
+    # Monta todos os records (direto das colunas quando vier de um StateBatch)
+    partitioner = _get_partitioner(stream_name)
+    latitude = longitude = None
+    with metrics.timer("SerializeMs"):
+        if isinstance(states, StateRecords):
+            payloads = serializer.encode_batch(states.batch)
+            icao24 = states.batch.icao24
+            if partitioner.uses_position:
+                latitude, longitude = states.batch.latitude, states.batch.longitude
+        else:
+            payloads = serializer.encode_states(states)
+            icao24 = [state.get("icao24") for state in states]
+            if partitioner.uses_position:
+                latitude = [state.get("latitude") for state in states]
+                longitude = [state.get("longitude") for state in states]
+
+    with metrics.timer("PartitionMs"):
+        partition_keys, hash_keys = partitioner.assign(icao24, latitude, longitude)
+    records = [
+        {"Data": data, "PartitionKey": partition_key}
+        for data, partition_key in zip(payloads, partition_keys)
+    ]
+    if hash_keys is not None:
+        # Shard escolhido pela estratégia, não pelo md5 da PartitionKey
+        for record, hash_key in zip(records, hash_keys):
+            record["ExplicitHashKey"] = hash_key
+
+    aggregator = _get_record_aggregator(stream_name)
+    if aggregator is not None:
+        with metrics.timer("AggregateMs"):
+            records = aggregator.aggregate(records)
+        logger.info(f"Aggregated {len(states)} states into {len(records)} Kinesis records")
+
+    # Envia em lotes (até 500 registros / 5 MB por PutRecords) com requisições
+    # concorrentes; só os registros que falharam são reenviados, com backoff
+    sender = KinesisSender(
+        kinesis_client,
+        stream_name,
+        max_workers=int(os.environ.get("KINESIS_MAX_WORKERS", "4")),
+        max_attempts=int(os.environ.get("KINESIS_MAX_ATTEMPTS", "5")),
+        max_records=batch_size,
+        logger=logger,
+    )
+    with metrics.timer("KinesisPutMs"):
+        report = sender.send(records)
+    if metrics.enabled:
+        metrics.count("RecordsSent", len(states))
+        metrics.count("KinesisRecords", report.records)
+        metrics.count("KinesisRecordsFailed", report.failed)
+        metrics.count("KinesisRetries", report.retries)
+        metrics.count("PayloadBytes", sum(len(r["Data"]) for r in records), BYTES)
+
+    for batch in report.batches:
+        if batch.ok:
+            logger.info(
+                f"Batch {batch.index} - sent {batch.records} records successfully "
+                f"in {batch.latency_ms:.0f} ms ({batch.attempts} attempt(s))"
+            )
+        else:
+            logger.error(
+                f"Batch {batch.index} - {batch.failed}/{batch.records} records failed "
+                f"after {batch.attempts} attempt(s): {batch.error_codes}"
+            )
+
+    logger.info(
+        f"Finished sending {len(states)} states to Kinesis (batched): "
+        f"{len(report.batches)} batches, {report.retries} retries, {report.failed} failed, "
+        f"{report.elapsed_ms:.0f} ms total, batch p50 {report.latency_percentile(50):.0f} ms / "
+        f"max {report.latency_percentile(100):.0f} ms"
+    )
+    return report.ok
+
+
+def update_tracks(states: StateBatch, now: float | None = None) -> None:
+    """
+    Acrescenta as posições ao TrackBuilder e envia os tracks concluídos
+    (pouso, intervalo sem posição ou despejo LRU) ao stream TRACKS_STREAM,
+    em GeoJSON, binário ou comprimido (TRACKS_FORMAT), simplificados com
+    tolerância de TRACKS_SIMPLIFY_M metros.
+    """
+    if track_builder is None:
+        return
+    track_builder.add_batch(states)
+    track_builder.expire(now)
+    _send_completed_tracks()
+
+
+def flush_tracks() -> None:
+    """Fecha e envia todos os tracks abertos (encerramento do poller)."""
+    if track_builder is None:
+        return
+    track_builder.flush()
+    _send_completed_tracks()
+
+
+def _send_completed_tracks() -> None:
+    completed = track_builder.drain()
+    if not completed:
+        return
 
-    # Monta todos os records
     records = [
-        {
-            "Data": json.dumps(state),
-            "PartitionKey": state.get("icao24") or "unknown",
-        }
-        for state in states
+        {"Data": data, "PartitionKey": partition_key}
+        for partition_key, data in encode_tracks(
+            completed,
+            os.environ.get("TRACKS_FORMAT", "geojson"),
+            float(os.environ.get("TRACKS_SIMPLIFY_M", "0")),
+        )
     ]
+    report = KinesisSender(kinesis_client, os.environ["TRACKS_STREAM"], logger=logger).send(records)
+    logger.info(
+        f"Tracks: {len(completed)} completed, {report.failed} failed to send, "
+        f"{len(track_builder)} open"
+    )
 
-    # Envia em lotes de até 500 registros (limite do Kinesis PutRecords)
-    for i in range(0, len(records), batch_size):
-        batch = records[i : i + batch_size]
-        try:
-            response = kinesis_client.put_records(
-                StreamName=stream_name,
-                Records=batch,
-            )
-            failed = response.get("FailedRecordCount", 0)
-            if failed > 0:
-                all_ok = False
-                logger.error(
-                    f"Batch {i//batch_size} - {failed}/{len(batch)} records failed"
-                )
-            else:
-                logger.info(
-                    f"Batch {i//batch_size} - sent {len(batch)} records successfully"
-                )
-        except Exception as e:
-            all_ok = False
-            logger.error(f"Error sending batch {i//batch_size} to Kinesis: {e}")
-
-    logger.info(f"Finished sending {len(states)} states to Kinesis (batched)")
-    return all_ok
-
-
-def get_opensky_states(access_token):
+
+def _get_tiler():
+    global _tiler
+    if _tiler is None:
+        from utils.tiles import DensityTiler
+
+        _tiler = DensityTiler.from_env()
+    return _tiler
+
+
+def update_tiles(states: StateBatch, now: float | None = None) -> None:
     """
-    Chama o endpoint /api/states/all usando Bearer token e
-    retorna uma lista de StateVector.
+    Atualiza os tiles de densidade (contagem por célula e faixa de altitude,
+    em TILES_ZOOMS) com as posições do snapshot.
+    """
+    if not os.environ.get("TILES_STREAM"):
+        return
+    with metrics.timer("TilesMs"):
+        _get_tiler().update(states, now)
+
+
+def publish_tiles(now: float | None = None) -> None:
+    """
+    Remove as aeronaves sem posição há TILES_MAX_AGE_S e envia os tiles que
+    mudaram desde o último envio ao stream TILES_STREAM (TILES_FORMAT).
+    """
+    if not os.environ.get("TILES_STREAM"):
+        return
+    tiler = _get_tiler()
+    with metrics.timer("TilesMs"):
+        tiler.expire(now)
+        tiles = tiler.drain()
+    if not tiles:
+        return
+
+    from utils.tiles import encode_tiles
+
+    records = [
+        {"Data": data, "PartitionKey": partition_key}
+        for partition_key, data in encode_tiles(tiles, os.environ.get("TILES_FORMAT", "json"))
+    ]
+    report = KinesisSender(kinesis_client, os.environ["TILES_STREAM"], logger=logger).send(records)
+    # Tiles não entregues voltam a ficar sujos e saem de novo no próximo envio
+    tiler.mark_dirty(record["PartitionKey"] for record in report.undelivered)
+    metrics.count("TilesSent", len(records) - report.failed)
+    logger.info(
+        f"Tiles: {len(tiles)} changed, {report.failed} failed to send, "
+        f"{len(tiler)} aircraft binned"
+    )
+
+
+def get_opensky_states(access_token, params=None) -> StateBatch:
     """
-    headers = {"Authorization": f"Bearer {access_token}"}
+    Chama o endpoint /api/states/all usando Bearer token e
+    retorna um StateBatch (colunar). Os StateVector são criados
+    sob demanda, apenas quando uma linha é acessada.
 
+    params: query string opcional (ver opensky_query_params).
+    """
     try:
-        resp = requests.get(OPENSKY_STATES_URL, headers=headers, timeout=15)
-        resp.raise_for_status()
-        body = resp.json()
+        with metrics.timer("DownloadMs"):
+            resp = _get_states_response(access_token, params)
+        with metrics.timer("DecodeMs"):
+            body = resp.json()
     except requests.RequestException as e:
         logger.error(f"Error calling OpenSky states API: {e}")
-        return []
+        metrics.count("FetchErrors")
+        return StateBatch()
 
-    raw_states = body.get("states", []) or []
-    states: list[StateVector] = []
-
-    for row in raw_states:
-        try:
-            state = StateVector.from_api_response(row)
-            states.append(state)
-        except Exception as e:
-            logger.warning(f"Failed to parse state vector: {e}")
+    with metrics.timer("DecodeMs"):
+        raw_states = body.get("states", []) or []
+        states = StateBatch.from_api_response(raw_states, logger=logger)
+    metrics.count("DownloadBytes", len(resp.content), BYTES)
+    metrics.count("RecordsDecoded", len(states))
 
     logger.info(f"Retrieved {len(states)} state vectors from OpenSky API")
     return states
 
 
-
-def lambda_handler(event, context):
+def stream_opensky_states(access_token, batch_rows: int = 2000, params=None):
     """
-    Main Lambda handler that orchestrates the flight data ingestion pipeline.
+    Versão streaming de get_opensky_states: lê o corpo de /api/states/all
+    do socket de forma incremental e gera StateBatch de até batch_rows
+    linhas, sem carregar a resposta inteira em memória.
     """
-    # DEBUG: Verificar DNS
-    import socket
     try:
-        logger.info("Testing DNS resolution...")
-        ip = socket.gethostbyname('auth.opensky-network.org')
-        logger.info(f"✅ DNS resolved: auth.opensky-network.org → {ip}")
-    except socket.gaierror as e:
-        logger.error(f"❌ DNS resolution failed: {e}")
+        resp = _get_states_response(access_token, params, stream=True)
+    except requests.RequestException as e:
+        logger.error(f"Error calling OpenSky states API: {e}")
+        return
+
+    with resp:
+        rows = iter_state_rows(resp.iter_content(chunk_size=STREAM_CHUNK_BYTES))
+        yield from iter_state_batches(rows, batch_rows, logger=logger)
+
+
+def _ingest_streaming(access_token, params=None) -> dict:
+    """
+    Pipeline em modo streaming (STREAMING_MODE=true): cada lote decodificado
+    é filtrado (modo delta), serializado e enviado ao Kinesis enquanto o
+    download continua.
+    """
+    batch_rows = int(os.environ.get("STREAMING_BATCH_ROWS", "2000"))
+    timestamp = datetime.now().isoformat()
+    poll_time = time.time()
+    received = 0
+    sent = 0
+    all_ok = True
+
+    for states in stream_opensky_states(access_token, batch_rows, params):
+        received += len(states)
+        metrics.count("RecordsDecoded", len(states))
+        update_tracks(states, now=poll_time)
+        update_tiles(states, now=poll_time)
+        if delta_filter is not None:
+            states = delta_filter.filter(states, now=poll_time)
+        ok = send_states_to_kinesis(convert_states_response_to_json(states))
+        if ok and delta_filter is not None:
+            delta_filter.commit(states, now=poll_time)
+        all_ok = all_ok and ok
+        sent += len(states)
+    publish_tiles(now=poll_time)
+
+    logger.info(f"Streamed {received} state vectors from OpenSky API, {sent} sent to Kinesis")
+    if not received:
+        logger.warning("No states retrieved from OpenSky API")
         return {
-            "statusCode": 503,
-            "body": json.dumps({"error": f"DNS error: {str(e)}"})
+            "statusCode": 500,
+            "body": json.dumps("Failed to retrieve states from OpenSky API"),
         }
-    
-    # DEBUG: Verificar conectividade TCP
-    try:
-        logger.info("Testing TCP connectivity to port 443...")
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(30)
-        result = sock.connect_ex((ip, 443))
-        sock.close()
-        
-        if result == 0:
-            logger.info("✅ Port 443 is open")
+    if not all_ok:
+        return {
+            "statusCode": 400,
+            "body": json.dumps(
+                "Failed to send some/all states to Kinesis "
+                "(check KINESIS_STREAM env var and Lambda logs)"
+            ),
+        }
+    return {
+        "statusCode": 200,
+        "body": json.dumps(
+            {
+                "message": "Flight data ingestion completed successfully",
+                "states_processed": sent,
+                "timestamp": timestamp,
+            }
+        ),
+    }
+
+
+
+def health_check() -> dict:
+    """
+    Diagnóstico de rede (DNS, TCP e HTTPS até os hosts da OpenSky) com tempos
+    de cada etapa. Fica fora do caminho normal de ingestão; aquece o cache de
+    DNS e o pool de conexões da sessão compartilhada.
+    """
+    report = run_health_check(http_session, dns_cache)
+    for target in report["targets"]:
+        if target["ok"]:
+            logger.info(
+                f"Health check {target['host']} ({target.get('address')}): "
+                f"dns={target['dns_ms']}ms tcp={target['tcp_ms']}ms "
+                f"https={target['https_ms']}ms status={target['status']}"
+            )
         else:
-            logger.error(f"❌ Port 443 is blocked (errno: {result})")
-    except Exception as e:
-        logger.error(f"❌ Error testing TCP: {e}")
-        
+            logger.error(f"Health check {target['host']} failed: {target.get('error') or target.get('status')}")
+    return {
+        "statusCode": 200 if report["ok"] else 503,
+        "body": json.dumps(report),
+    }
+
+
+@metrics.handler
+def lambda_handler(event, context):
+    """
+    Main Lambda handler that orchestrates the flight data ingestion pipeline.
+    """
+    # Health check sob demanda ({"action": "healthcheck"}): só diagnóstico de rede
+    if isinstance(event, dict) and event.get("action") == "healthcheck":
+        return health_check()
+    if os.environ.get("HEALTHCHECK_MODE", "").lower() in ("1", "true", "yes"):
+        health_check()
+
     try:
         # 1) Autenticar na OpenSky (OAuth2 Client Credentials)
         logger.info("Getting OpenSky access token...")
         access_token = get_opensky_access_token()
+        logger.info(f"Auth cache stats: {auth_cache_stats()}")
         if not access_token:
             return {
                 "statusCode": 500,
@@ -230,8 +640,12 @@ def lambda_handler(event, context):
             }
 
         # 2) Buscar estados de voos
+        if os.environ.get("STREAMING_MODE", "").lower() in ("1", "true", "yes"):
+            logger.info("Streaming states from OpenSky API...")
+            return _ingest_streaming(access_token, opensky_query_params(event))
+
         logger.info("Starting to fetch states from OpenSky API...")
-        states = get_opensky_states(access_token)
+        states = get_opensky_states(access_token, opensky_query_params(event))
         if not states:
             logger.warning("No states retrieved from OpenSky API")
             return {
@@ -239,6 +653,20 @@ def lambda_handler(event, context):
                 "body": json.dumps("Failed to retrieve states from OpenSky API"),
             }
 
+        # 2.1) Tracks e tiles de densidade: todas as posições, antes do filtro delta
+        update_tracks(states)
+        update_tiles(states)
+        publish_tiles()
+
+        # 2.2) Modo delta: mantém só os estados que mudaram desde a última emissão
+        if delta_filter is not None:
+            total_states = len(states)
+            states = delta_filter.filter(states)
+            metrics.count("RecordsUnchanged", total_states - len(states))
+            logger.info(
+                f"Delta mode: {len(states)}/{total_states} states changed since last emission"
+            )
+
         # 3) Converter para JSON
         logger.info("Converting states to JSON format...")
         json_resultado = convert_states_response_to_json(states)
@@ -258,6 +686,9 @@ def lambda_handler(event, context):
                 ),
             }
 
+        if delta_filter is not None:
+            delta_filter.commit(states)
+
         return {
             "statusCode": 200,
             "body": json.dumps(
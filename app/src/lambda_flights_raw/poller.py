@@ -0,0 +1,148 @@
+"""
+Poller de longa duração (container/ECS) para a ingestão da OpenSky.
+
+Reaproveita as funções da Lambda (lambda_function.py) em loop, com cadência
+fixa sem deriva: o download do próximo snapshot acontece enquanto o anterior
+ainda está sendo filtrado/serializado/enviado ao Kinesis numa thread de envio.
+O intervalo se ajusta aos créditos restantes informados pela OpenSky e a um
+429 com retry-after. SIGTERM/SIGINT encerram o loop depois do envio em
+andamento e fecham os tracks abertos.
+
+Uso:
+    python poller.py [--interval 10] [--max-interval 300] [--cycles N]
+
+Variáveis: POLL_INTERVAL_S, POLL_MAX_INTERVAL_S, POLLER_NAME, além das
+mesmas da Lambda (KINESIS_STREAM, OPENSKY_SECRET_ARN, DELTA_MODE, ...).
+"""
+
+import argparse
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import lambda_function as ingest
+from utils.columnar import StateBatch
+from utils.http_session import states_credit_cost
+from utils.scheduler import CadenceController, FixedRateScheduler
+
+logger = logging.getLogger("poller")
+
+
+class Poller:
+    """Fetch on the main thread, process/send on a single sender thread."""
+
+    def __init__(
+        self,
+        interval_s: float = 10.0,
+        max_interval_s: float = 300.0,
+        params=None,
+    ):
+        self.params = params if params is not None else ingest.opensky_query_params()
+        self.scheduler = FixedRateScheduler(interval_s)
+        self.cadence = CadenceController(interval_s, max_interval_s, states_credit_cost(self.params))
+        self.stop = threading.Event()
+        # Uma thread só: os lotes são enviados (e o modo delta confirmado) em ordem
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix="poller-send")
+        self._pending: Optional[Future] = None
+        self.cycles = 0
+        self.sent = 0
+        self.failed_cycles = 0
+
+    def install_signal_handlers(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._on_signal)
+
+    def _on_signal(self, signum, frame) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, finishing the current cycle")
+        self.stop.set()
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        logger.info(
+            f"Polling every {self.scheduler.interval_s:g}s "
+            f"({self.cadence.credit_cost} credit(s) per call)"
+        )
+        try:
+            while not self.stop.is_set():
+                self.cycle()
+                if max_cycles is not None and self.cycles >= max_cycles:
+                    break
+                self.scheduler.set_interval(self.cadence.interval(ingest.rate_limit))
+                if not self.scheduler.wait(self.stop, not_before=ingest.rate_limit.blocked_for()):
+                    break
+        finally:
+            self.shutdown()
+
+    def cycle(self) -> None:
+        """Fetch one snapshot and hand it to the sender thread."""
+        self.cycles += 1
+        poll_time = time.time()
+        access_token = ingest.get_opensky_access_token()
+        if not access_token:
+            self.failed_cycles += 1
+            logger.error("Failed to obtain OpenSky access token, skipping cycle")
+            return
+        states = ingest.get_opensky_states(access_token, self.params)
+
+        # Contrapressão: no máximo um lote na fila de envio
+        self._wait_pending()
+        if not states:
+            self.failed_cycles += 1
+            logger.warning(f"No states retrieved (rate limit blocked for {ingest.rate_limit.blocked_for():.0f}s)")
+            return
+        self._pending = self._sender.submit(self._process, states, poll_time)
+
+    def _process(self, states: StateBatch, poll_time: float) -> bool:
+        """Same steps as lambda_handler after the download (runs on the sender thread)."""
+        ingest.update_tracks(states, now=poll_time)
+        ingest.update_tiles(states, now=poll_time)
+        ingest.publish_tiles(now=poll_time)
+        if ingest.delta_filter is not None:
+            states = ingest.delta_filter.filter(states, now=poll_time)
+        ok = ingest.send_states_to_kinesis(ingest.convert_states_response_to_json(states))
+        if ok and ingest.delta_filter is not None:
+            ingest.delta_filter.commit(states, now=poll_time)
+        self.sent += len(states)
+        ingest.metrics.flush()
+        return ok
+
+    def _wait_pending(self) -> None:
+        if self._pending is None:
+            return
+        try:
+            if not self._pending.result():
+                self.failed_cycles += 1
+        except Exception as e:
+            self.failed_cycles += 1
+            logger.error(f"Sending batch failed: {e}")
+        self._pending = None
+
+    def shutdown(self) -> None:
+        self._wait_pending()
+        self._sender.shutdown(wait=True)
+        ingest.flush_tracks()
+        ingest.metrics.flush()
+        logger.info(
+            f"Poller stopped after {self.cycles} cycles: {self.sent} states sent, "
+            f"{self.failed_cycles} failed cycles, {self.scheduler.skipped} ticks skipped"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("POLL_INTERVAL_S", "10")))
+    parser.add_argument("--max-interval", type=float, default=float(os.environ.get("POLL_MAX_INTERVAL_S", "300")))
+    parser.add_argument("--cycles", type=int, help="stop after N cycles")
+    args = parser.parse_args()
+
+    ingest.metrics.dimensions["FunctionName"] = os.environ.get("POLLER_NAME", "flights-poller")
+    poller = Poller(args.interval, args.max_interval)
+    poller.install_signal_handlers()
+    poller.run(args.cycles)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""
+KPL-compatible record aggregation for Kinesis PutRecords.
+
+Aggregated record layout (same as the Kinesis Producer Library)::
+
+    0xF3 0x89 0x9A 0xC2 | protobuf AggregatedRecord | md5(protobuf)
+
+    message AggregatedRecord {
+        repeated string partition_key_table     = 1;
+        repeated string explicit_hash_key_table = 2;
+        repeated Record records                 = 3;
+    }
+    message Record {
+        required uint64 partition_key_index     = 1;
+        optional uint64 explicit_hash_key_index = 2;
+        required bytes  data                    = 3;
+    }
+
+Records are grouped by the shard hash range their partition key (or explicit
+hash key) maps to, and
+each aggregated record carries an ExplicitHashKey inside that range, so every
+user record still lands on the shard it would have used without aggregation.
+"""
+
+import bisect
+import hashlib
+from typing import Optional, List, Dict, Any, Tuple
+
+KPL_MAGIC = b"\xf3\x89\x9a\xc2"
+DIGEST_SIZE = 16
+
+MAX_HASH_KEY = 2 ** 128 - 1
+
+# Limite de um record do Kinesis (Data + PartitionKey)
+MAX_RECORD_BYTES = 1024 * 1024
+# Uma unidade de PUT payload = 25 KB
+DEFAULT_AGGREGATE_BYTES = 25 * 1024
+
+HashRange = Tuple[int, int]
+
+
+def partition_key_hash(partition_key: str) -> int:
+    """128-bit hash Kinesis uses to map a partition key to a shard."""
+    return int.from_bytes(hashlib.md5(partition_key.encode("utf-8")).digest(), "big")
+
+
+def even_hash_ranges(count: int) -> List[HashRange]:
+    """Split the hash key space into ``count`` equal ranges (stand-in for the shard map)."""
+    count = max(1, count)
+    step = (MAX_HASH_KEY + 1) // count
+    ranges = [(i * step, (i + 1) * step - 1) for i in range(count)]
+    ranges[-1] = (ranges[-1][0], MAX_HASH_KEY)
+    return ranges
+
+
+def list_open_shards(kinesis_client, stream_name: str) -> List[Tuple[str, int, int]]:
+    """(shard id, starting hash key, ending hash key) of the open shards of a stream (ListShards)."""
+    shards = []
+    kwargs: Dict[str, Any] = {"StreamName": stream_name}
+    while True:
+        response = kinesis_client.list_shards(**kwargs)
+        for shard in response.get("Shards", []):
+            if shard.get("SequenceNumberRange", {}).get("EndingSequenceNumber"):
+                continue  # shard fechado (após split/merge)
+            hash_range = shard["HashKeyRange"]
+            shards.append((shard["ShardId"], int(hash_range["StartingHashKey"]), int(hash_range["EndingHashKey"])))
+        token = response.get("NextToken")
+        if not token:
+            break
+        kwargs = {"NextToken": token}
+    return sorted(shards, key=lambda shard: shard[1])
+
+
+def list_open_shard_ranges(kinesis_client, stream_name: str) -> List[HashRange]:
+    """Hash key ranges of the open shards of a stream (ListShards)."""
+    return [(start, end) for _, start, end in list_open_shards(kinesis_client, stream_name)]
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _varint_size(value: int) -> int:
+    size = 1
+    while value > 0x7F:
+        value >>= 7
+        size += 1
+    return size
+
+
+def _length_delimited(tag: int, payload: bytes) -> bytes:
+    return bytes((tag,)) + _varint(len(payload)) + payload
+
+
+def _record_message(partition_key_index: int, data: bytes) -> bytes:
+    return b"\x08" + _varint(partition_key_index) + _length_delimited(0x1A, data)
+
+
+def encode_aggregated(partition_keys: List[str], entries: List[Tuple[int, bytes]]) -> bytes:
+    """Encode (partition_key_index, data) entries as one KPL aggregated record."""
+    body = b"".join(
+        [_length_delimited(0x0A, key.encode("utf-8")) for key in partition_keys]
+        + [_length_delimited(0x1A, _record_message(index, data)) for index, data in entries]
+    )
+    return KPL_MAGIC + body + hashlib.md5(body).digest()
+
+
+class RecordAggregator:
+    """
+    Packs PutRecords entries into KPL aggregated records.
+
+    ``hash_ranges`` should be the stream's open shard ranges
+    (``list_open_shard_ranges``); with a single range every record goes into
+    the same aggregates, which is only right for single-shard streams.
+    """
+
+    def __init__(self, hash_ranges: Optional[List[HashRange]] = None, max_bytes: int = DEFAULT_AGGREGATE_BYTES):
+        if not 0 < max_bytes <= MAX_RECORD_BYTES:
+            raise ValueError(f"max_bytes must be between 1 and {MAX_RECORD_BYTES}")
+        self.hash_ranges = sorted(hash_ranges or even_hash_ranges(1))
+        self._starts = [start for start, _ in self.hash_ranges]
+        self.max_bytes = max_bytes
+
+    def _range_index(self, hash_key: int) -> int:
+        return max(0, bisect.bisect_right(self._starts, hash_key) - 1)
+
+    def aggregate(self, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Aggregate ``{"Data", "PartitionKey"}`` entries.
+
+        An ``ExplicitHashKey`` (see utils/partitioning.py) takes the place of
+        the partition key hash when grouping. Returns PutRecords entries;
+        groups with a single record are passed through unaggregated.
+        """
+        groups: Dict[int, List[Tuple[str, int, bytes]]] = {}
+        for record in records:
+            key = record["PartitionKey"]
+            data = record["Data"]
+            if isinstance(data, str):
+                data = data.encode("utf-8")
+            explicit = record.get("ExplicitHashKey")
+            hash_key = int(explicit) if explicit is not None else partition_key_hash(key)
+            groups.setdefault(self._range_index(hash_key), []).append((key, hash_key, data))
+
+        output = []
+        for index in sorted(groups):
+            output.extend(self._aggregate_group(groups[index]))
+        return output
+
+    def _aggregate_group(self, group: List[Tuple[str, int, bytes]]) -> List[Dict[str, Any]]:
+        output = []
+        keys: List[str] = []
+        key_index: Dict[str, int] = {}
+        entries: List[Tuple[int, bytes]] = []
+        first_hash = 0
+        size = 0
+        budget = 0
+
+        def flush():
+            if len(entries) == 1:
+                # ExplicitHashKey igual ao hash da chave é redundante, mas inofensivo
+                output.append({"Data": entries[0][1], "PartitionKey": keys[0], "ExplicitHashKey": str(first_hash)})
+            else:
+                output.append({
+                    "Data": encode_aggregated(keys, entries),
+                    "PartitionKey": keys[0],
+                    "ExplicitHashKey": str(first_hash),
+                })
+
+        for key, hash_key, data in group:
+            added = _added_size(key, data, key_index, len(keys))
+            if entries and size + added > budget:
+                flush()
+                keys, key_index, entries, size = [], {}, [], 0
+                added = _added_size(key, data, key_index, 0)
+            if not entries:
+                first_hash = hash_key
+                # magic + md5 + PartitionKey do record agregado também contam no limite
+                budget = self.max_bytes - len(KPL_MAGIC) - DIGEST_SIZE - len(key.encode("utf-8"))
+            index = key_index.get(key)
+            if index is None:
+                index = key_index[key] = len(keys)
+                keys.append(key)
+            entries.append((index, data))
+            size += added
+
+        if entries:
+            flush()
+        return output
+
+
+def _added_size(key: str, data: bytes, key_index: Dict[str, int], next_index: int) -> int:
+    """Bytes one more record adds to an AggregatedRecord protobuf."""
+    index = key_index.get(key)
+    size = 0
+    if index is None:
+        index = next_index
+        key_bytes = len(key.encode("utf-8"))
+        size += 1 + _varint_size(key_bytes) + key_bytes
+    message_size = 1 + _varint_size(index) + 1 + _varint_size(len(data)) + len(data)
+    return size + 1 + _varint_size(message_size) + message_size
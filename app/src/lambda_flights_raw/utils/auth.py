@@ -0,0 +1,102 @@
+"""Caches for credentials and OAuth tokens that survive warm Lambda invocations."""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional, Callable, Generic, TypeVar, Tuple, Dict
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class CacheStats:
+    """Counters for a cache (reported in the logs/metrics)."""
+
+    hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    proactive_refreshes: int = 0
+    failures: int = 0
+    invalidations: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ExpiringCache(Generic[T]):
+    """
+    Single cached value with an expiry, loaded through ``loader``.
+
+    ``loader`` returns ``(value, ttl_seconds)`` or None on failure. A value
+    is served until ``ttl - safety_margin``. Once less than
+    ``refresh_ahead`` of its lifetime remains it is refreshed proactively;
+    if that refresh fails, the still-valid value keeps being served.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Optional[Tuple[T, float]]],
+        safety_margin: float = 30.0,
+        refresh_ahead: float = 0.2,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.loader = loader
+        self.safety_margin = safety_margin
+        self.refresh_ahead = refresh_ahead
+        self.clock = clock
+        self.stats = CacheStats()
+        self._value: Optional[T] = None
+        self._loaded_at = 0.0
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _valid(self, now: float) -> bool:
+        return self._value is not None and now < self._expires_at
+
+    def _due_for_refresh(self, now: float) -> bool:
+        lifetime = self._expires_at - self._loaded_at
+        return now >= self._expires_at - lifetime * self.refresh_ahead
+
+    def get(self, force_refresh: bool = False) -> Optional[T]:
+        """Cached value, loading or refreshing it when needed."""
+        with self._lock:
+            now = self.clock()
+            if not force_refresh and self._valid(now):
+                if not self._due_for_refresh(now):
+                    self.stats.hits += 1
+                    return self._value
+                self.stats.proactive_refreshes += 1
+                if self._load(now):
+                    return self._value
+                # Refresh antecipado falhou: o valor atual ainda é válido
+                self.stats.hits += 1
+                return self._value
+
+            self.stats.misses += 1
+            if self._load(now):
+                return self._value
+            return None
+
+    def _load(self, now: float) -> bool:
+        loaded = self.loader()
+        if loaded is None:
+            self.stats.failures += 1
+            return False
+        value, ttl = loaded
+        self.stats.refreshes += 1
+        self._value = value
+        self._loaded_at = now
+        self._expires_at = now + max(0.0, float(ttl) - self.safety_margin)
+        return True
+
+    def invalidate(self) -> None:
+        """Drop the cached value (e.g. after a 401)."""
+        with self._lock:
+            self.stats.invalidations += 1
+            self._value = None
+            self._expires_at = 0.0
+
+    @property
+    def expires_in(self) -> float:
+        """Seconds until the cached value stops being served (0 if none)."""
+        return max(0.0, self._expires_at - self.clock()) if self._value is not None else 0.0
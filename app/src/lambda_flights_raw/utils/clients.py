@@ -0,0 +1,89 @@
+"""
+Lazily constructed boto3 clients for a faster cold start.
+
+Importar boto3 e criar um client custa ~300 ms (carga dos modelos JSON do
+botocore). Um ``LazyClient`` só faz isso no primeiro uso, ou em background
+logo após o import (``prewarm``), em paralelo com a autenticação e o download
+da OpenSky, que são I/O.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Optional
+
+# Modos de inicialização dos clients (CLIENT_INIT)
+CLIENT_INIT_MODES = ("lazy", "prewarm", "eager")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def boto3_session():
+    """One boto3 Session per container, shared by every client (the model loader is per session)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import boto3
+
+                _session = boto3.session.Session()
+    return _session
+
+
+class LazyClient:
+    """
+    Stand-in for a boto3 client that is built on first attribute access.
+
+    ``client.put_records(...)`` works as on the real client; construction
+    happens once, under a lock, so a ``prewarm`` thread and the handler never
+    build it twice.
+    """
+
+    def __init__(self, service_name: str, factory: Optional[Callable[[], Any]] = None):
+        self.service_name = service_name
+        self._factory = factory or (lambda: boto3_session().client(service_name))
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def __getattr__(self, name: str):
+        # Só chamado para atributos que não existem no LazyClient: delega ao client real
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+
+def client_init_mode(environ=None) -> str:
+    """``CLIENT_INIT`` (lazy / prewarm / eager); defaults to prewarm."""
+    environ = os.environ if environ is None else environ
+    mode = (environ.get("CLIENT_INIT") or "prewarm").lower()
+    if mode not in CLIENT_INIT_MODES:
+        raise ValueError(f"Unknown CLIENT_INIT '{mode}' (expected one of {CLIENT_INIT_MODES})")
+    return mode
+
+
+def init_clients(*clients: LazyClient, mode: Optional[str] = None) -> None:
+    """Apply the CLIENT_INIT mode to the given clients (at module load)."""
+    mode = mode or client_init_mode()
+    if mode == "eager":
+        for client in clients:
+            client.get()
+    elif mode == "prewarm":
+        # Uma thread só: os clients compartilham a Session e o loader do botocore
+        def warm():
+            for client in clients:
+                client.get()
+
+        threading.Thread(target=warm, name="prewarm-clients", daemon=True).start()
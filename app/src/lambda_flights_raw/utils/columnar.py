@@ -0,0 +1,297 @@
+"""Columnar (struct-of-arrays) decoding of OpenSky /states/all responses."""
+
+import math
+import sys
+from array import array
+from datetime import datetime
+from collections.abc import Sequence
+from typing import Optional, List, Dict, Any, Iterator
+
+from .models import StateVector, CompactStateVector, PositionSource
+
+
+# Field order of the OpenSky state vector array (and of StateVector.to_dict)
+STATE_FIELDS = (
+    "icao24",
+    "callsign",
+    "origin_country",
+    "time_position",
+    "last_contact",
+    "longitude",
+    "latitude",
+    "altitude",
+    "on_ground",
+    "velocity",
+    "heading",
+    "vertical_rate",
+    "sensors",
+    "geo_altitude",
+    "squawk",
+    "spi",
+    "position_source",
+)
+
+# Sentinels used for missing values inside typed arrays
+NO_TIMESTAMP = 0
+NO_FLAG = -1
+
+
+class StateBatch:
+    """
+    A snapshot of state vectors stored column by column.
+
+    Timestamps are kept as epoch seconds (0 = missing), floats as doubles
+    (NaN = missing) and booleans/position source as small ints (-1 = missing).
+    StateVector objects are only built when a row is explicitly requested.
+    """
+
+    __slots__ = (
+        "icao24", "callsign", "origin_country", "time_position", "last_contact",
+        "longitude", "latitude", "altitude", "on_ground", "velocity", "heading",
+        "vertical_rate", "sensors", "geo_altitude", "squawk", "spi",
+        "position_source", "_iso_cache",
+    )
+
+    def __init__(self):
+        self.icao24: List[Optional[str]] = []
+        self.callsign: List[Optional[str]] = []
+        self.origin_country: List[Optional[str]] = []
+        self.time_position = array("q")
+        self.last_contact = array("q")
+        self.longitude = array("d")
+        self.latitude = array("d")
+        self.altitude = array("d")
+        self.on_ground = array("b")
+        self.velocity = array("d")
+        self.heading = array("d")
+        self.vertical_rate = array("d")
+        self.sensors: List[Optional[List[int]]] = []
+        self.geo_altitude = array("d")
+        self.squawk: List[Optional[str]] = []
+        self.spi = array("b")
+        self.position_source = array("b")
+        self._iso_cache: Dict[int, str] = {}
+
+    @classmethod
+    def from_api_response(cls, rows: List[List[Any]], logger=None) -> 'StateBatch':
+        """Decode the raw ``states`` array in a single pass."""
+        batch = cls()
+        batch.extend(rows, logger=logger)
+        return batch
+
+    def extend(self, rows, logger=None) -> int:
+        """Append raw API rows to the batch; returns the number of rows added."""
+        nan = math.nan
+        icao24 = self.icao24.append
+        callsign = self.callsign.append
+        origin_country = self.origin_country.append
+        time_position = self.time_position.append
+        last_contact = self.last_contact.append
+        longitude = self.longitude.append
+        latitude = self.latitude.append
+        altitude = self.altitude.append
+        on_ground = self.on_ground.append
+        velocity = self.velocity.append
+        heading = self.heading.append
+        vertical_rate = self.vertical_rate.append
+        sensors = self.sensors.append
+        geo_altitude = self.geo_altitude.append
+        squawk = self.squawk.append
+        spi = self.spi.append
+        position_source = self.position_source.append
+
+        start = len(self.icao24)
+        for row in rows:
+            n = len(self.icao24)
+            try:
+                (r_icao24, r_callsign, r_country, r_time_position, r_last_contact,
+                 r_lon, r_lat, r_alt, r_on_ground, r_velocity, r_heading,
+                 r_vertical_rate, r_sensors, r_geo_alt, r_squawk, r_spi,
+                 r_position_source) = row[:17]
+                time_position(int(r_time_position) if r_time_position else NO_TIMESTAMP)
+                last_contact(int(r_last_contact) if r_last_contact else NO_TIMESTAMP)
+                longitude(nan if r_lon is None else float(r_lon))
+                latitude(nan if r_lat is None else float(r_lat))
+                altitude(nan if r_alt is None else float(r_alt))
+                on_ground(NO_FLAG if r_on_ground is None else (1 if r_on_ground else 0))
+                velocity(nan if r_velocity is None else float(r_velocity))
+                heading(nan if r_heading is None else float(r_heading))
+                vertical_rate(nan if r_vertical_rate is None else float(r_vertical_rate))
+                geo_altitude(nan if r_geo_alt is None else float(r_geo_alt))
+                spi(NO_FLAG if r_spi is None else (1 if r_spi else 0))
+                position_source(NO_FLAG if r_position_source is None else PositionSource(r_position_source).value)
+                sensors([int(s) for s in r_sensors] if r_sensors else None)
+                icao24(None if r_icao24 is None else str(r_icao24))
+                callsign(None if r_callsign is None else str(r_callsign).strip())
+                origin_country(None if r_country is None else sys.intern(str(r_country)))
+                squawk(None if r_squawk is None else str(r_squawk))
+            except Exception as e:
+                self._truncate(n)
+                if logger is not None:
+                    logger.warning(f"Failed to parse state vector: {e}")
+        return len(self.icao24) - start
+
+    def take(self, indices) -> 'StateBatch':
+        """New batch with only the given rows, in the given order."""
+        indices = list(indices)
+        subset = StateBatch()
+        for name in STATE_FIELDS:
+            column = getattr(self, name)
+            picked = [column[i] for i in indices]
+            if isinstance(column, array):
+                getattr(subset, name).extend(picked)
+            else:
+                setattr(subset, name, picked)
+        subset._iso_cache = self._iso_cache
+        return subset
+
+    def _truncate(self, n: int) -> None:
+        """Drop any partially appended values beyond row ``n``."""
+        for name in STATE_FIELDS:
+            column = getattr(self, name)
+            del column[n:]
+
+    def __len__(self) -> int:
+        return len(self.icao24)
+
+    def __getitem__(self, i: int) -> StateVector:
+        return self.state_vector(i)
+
+    def __iter__(self) -> Iterator[StateVector]:
+        for i in range(len(self)):
+            yield self.state_vector(i)
+
+    def state_vector(self, i: int) -> StateVector:
+        """Materialize row ``i`` as a StateVector."""
+        time_position = self.time_position[i]
+        last_contact = self.last_contact[i]
+        position_source = self.position_source[i]
+        return StateVector(
+            icao24=self.icao24[i],
+            callsign=self.callsign[i],
+            origin_country=self.origin_country[i],
+            time_position=datetime.fromtimestamp(time_position) if time_position else None,
+            last_contact=datetime.fromtimestamp(last_contact) if last_contact else None,
+            longitude=_opt_float(self.longitude[i]),
+            latitude=_opt_float(self.latitude[i]),
+            altitude=_opt_float(self.altitude[i]),
+            on_ground=_opt_bool(self.on_ground[i]),
+            velocity=_opt_float(self.velocity[i]),
+            heading=_opt_float(self.heading[i]),
+            vertical_rate=_opt_float(self.vertical_rate[i]),
+            sensors=self.sensors[i],
+            geo_altitude=_opt_float(self.geo_altitude[i]),
+            squawk=self.squawk[i],
+            spi=_opt_bool(self.spi[i]),
+            position_source=PositionSource(position_source) if position_source != NO_FLAG else None,
+        )
+
+    def compact_state(self, i: int) -> CompactStateVector:
+        """Materialize row ``i`` as a CompactStateVector (no datetime objects)."""
+        position_source = self.position_source[i]
+        return CompactStateVector(
+            icao24=self.icao24[i],
+            callsign=self.callsign[i],
+            origin_country=self.origin_country[i],
+            time_position=self.time_position[i],
+            last_contact=self.last_contact[i],
+            longitude=_opt_float(self.longitude[i]),
+            latitude=_opt_float(self.latitude[i]),
+            altitude=_opt_float(self.altitude[i]),
+            on_ground=_opt_bool(self.on_ground[i]),
+            velocity=_opt_float(self.velocity[i]),
+            heading=_opt_float(self.heading[i]),
+            vertical_rate=_opt_float(self.vertical_rate[i]),
+            sensors=self.sensors[i],
+            geo_altitude=_opt_float(self.geo_altitude[i]),
+            squawk=self.squawk[i],
+            spi=_opt_bool(self.spi[i]),
+            position_source=position_source if position_source != NO_FLAG else None,
+        )
+
+    def isoformat(self, ts: int) -> Optional[str]:
+        """Epoch seconds to the same string StateVector.to_dict() produces (memoized)."""
+        if not ts:
+            return None
+        value = self._iso_cache.get(ts)
+        if value is None:
+            value = datetime.fromtimestamp(ts).isoformat()
+            self._iso_cache[ts] = value
+        return value
+
+    def row_dict(self, i: int) -> Dict[str, Any]:
+        """Row ``i`` as a dict, identical to ``self[i].to_dict()``."""
+        on_ground = self.on_ground[i]
+        spi = self.spi[i]
+        position_source = self.position_source[i]
+        longitude = self.longitude[i]
+        latitude = self.latitude[i]
+        altitude = self.altitude[i]
+        velocity = self.velocity[i]
+        heading = self.heading[i]
+        vertical_rate = self.vertical_rate[i]
+        geo_altitude = self.geo_altitude[i]
+        return {
+            "icao24": self.icao24[i],
+            "callsign": self.callsign[i],
+            "origin_country": self.origin_country[i],
+            "time_position": self.isoformat(self.time_position[i]),
+            "last_contact": self.isoformat(self.last_contact[i]),
+            "longitude": None if longitude != longitude else longitude,
+            "latitude": None if latitude != latitude else latitude,
+            "altitude": None if altitude != altitude else altitude,
+            "on_ground": None if on_ground == NO_FLAG else on_ground == 1,
+            "velocity": None if velocity != velocity else velocity,
+            "heading": None if heading != heading else heading,
+            "vertical_rate": None if vertical_rate != vertical_rate else vertical_rate,
+            "sensors": self.sensors[i],
+            "geo_altitude": None if geo_altitude != geo_altitude else geo_altitude,
+            "squawk": self.squawk[i],
+            "spi": None if spi == NO_FLAG else spi == 1,
+            "position_source": None if position_source == NO_FLAG else position_source,
+        }
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """All rows as dicts, in the StateVector.to_dict() format."""
+        row_dict = self.row_dict
+        return [row_dict(i) for i in range(len(self))]
+
+
+class StateRecords(Sequence):
+    """
+    Read-only list of StateVector.to_dict()-style records backed by a StateBatch.
+
+    Records are built on access, so consumers that can work on the columns
+    directly (e.g. the Kinesis serializer) never pay for the dicts.
+    """
+
+    __slots__ = ("batch",)
+
+    def __init__(self, batch: StateBatch):
+        self.batch = batch
+
+    def __len__(self) -> int:
+        return len(self.batch)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            row_dict = self.batch.row_dict
+            return [row_dict(j) for j in range(*i.indices(len(self.batch)))]
+        if i < 0:
+            i += len(self.batch)
+        if not 0 <= i < len(self.batch):
+            raise IndexError("state record index out of range")
+        return self.batch.row_dict(i)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        row_dict = self.batch.row_dict
+        for i in range(len(self.batch)):
+            yield row_dict(i)
+
+
+def _opt_float(value: float) -> Optional[float]:
+    return None if value != value else value
+
+
+def _opt_bool(value: int) -> Optional[bool]:
+    return None if value == NO_FLAG else value == 1
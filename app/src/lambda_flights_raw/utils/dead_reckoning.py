@@ -0,0 +1,267 @@
+"""
+Vectorized dead reckoning: predicted positions of every aircraft at a target time.
+
+Positions are advanced along the great circle given by the last reported
+``heading`` (true track) and ``velocity``, altitude by ``vertical_rate``,
+all in one numpy pass over the StateBatch columns (read zero-copy with
+``np.frombuffer``). Each prediction comes with an error bound that grows
+with the extrapolation time.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Sequence
+
+import numpy as np
+
+from .columnar import StateBatch, NO_TIMESTAMP
+from .models import StateVector
+
+EARTH_RADIUS_M = 6371008.8
+
+
+@dataclass(slots=True)
+class ErrorModel:
+    """
+    Parameters of the error bound.
+
+    ``error_m = position_m + velocity_ms * dt + turn_m(dt)`` where
+    ``turn_m`` is how far a standard-rate turn (``turn_rate_deg_s``) drifts
+    from the straight path. Aircraft without velocity/heading stay at their
+    last position with a bound of ``unknown_speed_ms * dt``.
+    """
+
+    position_m: float = 50.0  # erro da própria posição reportada
+    velocity_ms: float = 2.0  # erro de velocidade / arredondamento do heading
+    turn_rate_deg_s: float = 3.0  # curva padrão (rate one)
+    altitude_m: float = 15.0
+    vertical_rate_ms: float = 1.0
+    unknown_speed_ms: float = 250.0  # sem velocidade/rumo: qualquer direção até ~Mach 0.8
+    max_horizon_s: float = 120.0  # além disso a predição é marcada como inválida
+
+
+@dataclass(slots=True)
+class Prediction:
+    """Predicted state of every aircraft of a snapshot (arrays aligned with it)."""
+
+    target_time: float
+    latitude: np.ndarray
+    longitude: np.ndarray
+    altitude: np.ndarray
+    error_m: np.ndarray
+    altitude_error_m: np.ndarray
+    age_s: np.ndarray  # segundos desde a última posição
+    valid: np.ndarray  # posição conhecida e idade dentro do horizonte
+
+
+class KinematicSnapshot:
+    """Last reported kinematics of a fleet, as numpy arrays."""
+
+    __slots__ = (
+        "icao24", "time", "latitude", "longitude", "altitude", "velocity",
+        "heading", "vertical_rate", "on_ground",
+    )
+
+    def __init__(self, icao24, time, latitude, longitude, altitude, velocity, heading, vertical_rate, on_ground):
+        self.icao24 = icao24
+        self.time = time
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+        self.velocity = velocity
+        self.heading = heading
+        self.vertical_rate = vertical_rate
+        self.on_ground = on_ground
+
+    @classmethod
+    def from_batch(cls, batch: StateBatch) -> 'KinematicSnapshot':
+        """
+        View the StateBatch columns as arrays (no copy for the float columns).
+
+        The arrays share memory with the batch: it must not be extended
+        while the snapshot is in use (``array`` refuses to resize an
+        exported buffer).
+        """
+        time_position = np.frombuffer(batch.time_position, dtype=np.int64)
+        last_contact = np.frombuffer(batch.last_contact, dtype=np.int64)
+        # Sem time_position usa last_contact (a posição pode ser mais antiga)
+        time = np.where(time_position != NO_TIMESTAMP, time_position, last_contact).astype(np.float64)
+        time[time == NO_TIMESTAMP] = np.nan
+        return cls(
+            icao24=np.array(batch.icao24, dtype=object),
+            time=time,
+            latitude=np.frombuffer(batch.latitude, dtype=np.float64),
+            longitude=np.frombuffer(batch.longitude, dtype=np.float64),
+            altitude=np.frombuffer(batch.altitude, dtype=np.float64),
+            velocity=np.frombuffer(batch.velocity, dtype=np.float64),
+            heading=np.frombuffer(batch.heading, dtype=np.float64),
+            vertical_rate=np.frombuffer(batch.vertical_rate, dtype=np.float64),
+            on_ground=np.frombuffer(batch.on_ground, dtype=np.int8) == 1,
+        )
+
+    @classmethod
+    def from_states(cls, states: Sequence[StateVector]) -> 'KinematicSnapshot':
+        """Snapshot of a list of StateVector (one Python pass to build the columns)."""
+
+        def column(values) -> np.ndarray:
+            return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+        def epoch(value) -> Optional[float]:
+            return value.timestamp() if isinstance(value, datetime) else value
+
+        return cls(
+            icao24=np.array([s.icao24 for s in states], dtype=object),
+            time=column(epoch(s.time_position or s.last_contact) for s in states),
+            latitude=column(s.latitude for s in states),
+            longitude=column(s.longitude for s in states),
+            altitude=column(s.altitude for s in states),
+            velocity=column(s.velocity for s in states),
+            heading=column(s.heading for s in states),
+            vertical_rate=column(s.vertical_rate for s in states),
+            on_ground=np.array([bool(s.on_ground) for s in states], dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+def destination(lat: np.ndarray, lon: np.ndarray, bearing_deg: np.ndarray, distance_m: np.ndarray):
+    """Great-circle destination points (degrees) from start points, bearings and distances."""
+    phi1 = np.deg2rad(lat)
+    lam1 = np.deg2rad(lon)
+    theta = np.deg2rad(bearing_deg)
+    delta = distance_m / EARTH_RADIUS_M
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_delta, cos_delta = np.sin(delta), np.cos(delta)
+    sin_phi2 = np.clip(sin_phi1 * cos_delta + cos_phi1 * sin_delta * np.cos(theta), -1.0, 1.0)
+    phi2 = np.arcsin(sin_phi2)
+    lam2 = lam1 + np.arctan2(np.sin(theta) * sin_delta * cos_phi1, cos_delta - sin_phi1 * sin_phi2)
+    return np.rad2deg(phi2), (np.rad2deg(lam2) + 540.0) % 360.0 - 180.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in meters."""
+    phi1, phi2 = np.deg2rad(lat1), np.deg2rad(lat2)
+    dphi = phi2 - phi1
+    dlam = np.deg2rad(np.asarray(lon2) - np.asarray(lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def predict(snapshot: KinematicSnapshot, target_time: float, model: Optional[ErrorModel] = None) -> Prediction:
+    """Positions of every aircraft of ``snapshot`` at ``target_time`` (epoch seconds)."""
+    model = model or ErrorModel()
+    dt = target_time - snapshot.time
+    # Não extrapola para trás (posição mais nova que o alvo): fica onde está
+    ahead = np.where(np.isnan(dt), 0.0, np.maximum(dt, 0.0))
+
+    moving = ~np.isnan(snapshot.velocity) & ~np.isnan(snapshot.heading)
+    speed = np.where(moving, snapshot.velocity, 0.0)
+    distance = speed * ahead
+    latitude, longitude = destination(
+        snapshot.latitude, snapshot.longitude, np.where(moving, snapshot.heading, 0.0), distance
+    )
+
+    vertical_rate = np.where(np.isnan(snapshot.vertical_rate) | snapshot.on_ground, 0.0, snapshot.vertical_rate)
+    altitude = np.maximum(snapshot.altitude + vertical_rate * ahead, 0.0)
+
+    turn = _turn_drift(speed, ahead, model.turn_rate_deg_s)
+    error = np.where(
+        moving,
+        model.position_m + model.velocity_ms * ahead + turn,
+        model.position_m + model.unknown_speed_ms * ahead,
+    )
+    altitude_error = model.altitude_m + model.vertical_rate_ms * ahead
+
+    valid = ~np.isnan(snapshot.latitude) & ~np.isnan(snapshot.longitude) & (ahead <= model.max_horizon_s)
+    valid &= ~np.isnan(dt)
+    return Prediction(
+        target_time=target_time,
+        latitude=latitude,
+        longitude=longitude,
+        altitude=altitude,
+        error_m=error,
+        altitude_error_m=altitude_error,
+        age_s=dt,
+        valid=valid,
+    )
+
+
+def interpolate(
+    before: KinematicSnapshot,
+    after: KinematicSnapshot,
+    target_time: float,
+    model: Optional[ErrorModel] = None,
+) -> Prediction:
+    """
+    Positions at ``target_time`` for the aircraft of ``after``.
+
+    Aircraft present in both snapshots whose report times bracket the target
+    are interpolated along the great circle between the two reports (error
+    bounded by the model's turn drift over the shorter half of the interval);
+    the rest are extrapolated from ``after`` with ``predict``.
+    """
+    model = model or ErrorModel()
+    result = predict(after, target_time, model)
+    # Linhas sem icao24 não casam (e None não se compara com str no intersect1d)
+    known_after = np.flatnonzero(np.array([key is not None for key in after.icao24], dtype=bool))
+    known_before = np.flatnonzero(np.array([key is not None for key in before.icao24], dtype=bool))
+    _, index_after, index_before = np.intersect1d(
+        after.icao24[known_after], before.icao24[known_before], return_indices=True
+    )
+    if len(index_after) == 0:
+        return result
+    index_after, index_before = known_after[index_after], known_before[index_before]
+
+    t0 = before.time[index_before]
+    t1 = after.time[index_after]
+    span = t1 - t0
+    inside = (span > 0) & (t0 <= target_time) & (target_time <= t1)
+    ia, ib = index_after[inside], index_before[inside]
+    if len(ia) == 0:
+        return result
+    fraction = (target_time - before.time[ib]) / (after.time[ia] - before.time[ib])
+
+    lat, lon = _slerp(before.latitude[ib], before.longitude[ib], after.latitude[ia], after.longitude[ia], fraction)
+    alt0, alt1 = before.altitude[ib], after.altitude[ia]
+    result.latitude[ia] = lat
+    result.longitude[ia] = lon
+    result.altitude[ia] = np.where(np.isnan(alt0), alt1, alt0 + (alt1 - alt0) * fraction)
+
+    nearest = np.minimum(fraction, 1 - fraction) * (after.time[ia] - before.time[ib])
+    turn = _turn_drift(np.nan_to_num(after.velocity[ia]), nearest, model.turn_rate_deg_s)
+    result.error_m[ia] = model.position_m + turn
+    result.altitude_error_m[ia] = model.altitude_m
+    result.age_s[ia] = target_time - after.time[ia]
+    result.valid[ia] = ~np.isnan(lat) & ~np.isnan(lon)
+    return result
+
+
+def _turn_drift(speed: np.ndarray, elapsed: np.ndarray, turn_rate_deg_s: float) -> np.ndarray:
+    """Distance between the straight path and a constant-rate turn after ``elapsed`` seconds."""
+    omega = np.deg2rad(turn_rate_deg_s)
+    if omega <= 0:
+        return np.zeros_like(speed * elapsed)
+    # Na curva o ponto fica em (r sen wt, r (1 - cos wt)), com r = v / w; na reta em (v t, 0)
+    angle = omega * elapsed
+    radius = speed / omega
+    along = speed * elapsed - radius * np.sin(angle)
+    across = radius * (1 - np.cos(angle))
+    return np.hypot(along, across)
+
+
+def _slerp(lat0, lon0, lat1, lon1, fraction):
+    """Point at ``fraction`` of the great circle between two points (degrees)."""
+    phi0, lam0, phi1, lam1 = (np.deg2rad(v) for v in (lat0, lon0, lat1, lon1))
+    p0 = np.stack([np.cos(phi0) * np.cos(lam0), np.cos(phi0) * np.sin(lam0), np.sin(phi0)])
+    p1 = np.stack([np.cos(phi1) * np.cos(lam1), np.cos(phi1) * np.sin(lam1), np.sin(phi1)])
+    omega = np.arccos(np.clip(np.sum(p0 * p1, axis=0), -1.0, 1.0))
+    sin_omega = np.sin(omega)
+    small = sin_omega < 1e-12
+    safe = np.where(small, 1.0, sin_omega)
+    w0 = np.where(small, 1 - fraction, np.sin((1 - fraction) * omega) / safe)
+    w1 = np.where(small, fraction, np.sin(fraction * omega) / safe)
+    p = p0 * w0 + p1 * w1
+    lat = np.rad2deg(np.arctan2(p[2], np.hypot(p[0], p[1])))
+    lon = np.rad2deg(np.arctan2(p[1], p[0]))
+    return lat, lon
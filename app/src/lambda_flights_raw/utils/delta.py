@@ -0,0 +1,259 @@
+"""Change-only (delta) emission of state vectors between polls."""
+
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Tuple, Iterable
+
+from .columnar import StateBatch
+
+# Metros por grau de latitude (aproximação equiretangular)
+METERS_PER_DEGREE = 111_195.0
+
+# Last emitted state of one aircraft:
+# (latitude, longitude, altitude, velocity, heading, vertical_rate, on_ground, emitted_at)
+SnapshotEntry = Tuple[float, float, float, float, float, float, int, float]
+
+
+@dataclass(slots=True)
+class DeltaThresholds:
+    """Minimum change since the last emitted state for an aircraft to be emitted again."""
+
+    position_m: float = 250.0
+    altitude_m: float = 30.0
+    velocity_ms: float = 2.5
+    heading_deg: float = 5.0
+    vertical_rate_ms: float = 2.5
+    keyframe_interval_s: float = 300.0  # emite todos os estados a cada N segundos
+    stale_after_s: float = 3600.0  # esquece aeronaves sem emissão há N segundos
+
+    @classmethod
+    def from_env(cls) -> 'DeltaThresholds':
+        """Read DELTA_* overrides from the environment."""
+        defaults = cls()
+        return cls(
+            position_m=float(os.environ.get("DELTA_POSITION_M", defaults.position_m)),
+            altitude_m=float(os.environ.get("DELTA_ALTITUDE_M", defaults.altitude_m)),
+            velocity_ms=float(os.environ.get("DELTA_VELOCITY_MS", defaults.velocity_ms)),
+            heading_deg=float(os.environ.get("DELTA_HEADING_DEG", defaults.heading_deg)),
+            vertical_rate_ms=float(os.environ.get("DELTA_VERTICAL_RATE_MS", defaults.vertical_rate_ms)),
+            keyframe_interval_s=float(os.environ.get("DELTA_KEYFRAME_S", defaults.keyframe_interval_s)),
+            stale_after_s=float(os.environ.get("DELTA_STALE_S", defaults.stale_after_s)),
+        )
+
+
+class SnapshotStore:
+    """Persistence for the delta snapshot. The base class keeps nothing (in-memory only)."""
+
+    def load(self) -> Tuple[Dict[str, SnapshotEntry], float]:
+        """Return (entries by icao24, last keyframe epoch)."""
+        return {}, 0.0
+
+    def save(self, changed: Dict[str, SnapshotEntry], removed: Iterable[str], last_keyframe: float) -> None:
+        """Persist changed/removed entries and the keyframe time."""
+
+
+class MemorySnapshotStore(SnapshotStore):
+    """Snapshot lives only in the warm container's memory."""
+
+
+class SQLiteSnapshotStore(SnapshotStore):
+    """
+    Snapshot persisted in a SQLite file.
+
+    Local stand-in for a shared store: in Lambda it survives in /tmp while the
+    container is warm, and locally it survives restarts of the poller.
+    """
+
+    def __init__(self, path: str):
+        # sqlite3 só é importado quando DELTA_MODE=sqlite
+        import sqlite3
+
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS snapshot ("
+            " icao24 TEXT PRIMARY KEY, latitude REAL, longitude REAL, altitude REAL,"
+            " velocity REAL, heading REAL, vertical_rate REAL, on_ground INTEGER, emitted_at REAL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+        self._conn.commit()
+
+    def load(self) -> Tuple[Dict[str, SnapshotEntry], float]:
+        entries = {
+            row[0]: tuple(_from_sql(v) for v in row[1:])
+            for row in self._conn.execute("SELECT * FROM snapshot")
+        }
+        meta = self._conn.execute("SELECT value FROM meta WHERE key = 'last_keyframe'").fetchone()
+        return entries, meta[0] if meta else 0.0
+
+    def save(self, changed: Dict[str, SnapshotEntry], removed: Iterable[str], last_keyframe: float) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO snapshot VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((icao24, *(_to_sql(v) for v in entry)) for icao24, entry in changed.items()),
+            )
+            self._conn.executemany("DELETE FROM snapshot WHERE icao24 = ?", ((k,) for k in removed))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('last_keyframe', ?)", (last_keyframe,)
+            )
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _to_sql(value: float) -> Optional[float]:
+    # SQLite não guarda NaN (vira NULL)
+    return None if value != value else value
+
+
+def _from_sql(value: Optional[float]) -> float:
+    return math.nan if value is None else value
+
+
+class DeltaFilter:
+    """
+    Selects the states that changed beyond the thresholds since they were last emitted.
+
+    ``select`` does not update the snapshot; call ``commit`` after the selected
+    states were actually delivered, so failed sends are retried on the next poll.
+    """
+
+    def __init__(self, thresholds: Optional[DeltaThresholds] = None, store: Optional[SnapshotStore] = None):
+        self.thresholds = thresholds or DeltaThresholds()
+        self.store = store or MemorySnapshotStore()
+        self._snapshot: Dict[str, SnapshotEntry] = {}
+        self._last_keyframe = 0.0
+        self._poll_time: Optional[float] = None
+        self._poll_is_keyframe = False
+        self._loaded = False
+
+    @classmethod
+    def from_env(cls) -> Optional['DeltaFilter']:
+        """
+        Build the filter configured by DELTA_MODE (``memory`` or ``sqlite``).
+
+        Returns None when delta mode is disabled.
+        """
+        mode = (os.environ.get("DELTA_MODE") or "").lower()
+        if mode in ("", "off", "false", "0"):
+            return None
+        if mode == "memory":
+            store = MemorySnapshotStore()
+        elif mode == "sqlite":
+            store = SQLiteSnapshotStore(os.environ.get("DELTA_STORE_PATH", "/tmp/flights_delta.sqlite3"))
+        else:
+            raise ValueError(f"Unknown DELTA_MODE '{mode}' (expected memory or sqlite)")
+        return cls(DeltaThresholds.from_env(), store)
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self._snapshot, self._last_keyframe = self.store.load()
+            self._loaded = True
+
+    def is_keyframe(self, now: float) -> bool:
+        """Whether the next selection must emit every state."""
+        self._ensure_loaded()
+        return now - self._last_keyframe >= self.thresholds.keyframe_interval_s
+
+    def select(self, batch: StateBatch, now: Optional[float] = None) -> List[int]:
+        """
+        Indices of the rows of ``batch`` that must be emitted.
+
+        Chunks of the same poll (streaming mode) must pass the same ``now``,
+        so the keyframe decision applies to the whole poll.
+        """
+        now = time.time() if now is None else now
+        if now != self._poll_time:
+            self._poll_time = now
+            self._poll_is_keyframe = self.is_keyframe(now)
+        if self._poll_is_keyframe:
+            return list(range(len(batch)))
+
+        t = self.thresholds
+        snapshot = self._snapshot
+        cos = math.cos
+        radians = math.radians
+        position_m2 = t.position_m * t.position_m
+
+        selected = []
+        for i, (icao24, lat, lon, alt, vel, hdg, vr, on_ground) in enumerate(zip(
+            batch.icao24, batch.latitude, batch.longitude, batch.altitude,
+            batch.velocity, batch.heading, batch.vertical_rate, batch.on_ground,
+        )):
+            prev = snapshot.get(icao24)
+            if prev is None:
+                selected.append(i)
+                continue
+            p_lat, p_lon, p_alt, p_vel, p_hdg, p_vr, p_on_ground, _ = prev
+            if on_ground != p_on_ground:
+                selected.append(i)
+                continue
+            # NaN != NaN: posição que aparece/desaparece conta como mudança
+            if (lat != lat) != (p_lat != p_lat) or (lon != lon) != (p_lon != p_lon):
+                selected.append(i)
+                continue
+            if lat == lat and lon == lon:
+                dy = (lat - p_lat) * METERS_PER_DEGREE
+                dlon = abs(lon - p_lon)
+                if dlon > 180.0:
+                    dlon = 360.0 - dlon
+                dx = dlon * METERS_PER_DEGREE * cos(radians(lat))
+                if dx * dx + dy * dy >= position_m2:
+                    selected.append(i)
+                    continue
+            if (_moved(alt, p_alt, t.altitude_m) or _moved(vel, p_vel, t.velocity_ms)
+                    or _moved(vr, p_vr, t.vertical_rate_ms)):
+                selected.append(i)
+                continue
+            if hdg == hdg and p_hdg == p_hdg:
+                dh = abs(hdg - p_hdg) % 360.0
+                if min(dh, 360.0 - dh) >= t.heading_deg:
+                    selected.append(i)
+            elif (hdg != hdg) != (p_hdg != p_hdg):
+                selected.append(i)
+        return selected
+
+    def filter(self, batch: StateBatch, now: Optional[float] = None) -> StateBatch:
+        """Sub-batch with only the rows that must be emitted."""
+        selected = self.select(batch, now)
+        if len(selected) == len(batch):
+            return batch
+        return batch.take(selected)
+
+    def commit(self, emitted: StateBatch, now: Optional[float] = None) -> None:
+        """Record ``emitted`` as the last states delivered downstream."""
+        now = time.time() if now is None else now
+        self._ensure_loaded()
+        snapshot = self._snapshot
+        changed = {}
+        for icao24, lat, lon, alt, vel, hdg, vr, on_ground in zip(
+            emitted.icao24, emitted.latitude, emitted.longitude, emitted.altitude,
+            emitted.velocity, emitted.heading, emitted.vertical_rate, emitted.on_ground,
+        ):
+            if icao24 is None:
+                continue
+            entry = (lat, lon, alt, vel, hdg, vr, on_ground, now)
+            snapshot[icao24] = entry
+            changed[icao24] = entry
+
+        if self._poll_is_keyframe:
+            self._last_keyframe = self._poll_time
+
+        stale_before = now - self.thresholds.stale_after_s
+        removed = [k for k, entry in snapshot.items() if entry[7] < stale_before]
+        for icao24 in removed:
+            del snapshot[icao24]
+
+        self.store.save(changed, removed, self._last_keyframe)
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+
+def _moved(value: float, previous: float, threshold: float) -> bool:
+    """Change of at least ``threshold``; a value appearing or disappearing also counts."""
+    if value != value or previous != previous:
+        return (value != value) != (previous != previous)
+    return abs(value - previous) >= threshold
@@ -0,0 +1,81 @@
+"""Opt-in network health check (DNS, TCP and HTTPS timings to the OpenSky hosts)."""
+
+import socket
+import time
+from typing import Optional, Dict, Any, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from .http_session import DnsCache
+
+DEFAULT_TARGETS: Tuple[str, ...] = (
+    "https://auth.opensky-network.org/auth/realms/opensky-network",
+    "https://opensky-network.org/api/states/all",
+)
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def check_target(url: str, session, dns_cache: DnsCache, timeout: float = 10.0) -> Dict[str, Any]:
+    """
+    DNS, TCP and HTTPS timings for one URL.
+
+    DNS goes through ``dns_cache`` (forcing a fresh lookup) and the HTTPS
+    request through ``session``, so a healthy check leaves both the resolver
+    cache and the keep-alive pool warm for the ingest that follows.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    result: Dict[str, Any] = {"url": url, "host": host, "ok": False}
+
+    start = time.perf_counter()
+    try:
+        address = dns_cache.resolve(host, force=True)
+    except OSError as e:
+        result["dns_ms"] = _elapsed_ms(start)
+        result["error"] = f"DNS error: {e}"
+        return result
+    result["dns_ms"] = _elapsed_ms(start)
+    result["address"] = address
+
+    start = time.perf_counter()
+    try:
+        with socket.create_connection((address, port), timeout=timeout):
+            pass
+    except OSError as e:
+        result["tcp_ms"] = _elapsed_ms(start)
+        result["error"] = f"TCP error on port {port}: {e}"
+        return result
+    result["tcp_ms"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    try:
+        resp = session.get(url, timeout=timeout, stream=True)
+        resp.close()
+    except Exception as e:
+        result["https_ms"] = _elapsed_ms(start)
+        result["error"] = f"HTTPS error: {e}"
+        return result
+    result["https_ms"] = _elapsed_ms(start)
+    result["status"] = resp.status_code
+    # Qualquer resposta HTTP (mesmo 401/404) prova que DNS, rede e TLS funcionam
+    result["ok"] = resp.status_code < 500
+    return result
+
+
+def run_health_check(
+    session,
+    dns_cache: DnsCache,
+    targets: Optional[Sequence[str]] = None,
+    timeout: float = 10.0,
+) -> Dict[str, Any]:
+    """Check every target and return ``{"ok", "total_ms", "targets": [...]}``."""
+    start = time.perf_counter()
+    results = [check_target(url, session, dns_cache, timeout) for url in (targets or DEFAULT_TARGETS)]
+    return {
+        "ok": all(r["ok"] for r in results),
+        "total_ms": _elapsed_ms(start),
+        "targets": results,
+    }
@@ -0,0 +1,98 @@
+"""Vectorized geohash encoding and geohash-based Kinesis partitioning."""
+
+from typing import Optional, List, Sequence, Tuple
+
+import numpy as np
+
+from .partitioning import ShardMap
+
+_GEOHASH_BYTES = np.frombuffer(b"0123456789bcdefghjkmnpqrstuvwxyz", dtype=np.uint8)
+# Acima disso a tabela de pesos por célula (32^precisão) fica grande demais
+MAX_GEOHASH_PRECISION = 4
+
+
+def geohash_cells(latitude, longitude, precision: int) -> np.ndarray:
+    """
+    Geohash of each position as an integer of ``5 * precision`` bits (the
+    base32 digits of the geohash, i.e. its Z-order index); -1 without position.
+    """
+    latitude = np.asarray(latitude, dtype=np.float64)
+    longitude = np.asarray(longitude, dtype=np.float64)
+    bits = 5 * precision
+    lon_bits, lat_bits = (bits + 1) // 2, bits // 2
+    valid = np.isfinite(latitude) & np.isfinite(longitude)
+    lon = np.where(valid, longitude, 0.0)
+    lat = np.where(valid, latitude, 0.0)
+    lon_q = np.clip((lon + 180.0) / 360.0 * (1 << lon_bits), 0, (1 << lon_bits) - 1).astype(np.int64)
+    lat_q = np.clip((lat + 90.0) / 180.0 * (1 << lat_bits), 0, (1 << lat_bits) - 1).astype(np.int64)
+    cells = np.zeros(len(lat), dtype=np.int64)
+    # O geohash intercala os bits começando pela longitude
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = (lon_q >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_q >> (lat_bits - 1 - i // 2)) & 1
+        cells = (cells << 1) | bit
+    cells[~valid] = -1
+    return cells
+
+
+def geohash_strings(cells: np.ndarray, precision: int) -> List[str]:
+    """Base32 geohash text of integer cells (from ``geohash_cells``, all >= 0)."""
+    shifts = 5 * np.arange(precision - 1, -1, -1)
+    digits = (np.asarray(cells, dtype=np.int64)[:, None] >> shifts) & 31
+    text = _GEOHASH_BYTES[digits].tobytes().decode("ascii")
+    return [text[i:i + precision] for i in range(0, len(text), precision)]
+
+
+class GeohashPartitioner:
+    """
+    Spatially local partitioning by geohash prefix.
+
+    Each shard owns a contiguous range of geohash cells; the ranges are
+    recomputed on every batch from a decaying per-cell count, so each shard
+    carries about the same recent traffic. A single cell is never split, so
+    ``precision`` must be fine enough that no cell exceeds one shard's share.
+    """
+
+    name = "geohash"
+    uses_position = True
+
+    def __init__(self, shard_map: ShardMap, precision: int = 3, decay: float = 0.5):
+        if not 1 <= precision <= MAX_GEOHASH_PRECISION:
+            raise ValueError(f"precision must be between 1 and {MAX_GEOHASH_PRECISION}")
+        self.shard_map = shard_map
+        self.precision = precision
+        self.decay = decay
+        self._hash_keys = np.array([str(shard.midpoint) for shard in shard_map.shards], dtype=object)
+        # Sem histórico: o primeiro lote já define a divisão
+        self.weights = np.zeros(32 ** precision, dtype=np.float64)
+        self._next = 0
+
+    def cell_shards(self) -> np.ndarray:
+        """Shard index of every geohash cell for the current weights."""
+        cumulative = np.cumsum(self.weights)
+        centers = (cumulative - self.weights / 2) / cumulative[-1]
+        return np.minimum((centers * len(self._hash_keys)).astype(np.int64), len(self._hash_keys) - 1)
+
+    def assign(self, icao24: Sequence[Optional[str]], latitude=None, longitude=None) -> Tuple[List[str], Optional[List[str]]]:
+        cells = geohash_cells(latitude, longitude, self.precision)
+        if len(cells) == 0:
+            return [], []
+        located = cells >= 0
+        counts = np.bincount(cells[located], minlength=len(self.weights))
+        # Uma fração mínima uniforme evita que regiões vazias colapsem num shard
+        self.weights = self.decay * self.weights + counts + 1e-3 * max(1, len(cells)) / len(self.weights)
+
+        shards = np.empty(len(cells), dtype=np.int64)
+        shards[located] = self.cell_shards()[cells[located]]
+        missing = np.flatnonzero(~located)
+        shards[missing] = (self._next + np.arange(len(missing))) % len(self._hash_keys)
+        self._next += len(missing)
+
+        unique, inverse = np.unique(cells, return_inverse=True)
+        names = geohash_strings(np.maximum(unique, 0), self.precision)
+        if unique[0] < 0:
+            names[0] = "unknown"
+        keys = [names[i] for i in inverse.ravel().tolist()]
+        return keys, self._hash_keys[shards].tolist()
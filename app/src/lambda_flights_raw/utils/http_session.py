@@ -0,0 +1,289 @@
+"""Shared HTTP session for the OpenSky API (pooling, keep-alive, gzip, retries)."""
+
+import socket
+import threading
+import time
+from typing import Optional, List, Tuple, Sequence, Union, Dict, Callable
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+# Header de rate limit da OpenSky (segundos até liberar novos créditos)
+RATE_LIMIT_RETRY_AFTER_HEADER = "X-Rate-Limit-Retry-After-Seconds"
+RATE_LIMIT_REMAINING_HEADER = "X-Rate-Limit-Remaining"
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def retry_after_seconds(headers) -> Optional[float]:
+    """Wait requested by OpenSky (its rate-limit header, then Retry-After), in seconds."""
+    for name in (RATE_LIMIT_RETRY_AFTER_HEADER, "Retry-After"):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class RateLimitState:
+    """
+    Latest OpenSky rate-limit headers seen on /states/all responses.
+
+    ``remaining`` is the number of API credits left; after a 429 with a
+    retry-after header, ``blocked_for()`` tells how long to wait.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.remaining: Optional[int] = None
+        self.retry_at: Optional[float] = None
+        self.rate_limited = 0  # respostas 429 observadas
+
+    def observe(self, status_code: int, headers) -> None:
+        value = headers.get(RATE_LIMIT_REMAINING_HEADER)
+        if value is not None:
+            try:
+                self.remaining = int(value)
+            except (TypeError, ValueError):
+                pass
+        if status_code == 429:
+            self.rate_limited += 1
+            wait = retry_after_seconds(headers)
+            if wait is not None:
+                self.retry_at = self.clock() + wait
+        else:
+            self.retry_at = None
+
+    def blocked_for(self) -> float:
+        """Seconds until OpenSky accepts requests again (0 when not rate limited)."""
+        if self.retry_at is None:
+            return 0.0
+        return max(0.0, self.retry_at - self.clock())
+
+
+class OpenSkyRetry(Retry):
+    """
+    urllib3 Retry that honours ``X-Rate-Limit-Retry-After-Seconds``.
+
+    When OpenSky asks to wait longer than ``max_retry_after`` (e.g. daily
+    credits exhausted) the request is not retried: the 429 response is
+    returned right away instead of sleeping through the Lambda timeout.
+    """
+
+    DEFAULT_MAX_RETRY_AFTER = 10.0
+
+    def __init__(
+        self,
+        *args,
+        max_retry_after: float = DEFAULT_MAX_RETRY_AFTER,
+        rate_limit: Optional["RateLimitState"] = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_retry_after = max_retry_after
+        self.rate_limit = rate_limit
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.max_retry_after = self.max_retry_after
+        retry.rate_limit = self.rate_limit
+        return retry
+
+    def get_retry_after(self, response) -> Optional[float]:
+        return retry_after_seconds(response.headers)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and response.status == 429:
+            if self.rate_limit is not None:
+                # O 429 pode não chegar ao chamador (retry ou MaxRetryError)
+                self.rate_limit.observe(429, response.headers)
+            wait = self.get_retry_after(response)
+            if wait is not None and wait > self.max_retry_after:
+                raise MaxRetryError(_pool, url, ResponseError(f"rate limited for {wait:.0f}s"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+class DnsCache:
+    """
+    Host -> IPv4 cache with a TTL, shared by the health check and the HTTP session.
+
+    New pooled connections connect to the cached address (TLS still verifies
+    the real host name), so once the health check or the first request of a
+    container resolved a host, later connections skip the DNS lookup.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        resolver: Callable[[str], str] = socket.gethostbyname,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.resolver = resolver
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, force: bool = False) -> str:
+        """Cached address of ``host``; raises socket.gaierror if it cannot be resolved."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(host)
+            if entry is not None and not force and now - entry[1] < self.ttl:
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        address = self.resolver(host)
+        with self._lock:
+            self._entries[host] = (address, now)
+        return address
+
+    def invalidate(self, host: str) -> None:
+        with self._lock:
+            self._entries.pop(host, None)
+
+
+def _cached_dns_pool(pool_cls, dns_cache: DnsCache):
+    """Connection pool class whose connections resolve the host through ``dns_cache``."""
+
+    class CachedDnsConnection(pool_cls.ConnectionCls):
+        def _new_conn(self):
+            host = self._dns_host
+            try:
+                address = dns_cache.resolve(host)
+            except OSError:
+                return super()._new_conn()
+            # Só o destino do connect muda; SNI/verificação TLS continuam com o host
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except Exception:
+                dns_cache.invalidate(host)
+                raise
+            finally:
+                self._dns_host = host
+
+    return type(f"CachedDns{pool_cls.__name__}", (pool_cls,), {"ConnectionCls": CachedDnsConnection})
+
+
+class CachedDnsAdapter(HTTPAdapter):
+    """HTTPAdapter whose new connections use a shared DnsCache."""
+
+    def __init__(self, dns_cache: DnsCache, **kwargs):
+        self.dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _cached_dns_pool(HTTPConnectionPool, self.dns_cache),
+            "https": _cached_dns_pool(HTTPSConnectionPool, self.dns_cache),
+        }
+
+
+def build_session(
+    pool_maxsize: int = 4,
+    retries: int = 3,
+    backoff_factor: float = 0.5,
+    max_retry_after: float = OpenSkyRetry.DEFAULT_MAX_RETRY_AFTER,
+    dns_cache: Optional[DnsCache] = None,
+    rate_limit: Optional[RateLimitState] = None,
+) -> requests.Session:
+    """
+    Session with a keep-alive connection pool, gzip and retries with backoff on 429/5xx.
+
+    Create it once per container (module level) so TCP/TLS connections are
+    reused across warm invocations. With ``dns_cache``, new connections
+    resolve hosts through it. ``rate_limit`` also sees the 429 responses
+    consumed by the retries.
+    """
+    retry = OpenSkyRetry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+        max_retry_after=max_retry_after,
+        rate_limit=rate_limit,
+    )
+    if dns_cache is not None:
+        adapter = CachedDnsAdapter(dns_cache, pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retry)
+    else:
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+BoundingBox = Tuple[float, float, float, float]
+
+
+def states_query_params(
+    time: Optional[int] = None,
+    bbox: Optional[Union[BoundingBox, Sequence[float], str]] = None,
+    icao24: Optional[Union[str, Sequence[str]]] = None,
+    extended: bool = False,
+) -> List[Tuple[str, str]]:
+    """
+    Query string for /states/all.
+
+    ``bbox`` is (lamin, lomin, lamax, lomax) or "lamin,lomin,lamax,lomax";
+    ``icao24`` may be a single address or a list (repeated parameter).
+    """
+    params: List[Tuple[str, str]] = []
+    if time is not None:
+        params.append(("time", str(int(time))))
+    if bbox:
+        if isinstance(bbox, str):
+            bbox = [float(v) for v in bbox.split(",")]
+        if len(bbox) != 4:
+            raise ValueError("bbox must be (lamin, lomin, lamax, lomax)")
+        lamin, lomin, lamax, lomax = (float(v) for v in bbox)
+        params += [("lamin", str(lamin)), ("lomin", str(lomin)), ("lamax", str(lamax)), ("lomax", str(lomax))]
+    if icao24:
+        if isinstance(icao24, str):
+            icao24 = [icao24]
+        params += [("icao24", address.strip().lower()) for address in icao24]
+    if extended:
+        params.append(("extended", "1"))
+    return params
+
+
+def states_credit_cost(params: Sequence[Tuple[str, str]]) -> int:
+    """
+    API credits charged by OpenSky for one /states/all call with ``params``.
+
+    Depends on the bounding box area: up to 25 square degrees costs 1, up to
+    100 costs 2, up to 400 costs 3; larger boxes or the whole world cost 4.
+    """
+    values = dict(params)
+    try:
+        lat = float(values["lamax"]) - float(values["lamin"])
+        lon = float(values["lomax"]) - float(values["lomin"])
+    except (KeyError, ValueError):
+        return 4
+    area = abs(lat * lon)
+    if area <= 25:
+        return 1
+    if area <= 100:
+        return 2
+    if area <= 400:
+        return 3
+    return 4
@@ -1,5 +1,7 @@
 """Data models for OpenSky API responses."""
 
+import struct
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Optional, List, Dict, Any
@@ -40,7 +42,7 @@ class PositionSource(Enum):
     UNKNOWN = 4
 
 
-@dataclass
+@dataclass(slots=True)
 class StateVector:
     """Represents a state vector from OpenSky."""
     
@@ -119,9 +121,259 @@ class StateVector:
                 value = value.value
             result[field] = value
         return result
+    
+    def to_compact(self) -> 'CompactStateVector':
+        """Convert to the memory-compact representation."""
+        return CompactStateVector(
+            icao24=self.icao24,
+            callsign=self.callsign,
+            origin_country=self.origin_country,
+            time_position=self.time_position,
+            last_contact=self.last_contact,
+            longitude=self.longitude,
+            latitude=self.latitude,
+            altitude=self.altitude,
+            on_ground=self.on_ground,
+            velocity=self.velocity,
+            heading=self.heading,
+            vertical_rate=self.vertical_rate,
+            sensors=self.sensors,
+            geo_altitude=self.geo_altitude,
+            squawk=self.squawk,
+            spi=self.spi,
+            position_source=self.position_source
+        )
+
+
+def _to_epoch(value: Any) -> int:
+    """datetime / epoch seconds / None to epoch seconds (0 = missing)."""
+    if not value:
+        return 0
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _packed_float(struct_: struct.Struct, index: int, doc: str) -> property:
+    """Property over one double of a packed record (NaN = None)."""
+    
+    def getter(self) -> Optional[float]:
+        value = struct_.unpack(self._packed)[index]
+        return None if value != value else value
+    
+    def setter(self, value: Optional[float]) -> None:
+        values = list(struct_.unpack(self._packed))
+        values[index] = _NAN if value is None else float(value)
+        self._packed = struct_.pack(*values)
+    
+    return property(getter, setter, doc=doc)
 
 
-@dataclass
+_NAN = float("nan")
+
+# time_position, last_contact, longitude, latitude, altitude, velocity,
+# heading, vertical_rate, geo_altitude
+_STATE_STRUCT = struct.Struct("<qq7d")
+
+
+class CompactStateVector:
+    """
+    Memory-compact StateVector.
+    
+    Timestamps (epoch seconds) and the numeric fields are packed into a
+    single bytes object instead of one float/datetime object each, the
+    position source is a small int and origin_country/callsign are interned.
+    Exposes the same attributes, properties and to_dict() output as
+    StateVector.
+    """
+    
+    __slots__ = (
+        "icao24", "_callsign", "_origin_country", "_packed", "on_ground",
+        "sensors", "squawk", "spi", "_position_source",
+    )
+    
+    def __init__(
+        self,
+        icao24: str,
+        callsign: Optional[str] = None,
+        origin_country: Optional[str] = None,
+        time_position: Any = None,
+        last_contact: Any = None,
+        longitude: Optional[float] = None,
+        latitude: Optional[float] = None,
+        altitude: Optional[float] = None,
+        on_ground: Optional[bool] = None,
+        velocity: Optional[float] = None,
+        heading: Optional[float] = None,
+        vertical_rate: Optional[float] = None,
+        sensors: Optional[List[int]] = None,
+        geo_altitude: Optional[float] = None,
+        squawk: Optional[str] = None,
+        spi: Optional[bool] = None,
+        position_source: Any = None
+    ):
+        nan = _NAN
+        self.icao24 = icao24
+        self._callsign = _intern(callsign)
+        self._origin_country = _intern(origin_country)
+        self._packed = _STATE_STRUCT.pack(
+            _to_epoch(time_position),
+            _to_epoch(last_contact),
+            nan if longitude is None else longitude,
+            nan if latitude is None else latitude,
+            nan if altitude is None else altitude,
+            nan if velocity is None else velocity,
+            nan if heading is None else heading,
+            nan if vertical_rate is None else vertical_rate,
+            nan if geo_altitude is None else geo_altitude,
+        )
+        self.on_ground = on_ground
+        self.sensors = sensors
+        self.squawk = squawk
+        self.spi = spi
+        self.position_source = position_source
+    
+    @classmethod
+    def from_api_response(cls, data: List[Any]) -> 'CompactStateVector':
+        """Create CompactStateVector from API response array."""
+        return cls(
+            icao24=str(data[0]) if data[0] is not None else None,
+            callsign=str(data[1]).strip() if data[1] is not None else None,
+            origin_country=str(data[2]) if data[2] is not None else None,
+            time_position=int(data[3]) if data[3] else 0,
+            last_contact=int(data[4]) if data[4] else 0,
+            longitude=float(data[5]) if data[5] is not None else None,
+            latitude=float(data[6]) if data[6] is not None else None,
+            altitude=float(data[7]) if data[7] is not None else None,
+            on_ground=bool(data[8]) if data[8] is not None else None,
+            velocity=float(data[9]) if data[9] is not None else None,
+            heading=float(data[10]) if data[10] is not None else None,
+            vertical_rate=float(data[11]) if data[11] is not None else None,
+            sensors=[int(s) for s in data[12]] if data[12] else None,
+            geo_altitude=float(data[13]) if data[13] is not None else None,
+            squawk=str(data[14]) if data[14] is not None else None,
+            spi=bool(data[15]) if data[15] is not None else None,
+            position_source=PositionSource(data[16]).value if data[16] is not None else None
+        )
+    
+    @property
+    def callsign(self) -> Optional[str]:
+        return self._callsign
+    
+    @callsign.setter
+    def callsign(self, value: Optional[str]) -> None:
+        self._callsign = _intern(value)
+    
+    @property
+    def origin_country(self) -> Optional[str]:
+        return self._origin_country
+    
+    @origin_country.setter
+    def origin_country(self, value: Optional[str]) -> None:
+        self._origin_country = _intern(value)
+    
+    @property
+    def time_position_epoch(self) -> Optional[int]:
+        """Get time_position as epoch seconds."""
+        return _STATE_STRUCT.unpack(self._packed)[0] or None
+    
+    @property
+    def last_contact_epoch(self) -> Optional[int]:
+        """Get last_contact as epoch seconds."""
+        return _STATE_STRUCT.unpack(self._packed)[1] or None
+    
+    @property
+    def time_position(self) -> Optional[datetime]:
+        epoch = self.time_position_epoch
+        return datetime.fromtimestamp(epoch) if epoch else None
+    
+    @time_position.setter
+    def time_position(self, value: Any) -> None:
+        values = list(_STATE_STRUCT.unpack(self._packed))
+        values[0] = _to_epoch(value)
+        self._packed = _STATE_STRUCT.pack(*values)
+    
+    @property
+    def last_contact(self) -> Optional[datetime]:
+        epoch = self.last_contact_epoch
+        return datetime.fromtimestamp(epoch) if epoch else None
+    
+    @last_contact.setter
+    def last_contact(self, value: Any) -> None:
+        values = list(_STATE_STRUCT.unpack(self._packed))
+        values[1] = _to_epoch(value)
+        self._packed = _STATE_STRUCT.pack(*values)
+    
+    longitude = _packed_float(_STATE_STRUCT, 2, "Longitude in degrees.")
+    latitude = _packed_float(_STATE_STRUCT, 3, "Latitude in degrees.")
+    altitude = _packed_float(_STATE_STRUCT, 4, "Barometric altitude in meters.")
+    velocity = _packed_float(_STATE_STRUCT, 5, "Ground speed in m/s.")
+    heading = _packed_float(_STATE_STRUCT, 6, "True track in degrees.")
+    vertical_rate = _packed_float(_STATE_STRUCT, 7, "Vertical rate in m/s.")
+    geo_altitude = _packed_float(_STATE_STRUCT, 8, "Geometric altitude in meters.")
+    
+    @property
+    def position_source(self) -> Optional[PositionSource]:
+        return PositionSource(self._position_source) if self._position_source >= 0 else None
+    
+    @position_source.setter
+    def position_source(self, value: Any) -> None:
+        if value is None:
+            self._position_source = -1
+        elif isinstance(value, PositionSource):
+            self._position_source = value.value
+        else:
+            self._position_source = PositionSource(value).value
+    
+    altitude_ft = StateVector.altitude_ft
+    velocity_kts = StateVector.velocity_kts
+    vertical_rate_ftpm = StateVector.vertical_rate_ftpm
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary (same format as StateVector.to_dict)."""
+        (time_position, last_contact, longitude, latitude, altitude, velocity,
+         heading, vertical_rate, geo_altitude) = _STATE_STRUCT.unpack(self._packed)
+        return {
+            "icao24": self.icao24,
+            "callsign": self._callsign,
+            "origin_country": self._origin_country,
+            "time_position": datetime.fromtimestamp(time_position).isoformat() if time_position else None,
+            "last_contact": datetime.fromtimestamp(last_contact).isoformat() if last_contact else None,
+            "longitude": None if longitude != longitude else longitude,
+            "latitude": None if latitude != latitude else latitude,
+            "altitude": None if altitude != altitude else altitude,
+            "on_ground": self.on_ground,
+            "velocity": None if velocity != velocity else velocity,
+            "heading": None if heading != heading else heading,
+            "vertical_rate": None if vertical_rate != vertical_rate else vertical_rate,
+            "sensors": self.sensors,
+            "geo_altitude": None if geo_altitude != geo_altitude else geo_altitude,
+            "squawk": self.squawk,
+            "spi": self.spi,
+            "position_source": self._position_source if self._position_source >= 0 else None
+        }
+    
+    def to_state_vector(self) -> StateVector:
+        """Convert back to a regular StateVector."""
+        return StateVector(**{name: getattr(self, name) for name in StateVector.__dataclass_fields__})
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in StateVector.__dataclass_fields__)
+        return f"{self.__class__.__name__}({fields})"
+
+
+@dataclass(slots=True)
 class FlightTrackPoint:
     """A single point in a flight track."""
     
@@ -140,7 +392,71 @@ class FlightTrackPoint:
         return None
 
 
-@dataclass
+# timestamp, latitude, longitude, altitude, heading
+_TRACK_POINT_STRUCT = struct.Struct("<q4d")
+
+
+class CompactFlightTrackPoint:
+    """Memory-compact FlightTrackPoint with the timestamp (epoch seconds) and coordinates packed."""
+    
+    __slots__ = ("_packed", "on_ground")
+    
+    def __init__(
+        self,
+        timestamp: Any,
+        latitude: float,
+        longitude: float,
+        altitude: Optional[float] = None,
+        heading: Optional[float] = None,
+        on_ground: Optional[bool] = None
+    ):
+        self._packed = _TRACK_POINT_STRUCT.pack(
+            _to_epoch(timestamp),
+            latitude,
+            longitude,
+            _NAN if altitude is None else altitude,
+            _NAN if heading is None else heading,
+        )
+        self.on_ground = on_ground
+    
+    @property
+    def timestamp_epoch(self) -> int:
+        """Get timestamp as epoch seconds."""
+        return _TRACK_POINT_STRUCT.unpack(self._packed)[0]
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp_epoch)
+    
+    @timestamp.setter
+    def timestamp(self, value: Any) -> None:
+        values = list(_TRACK_POINT_STRUCT.unpack(self._packed))
+        values[0] = _to_epoch(value)
+        self._packed = _TRACK_POINT_STRUCT.pack(*values)
+    
+    latitude = _packed_float(_TRACK_POINT_STRUCT, 1, "Latitude in degrees.")
+    longitude = _packed_float(_TRACK_POINT_STRUCT, 2, "Longitude in degrees.")
+    altitude = _packed_float(_TRACK_POINT_STRUCT, 3, "Barometric altitude in meters.")
+    heading = _packed_float(_TRACK_POINT_STRUCT, 4, "True track in degrees.")
+    
+    altitude_ft = FlightTrackPoint.altitude_ft
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._packed == other._packed and self.on_ground == other.on_ground
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(timestamp={self.timestamp!r}, latitude={self.latitude!r}, "
+            f"longitude={self.longitude!r}, altitude={self.altitude!r}, heading={self.heading!r}, "
+            f"on_ground={self.on_ground!r})"
+        )
+
+
+@dataclass(slots=True)
 class FlightTrack:
     """Represents a flight track from OpenSky."""
     
@@ -185,7 +501,7 @@ class FlightTrack:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Airport:
     """Represents an airport."""
     
@@ -206,7 +522,7 @@ class Airport:
         return None
 
 
-@dataclass
+@dataclass(slots=True)
 class Flight:
     """Represents a flight."""
     
@@ -223,7 +539,7 @@ class Flight:
         return (self.last_seen - self.first_seen).total_seconds()
 
 
-@dataclass
+@dataclass(slots=True)
 class Arrival:
     """Represents an arrival at an airport."""
     
@@ -235,7 +551,7 @@ class Arrival:
     departure_airport: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Departure:
     """Represents a departure from an airport."""
     
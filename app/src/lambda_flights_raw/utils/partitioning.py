@@ -0,0 +1,189 @@
+"""
+Partition keys / explicit hash keys for the Kinesis records.
+
+Strategies (``PARTITION_STRATEGY``):
+
+* ``icao24`` (default): PartitionKey = icao24, Kinesis hashes it (md5).
+  States without icao24 get distinct keys instead of a shared "unknown".
+* ``balanced``: each aircraft is pinned to a shard by ``crc32(icao24) % shards``
+  and sent with an ExplicitHashKey inside that shard, so every shard gets the
+  same share of aircraft even when the hash ranges are uneven (after a split).
+* ``geohash``: PartitionKey = geohash prefix of the position, shards own
+  contiguous geohash ranges sized by traffic (utils/geohash.py). Consumers
+  get spatially local data per shard.
+
+``simulate_load`` replays PutRecords entries against a shard map and reports
+the per-shard load.
+"""
+
+import bisect
+import os
+import zlib
+from dataclasses import dataclass, field
+from typing import Optional, List, Sequence, Tuple
+
+from .aggregation import MAX_HASH_KEY, even_hash_ranges, list_open_shards, partition_key_hash
+from .sender import record_size
+
+PARTITION_STRATEGIES = ("icao24", "balanced", "geohash")
+
+# Limites de escrita de um shard do Kinesis (modo provisionado)
+SHARD_RECORDS_PER_S = 1000
+SHARD_BYTES_PER_S = 1024 * 1024
+
+
+@dataclass(slots=True)
+class Shard:
+    shard_id: str
+    start: int
+    end: int
+
+    @property
+    def midpoint(self) -> int:
+        return (self.start + self.end) // 2
+
+
+class ShardMap:
+    """Open shards of a stream, sorted by hash range."""
+
+    def __init__(self, shards: Sequence[Shard]):
+        if not shards:
+            raise ValueError("a stream has at least one open shard")
+        self.shards = sorted(shards, key=lambda shard: shard.start)
+        self._starts = [shard.start for shard in self.shards]
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    @property
+    def ranges(self) -> List[Tuple[int, int]]:
+        return [(shard.start, shard.end) for shard in self.shards]
+
+    def index(self, hash_key: int) -> int:
+        """Position of the shard whose range contains ``hash_key``."""
+        return max(0, bisect.bisect_right(self._starts, hash_key) - 1)
+
+    @classmethod
+    def even(cls, count: int) -> 'ShardMap':
+        """``count`` shards evenly splitting the key space (local stand-in for ListShards)."""
+        return cls([Shard(f"shardId-{i:012d}", start, end) for i, (start, end) in enumerate(even_hash_ranges(count))])
+
+    @classmethod
+    def from_kinesis(cls, kinesis_client, stream_name: str) -> 'ShardMap':
+        return cls([Shard(*shard) for shard in list_open_shards(kinesis_client, stream_name)])
+
+    @classmethod
+    def load(cls, kinesis_client, stream_name: str, logger=None) -> 'ShardMap':
+        """ListShards, or ``KINESIS_SHARD_COUNT`` even shards if the call fails."""
+        try:
+            return cls.from_kinesis(kinesis_client, stream_name)
+        except Exception as e:
+            shard_count = int(os.environ.get("KINESIS_SHARD_COUNT", "1"))
+            if logger is not None:
+                logger.warning(
+                    f"Could not list shards of '{stream_name}' ({e}); "
+                    f"assuming {shard_count} evenly split shard(s)"
+                )
+            return cls.even(shard_count)
+
+
+class KeyPartitioner:
+    """PartitionKey = icao24; states without it are spread with per-record keys."""
+
+    name = "icao24"
+    uses_position = False
+
+    def assign(self, icao24: Sequence[Optional[str]], latitude=None, longitude=None) -> Tuple[List[str], Optional[List[str]]]:
+        return [key or f"unknown-{i}" for i, key in enumerate(icao24)], None
+
+
+class BalancedPartitioner:
+    """Same number of aircraft per shard, whatever the size of the hash ranges."""
+
+    name = "balanced"
+    uses_position = False
+
+    def __init__(self, shard_map: ShardMap):
+        self.shard_map = shard_map
+        self._hash_keys = [str(shard.midpoint) for shard in shard_map.shards]
+        self._next = 0  # rodízio dos estados sem icao24
+
+    def assign(self, icao24: Sequence[Optional[str]], latitude=None, longitude=None) -> Tuple[List[str], Optional[List[str]]]:
+        count = len(self._hash_keys)
+        hash_keys = self._hash_keys
+        crc32 = zlib.crc32
+        explicit = []
+        for key in icao24:
+            if key:
+                explicit.append(hash_keys[crc32(key.encode("ascii", "replace")) % count])
+            else:
+                explicit.append(hash_keys[self._next % count])
+                self._next += 1
+        return [key or "unknown" for key in icao24], explicit
+
+
+def build_partitioner(strategy: Optional[str] = None, shard_map: Optional[ShardMap] = None, geohash_precision: int = 3):
+    """Partitioner for ``strategy`` (``PARTITION_STRATEGIES``)."""
+    strategy = strategy or "icao24"
+    if strategy not in PARTITION_STRATEGIES:
+        raise ValueError(f"Unknown partition strategy '{strategy}' (expected one of {PARTITION_STRATEGIES})")
+    if strategy == "icao24":
+        return KeyPartitioner()
+    if shard_map is None:
+        raise ValueError(f"Partition strategy '{strategy}' needs the stream's shard map")
+    if strategy == "balanced":
+        return BalancedPartitioner(shard_map)
+    # numpy só é importado com a estratégia geohash (tempo de init da Lambda)
+    from .geohash import GeohashPartitioner
+
+    return GeohashPartitioner(shard_map, precision=geohash_precision)
+
+
+@dataclass(slots=True)
+class ShardLoad:
+    shard_id: str
+    records: int = 0
+    bytes: int = 0
+
+
+@dataclass(slots=True)
+class LoadReport:
+    """Per-shard records/bytes of one set of PutRecords entries."""
+
+    shards: List[ShardLoad] = field(default_factory=list)
+
+    @property
+    def records(self) -> int:
+        return sum(shard.records for shard in self.shards)
+
+    @property
+    def bytes(self) -> int:
+        return sum(shard.bytes for shard in self.shards)
+
+    def imbalance(self) -> float:
+        """Busiest shard over the mean (1.0 = perfectly even)."""
+        mean = self.records / len(self.shards)
+        return max(shard.records for shard in self.shards) / mean if mean else 1.0
+
+    def utilization(self, window_s: float = 1.0) -> List[float]:
+        """Fraction of each shard's write limit used if the batch is sent within ``window_s``."""
+        return [
+            max(shard.records / (SHARD_RECORDS_PER_S * window_s), shard.bytes / (SHARD_BYTES_PER_S * window_s))
+            for shard in self.shards
+        ]
+
+    def throttled(self, window_s: float = 1.0) -> List[str]:
+        """Shards that would exceed their write limit (ProvisionedThroughputExceeded)."""
+        return [shard.shard_id for shard, used in zip(self.shards, self.utilization(window_s)) if used > 1.0]
+
+
+def simulate_load(shard_map: ShardMap, records: Sequence[dict]) -> LoadReport:
+    """Shard each PutRecords entry would land on, as Kinesis routes it."""
+    report = LoadReport([ShardLoad(shard.shard_id) for shard in shard_map.shards])
+    for record in records:
+        explicit = record.get("ExplicitHashKey")
+        hash_key = int(explicit) if explicit is not None else partition_key_hash(record["PartitionKey"])
+        load = report.shards[shard_map.index(min(hash_key, MAX_HASH_KEY))]
+        load.records += 1
+        load.bytes += record_size(record)
+    return report
@@ -0,0 +1,101 @@
+"""Fixed-cadence scheduling for the long-running poller."""
+
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from .http_session import RateLimitState
+
+SECONDS_PER_DAY = 86400.0
+
+
+class FixedRateScheduler:
+    """
+    Drift-free ticks: tick ``n`` is due at ``anchor + n * interval``.
+
+    The time spent in each cycle does not push the following ticks back.
+    When a cycle overruns one or more ticks, those ticks are skipped
+    (counted in ``skipped``) instead of being fired back to back.
+    Changing the interval re-anchors the schedule at the last tick.
+    """
+
+    def __init__(self, interval_s: float, clock: Callable[[], float] = time.monotonic):
+        if interval_s <= 0:
+            raise ValueError("interval_s must be positive")
+        self.clock = clock
+        self.interval_s = interval_s
+        self.anchor = clock()
+        self.tick = 0
+        self.skipped = 0
+
+    def set_interval(self, interval_s: float) -> None:
+        if interval_s <= 0 or interval_s == self.interval_s:
+            return
+        self.anchor += self.tick * self.interval_s
+        self.tick = 0
+        self.interval_s = interval_s
+
+    def next_deadline(self, earliest: Optional[float] = None) -> float:
+        """
+        Clock time of the next tick at or after ``earliest`` (default: now).
+
+        Ticks already missed are skipped rather than fired late.
+        """
+        earliest = self.clock() if earliest is None else earliest
+        tick = self.tick + 1
+        due = self.anchor + tick * self.interval_s
+        if due < earliest:
+            late = math.ceil((earliest - self.anchor) / self.interval_s)
+            self.skipped += late - tick
+            tick = late
+            due = self.anchor + tick * self.interval_s
+        self.tick = tick
+        return due
+
+    def wait(self, stop: threading.Event, not_before: float = 0.0) -> bool:
+        """
+        Sleep until the next tick, at least ``not_before`` seconds from now
+        (e.g. an OpenSky retry-after). Returns False as soon as ``stop`` is set.
+        """
+        now = self.clock()
+        due = self.next_deadline(now + not_before)
+        return not stop.wait(max(0.0, due - now))
+
+
+class CadenceController:
+    """
+    Poll interval that fits the OpenSky credit budget.
+
+    With ``remaining`` credits and ``cost`` credits per call, the remaining
+    calls are spread until the next daily reset (00:00 UTC), never faster
+    than ``base_interval_s`` nor slower than ``max_interval_s``. Without
+    rate-limit headers the base interval is used.
+    """
+
+    def __init__(
+        self,
+        base_interval_s: float,
+        max_interval_s: float,
+        credit_cost: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.base_interval_s = base_interval_s
+        self.max_interval_s = max(max_interval_s, base_interval_s)
+        self.credit_cost = max(1, credit_cost)
+        self.clock = clock
+
+    def seconds_to_reset(self) -> float:
+        now = datetime.fromtimestamp(self.clock(), tz=timezone.utc)
+        midnight = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (midnight - now).total_seconds()
+
+    def interval(self, rate: Optional[RateLimitState]) -> float:
+        if rate is None or rate.remaining is None:
+            return self.base_interval_s
+        calls = rate.remaining // self.credit_cost
+        if calls <= 0:
+            return self.max_interval_s
+        spread = self.seconds_to_reset() / calls
+        return min(self.max_interval_s, max(self.base_interval_s, spread))
@@ -0,0 +1,227 @@
+"""Concurrent PutRecords sender with partial-failure resubmission."""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Callable
+
+# Limites do PutRecords
+MAX_RECORDS_PER_REQUEST = 500
+MAX_BYTES_PER_REQUEST = 5 * 1024 * 1024
+
+# Erros em que vale reenviar: limite de throughput, falha transitória do
+# serviço ou da conexão (exceções do botocore sem resposta do serviço)
+RETRYABLE_ERROR_CODES = frozenset({
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "KMSThrottlingException",
+    "InternalFailure",
+    "InternalServerError",
+    "ServiceUnavailable",
+    "ServiceUnavailableException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+    "EndpointConnectionError",
+    "ConnectionClosedError",
+    "ConnectTimeoutError",
+    "ReadTimeoutError",
+})
+
+
+def error_code(error: Exception) -> str:
+    """Service error code of a botocore ClientError (``response["Error"]["Code"]``), else the exception name."""
+    response = getattr(error, "response", None) or {}
+    return response.get("Error", {}).get("Code") or type(error).__name__
+
+
+@dataclass(slots=True)
+class BatchResult:
+    """Outcome of one PutRecords batch, including its retries."""
+
+    index: int
+    records: int
+    bytes: int
+    failed: int = 0
+    attempts: int = 0
+    latency_ms: float = 0.0
+    error_codes: Dict[str, int] = field(default_factory=dict)
+    undelivered: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+
+@dataclass(slots=True)
+class SendReport:
+    """Outcome of a whole send."""
+
+    batches: List[BatchResult] = field(default_factory=list)
+    elapsed_ms: float = 0.0
+
+    @property
+    def records(self) -> int:
+        return sum(b.records for b in self.batches)
+
+    @property
+    def failed(self) -> int:
+        return sum(b.failed for b in self.batches)
+
+    @property
+    def undelivered(self) -> List[Dict[str, Any]]:
+        """Records that were not accepted after the retries."""
+        return [record for b in self.batches for record in b.undelivered]
+
+    @property
+    def retries(self) -> int:
+        return sum(max(0, b.attempts - 1) for b in self.batches)
+
+    @property
+    def ok(self) -> bool:
+        return self.failed == 0
+
+    def latency_percentile(self, pct: float) -> float:
+        """Per-batch latency percentile (nearest rank), in ms."""
+        if not self.batches:
+            return 0.0
+        latencies = sorted(b.latency_ms for b in self.batches)
+        rank = max(0, min(len(latencies) - 1, round(pct / 100 * len(latencies)) - 1))
+        return latencies[rank]
+
+
+def record_size(record: Dict[str, Any]) -> int:
+    """Bytes a record counts against the PutRecords request limit (Data + PartitionKey)."""
+    data = record["Data"]
+    size = len(data) if isinstance(data, (bytes, bytearray)) else len(data.encode("utf-8"))
+    return size + len(record["PartitionKey"].encode("utf-8"))
+
+
+def build_batches(
+    records: List[Dict[str, Any]],
+    max_records: int = MAX_RECORDS_PER_REQUEST,
+    max_bytes: int = MAX_BYTES_PER_REQUEST,
+) -> List[List[Dict[str, Any]]]:
+    """Split records into PutRecords requests within the record-count and byte limits."""
+    batches = []
+    current: List[Dict[str, Any]] = []
+    current_bytes = 0
+    for record in records:
+        size = record_size(record)
+        if current and (len(current) >= max_records or current_bytes + size > max_bytes):
+            batches.append(current)
+            current, current_bytes = [], 0
+        current.append(record)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+class KinesisSender:
+    """
+    Sends records with PutRecords using a bounded pool of concurrent requests.
+
+    Only the entries that failed in a response are resubmitted, with
+    exponential backoff and full jitter, up to ``max_attempts`` per batch;
+    errors outside ``RETRYABLE_ERROR_CODES`` (missing stream, access denied,
+    validation) are not retried.
+    """
+
+    def __init__(
+        self,
+        client,
+        stream_name: str,
+        max_workers: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 0.1,
+        max_delay: float = 2.0,
+        max_records: int = MAX_RECORDS_PER_REQUEST,
+        max_bytes: int = MAX_BYTES_PER_REQUEST,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Optional[random.Random] = None,
+        logger=None,
+    ):
+        self.client = client
+        self.stream_name = stream_name
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_records = min(max_records, MAX_RECORDS_PER_REQUEST)
+        self.max_bytes = min(max_bytes, MAX_BYTES_PER_REQUEST)
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.logger = logger
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number ``attempt`` (1-based)."""
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def send(self, records: List[Dict[str, Any]]) -> SendReport:
+        """Send all records; returns the per-batch report."""
+        start = time.perf_counter()
+        batches = build_batches(records, self.max_records, self.max_bytes)
+        if self.max_workers == 1 or len(batches) <= 1:
+            results = [self._send_batch(i, batch) for i, batch in enumerate(batches)]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as pool:
+                results = list(pool.map(self._send_batch, range(len(batches)), batches))
+        return SendReport(batches=results, elapsed_ms=(time.perf_counter() - start) * 1000)
+
+    def _send_batch(self, index: int, batch: List[Dict[str, Any]]) -> BatchResult:
+        result = BatchResult(index=index, records=len(batch), bytes=sum(record_size(r) for r in batch))
+        pending = batch
+        start = time.perf_counter()
+
+        while pending and result.attempts < self.max_attempts:
+            if result.attempts:
+                self.sleep(self.backoff(result.attempts))
+            result.attempts += 1
+            last_attempt = result.attempts >= self.max_attempts
+            try:
+                response = self.client.put_records(StreamName=self.stream_name, Records=pending)
+            except Exception as e:
+                # Falha da requisição inteira: só throttling/falha transitória é reenviada
+                code = error_code(e)
+                result.error_codes[code] = result.error_codes.get(code, 0) + 1
+                retryable = code in RETRYABLE_ERROR_CODES
+                if self.logger is not None:
+                    action = "resubmitting" if retryable and not last_attempt else "giving up"
+                    self.logger.warning(
+                        f"Batch {index} - attempt {result.attempts} failed for {len(pending)} records ({code}), "
+                        f"{action}: {e}"
+                    )
+                if not retryable:
+                    break
+                continue
+
+            if not response.get("FailedRecordCount"):
+                pending = []
+                break
+
+            retry = []
+            rejected = 0
+            for record, entry in zip(pending, response.get("Records", [])):
+                code = entry.get("ErrorCode")
+                if code:
+                    result.error_codes[code] = result.error_codes.get(code, 0) + 1
+                    if code in RETRYABLE_ERROR_CODES:
+                        retry.append(record)
+                    else:
+                        rejected += 1
+                        result.undelivered.append(record)
+            if self.logger is not None:
+                message = f"Batch {index} - attempt {result.attempts}: {len(retry) + rejected}/{len(pending)} records failed"
+                if retry and not last_attempt:
+                    message += f", resubmitting {len(retry)}"
+                if rejected:
+                    message += f", {rejected} not retriable"
+                self.logger.warning(message)
+            result.failed += rejected
+            pending = retry
+
+        result.failed += len(pending)
+        result.undelivered.extend(pending)
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        return result
@@ -0,0 +1,138 @@
+"""Fast JSON serialization of state records into Kinesis ``Data`` blobs."""
+
+import json
+from json.encoder import encode_basestring_ascii
+from typing import Optional, List, Dict, Any, Sequence
+
+from .columnar import StateBatch, STATE_FIELDS, NO_FLAG
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende do layer da Lambda
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depende do layer da Lambda
+    msgspec = None
+
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+_FLAG_JSON = {NO_FLAG: "null", 0: "false", 1: "true"}
+_NULL = "null"
+
+# Mesmo layout de json.dumps(state.to_dict()): separadores padrão, campos na ordem da API
+_ROW_TEMPLATE = "{" + ", ".join(f'"{name}": %s' for name in STATE_FIELDS) + "}"
+
+
+def available_backends() -> List[str]:
+    """Backends importable in this environment, fastest first."""
+    found = []
+    if orjson is not None:
+        found.append("orjson")
+    if msgspec is not None:
+        found.append("msgspec")
+    found.append("json")
+    return found
+
+
+def _json_str_column(values: Sequence[Optional[str]]) -> List[str]:
+    return [_NULL if v is None else encode_basestring_ascii(v) for v in values]
+
+
+def _json_float_column(values: Sequence[float]) -> List[str]:
+    return [_NULL if v != v else repr(v) for v in values]
+
+
+def _json_flag_column(values: Sequence[int]) -> List[str]:
+    return [_FLAG_JSON[v] for v in values]
+
+
+class StateSerializer:
+    """
+    Serializes state records into the bytes sent as Kinesis ``Data``.
+
+    ``encode_batch`` works column by column directly on a StateBatch and
+    never builds the intermediate dicts. ``encode_state`` handles plain
+    dicts (StateVector.to_dict() output). The ``json`` backend emits the
+    same bytes as ``json.dumps(state)``. The orjson/msgspec backends emit
+    compact JSON with the same content.
+    """
+
+    def __init__(self, backend: Optional[str] = None):
+        backend = backend or available_backends()[0]
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown serializer backend '{backend}' (expected one of {BACKENDS})")
+        if backend not in available_backends():
+            raise ValueError(f"Serializer backend '{backend}' is not installed")
+        self.backend = backend
+        if backend == "orjson":
+            self._dumps = orjson.dumps
+        elif backend == "msgspec":
+            self._dumps = msgspec.json.Encoder().encode
+        else:
+            self._dumps = self._stdlib_dumps
+
+    @staticmethod
+    def _stdlib_dumps(state: Dict[str, Any]) -> bytes:
+        return json.dumps(state).encode("utf-8")
+
+    def encode_state(self, state: Dict[str, Any]) -> bytes:
+        """Serialize one state dict."""
+        return self._dumps(state)
+
+    def encode_states(self, states: Sequence[Dict[str, Any]]) -> List[bytes]:
+        """Serialize a list of state dicts."""
+        dumps = self._dumps
+        return [dumps(state) for state in states]
+
+    def encode_row(self, batch: StateBatch, i: int) -> bytes:
+        """Serialize row ``i`` of a StateBatch."""
+        return self._dumps(batch.row_dict(i))
+
+    def encode_batch(self, batch: StateBatch) -> List[bytes]:
+        """Serialize every row of a StateBatch, in order."""
+        if self.backend != "json":
+            dumps = self._dumps
+            row_dict = batch.row_dict
+            return [dumps(row_dict(i)) for i in range(len(batch))]
+        return self._encode_batch_columnar(batch)
+
+    @staticmethod
+    def _encode_batch_columnar(batch: StateBatch) -> List[bytes]:
+        iso_cache: Dict[int, str] = {}
+
+        def timestamps(values: Sequence[int]) -> List[str]:
+            out = []
+            for ts in values:
+                value = iso_cache.get(ts)
+                if value is None:
+                    iso = batch.isoformat(ts)
+                    value = _NULL if iso is None else f'"{iso}"'
+                    iso_cache[ts] = value
+                out.append(value)
+            return out
+
+        columns = (
+            _json_str_column(batch.icao24),
+            _json_str_column(batch.callsign),
+            _json_str_column(batch.origin_country),
+            timestamps(batch.time_position),
+            timestamps(batch.last_contact),
+            _json_float_column(batch.longitude),
+            _json_float_column(batch.latitude),
+            _json_float_column(batch.altitude),
+            _json_flag_column(batch.on_ground),
+            _json_float_column(batch.velocity),
+            _json_float_column(batch.heading),
+            _json_float_column(batch.vertical_rate),
+            [_NULL if v is None else json.dumps(v) for v in batch.sensors],
+            _json_float_column(batch.geo_altitude),
+            _json_str_column(batch.squawk),
+            _json_flag_column(batch.spi),
+            [_NULL if v == NO_FLAG else str(v) for v in batch.position_source],
+        )
+        template = _ROW_TEMPLATE
+        # ensure_ascii: todos os fragmentos já são ASCII
+        return [(template % row).encode("ascii") for row in zip(*columns)]
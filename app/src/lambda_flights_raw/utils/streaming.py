@@ -0,0 +1,132 @@
+"""Incremental parsing of the /states/all body, one state row at a time."""
+
+import codecs
+import json
+from typing import Iterable, Iterator, List, Any
+
+from .columnar import StateBatch
+
+_WHITESPACE = " \t\n\r"
+_STATES_KEY = '"states"'
+
+# Compacta o buffer quando a parte já consumida passa deste tamanho
+_COMPACT_AT = 256 * 1024
+
+
+class StreamingParseError(ValueError):
+    """The body ended before the states array was complete, or is not a states response."""
+
+
+class StateRowParser:
+    """
+    Incremental parser for ``{"time": ..., "states": [[...], [...], ...]}``.
+
+    Chunks of the body (bytes) go in through ``feed``; complete rows come out
+    as soon as they are in the buffer, so memory is bounded by the rows not
+    yet consumed instead of the whole response. Each row is decoded by the C
+    JSON scanner (``raw_decode``).
+    """
+
+    def __init__(self):
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self._buf = ""
+        self._pos = 0
+        self._state = "seek"  # seek -> array -> done
+        self.rows_parsed = 0
+        self.bytes_read = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[List[Any]]:
+        """Add a chunk of the body and return the rows completed by it."""
+        self.bytes_read += len(chunk)
+        self._buf += self._decoder.decode(chunk, final)
+        rows: List[List[Any]] = []
+
+        if self._state == "seek" and not self._seek_array(final):
+            return rows
+
+        buf = self._buf
+        pos = self._pos
+        raw_decode = self._raw_decode
+        end = len(buf)
+        while self._state == "array":
+            while pos < end and (buf[pos] in _WHITESPACE or buf[pos] == ","):
+                pos += 1
+            if pos >= end:
+                break
+            if buf[pos] == "]":
+                pos += 1
+                self._state = "done"
+                break
+            try:
+                row, next_pos = raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # Linha incompleta: espera o próximo chunk
+                if final:
+                    raise StreamingParseError(f"Truncated or malformed state row at offset {pos}")
+                break
+            rows.append(row)
+            pos = next_pos
+
+        if pos > _COMPACT_AT:
+            self._buf = buf[pos:]
+            pos = 0
+        self._pos = pos
+        self.rows_parsed += len(rows)
+        if final and self._state != "done":
+            raise StreamingParseError("Response ended before the states array was closed")
+        return rows
+
+    def _seek_array(self, final: bool) -> bool:
+        """Advance past ``"states": [``; returns False while more input is needed."""
+        buf = self._buf
+        key = buf.find(_STATES_KEY)
+        if key < 0:
+            if final:
+                raise StreamingParseError("No 'states' key in response")
+            return False
+        pos = key + len(_STATES_KEY)
+        while pos < len(buf) and (buf[pos] in _WHITESPACE or buf[pos] == ":"):
+            pos += 1
+        if pos >= len(buf) or (buf[pos] == "n" and len(buf) - pos < 4):
+            if final:
+                raise StreamingParseError("Response ended before the states array")
+            return False
+        if buf.startswith("null", pos):
+            # OpenSky devolve "states": null quando não há aeronaves
+            self._state = "done"
+            self._buf = ""
+            return False
+        if buf[pos] != "[":
+            raise StreamingParseError(f"Unexpected value for 'states' at offset {pos}")
+        self._buf = buf[pos + 1:]
+        self._pos = 0
+        self._state = "array"
+        return True
+
+
+def iter_state_rows(chunks: Iterable[bytes]) -> Iterator[List[Any]]:
+    """Yield the raw state rows of a /states/all body given as byte chunks."""
+    parser = StateRowParser()
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
+        if parser.done:
+            return
+    yield from parser.feed(b"", final=True)
+
+
+def iter_state_batches(rows: Iterable[List[Any]], batch_rows: int = 2000, logger=None) -> Iterator[StateBatch]:
+    """Group raw rows into StateBatch chunks of up to ``batch_rows`` rows."""
+    pending: List[List[Any]] = []
+    for row in rows:
+        pending.append(row)
+        if len(pending) >= batch_rows:
+            yield StateBatch.from_api_response(pending, logger=logger)
+            pending = []
+    if pending:
+        yield StateBatch.from_api_response(pending, logger=logger)
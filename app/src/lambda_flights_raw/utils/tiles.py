@@ -0,0 +1,289 @@
+"""
+Traffic density tiles (slippy-map z/x/y) updated snapshot by snapshot.
+
+Each tile is a ``bins`` x ``bins`` grid with the number of aircraft per cell
+and altitude band (``BAND_LABELS``). Every position is projected once (Web
+Mercator) to the cell grid of the finest zoom; the coarser zooms are the
+same integer coordinates shifted right, so one vectorized pass bins the
+snapshot at every zoom.
+
+The tiler keeps the cell of each aircraft between snapshots: an update only
+marks as dirty the tiles an aircraft entered or left, and ``drain()`` emits
+just those tiles (empty ones included, so clients clear them); tiles that
+could not be delivered go back with ``mark_dirty``. Aircraft not seen for
+``max_age_s`` are removed by ``expire``.
+"""
+
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Iterable, Sequence, Tuple
+
+import numpy as np
+
+from .columnar import StateBatch, NO_FLAG
+
+TILE_FORMATS = ("json", "binary")
+
+# Limites das faixas de altitude (m, altitude barométrica); a faixa 0 é "no solo"
+ALTITUDE_BREAKS = (3000.0, 6000.0, 9000.0)
+BAND_LABELS = ("ground", "<3000", "3000-6000", "6000-9000", ">=9000")
+
+MAX_ZOOM = 12
+# Limite de latitude da projeção Web Mercator
+_MAX_LAT = 85.05112878
+
+_BINARY_HEADER = struct.Struct("<BIIHBH")
+
+
+@dataclass(slots=True)
+class DensityTile:
+    """Non-empty cells of one tile (row-major index ``y * bins + x``) and their per-band counts."""
+
+    z: int
+    x: int
+    y: int
+    bins: int
+    cells: np.ndarray   # (n,) índices das células
+    counts: np.ndarray  # (n, bandas) aeronaves por célula e faixa
+
+    @property
+    def key(self) -> str:
+        return f"{self.z}/{self.x}/{self.y}"
+
+    @property
+    def aircraft(self) -> int:
+        return int(self.counts.sum())
+
+    def to_json(self) -> bytes:
+        return json.dumps(
+            {
+                "z": self.z,
+                "x": self.x,
+                "y": self.y,
+                "bins": self.bins,
+                "bands": len(BAND_LABELS),
+                "aircraft": self.aircraft,
+                "cells": self.cells.tolist(),
+                # Linha por célula, achatado: [c0 b0, c0 b1, ..., c1 b0, ...]
+                "counts": self.counts.ravel().tolist(),
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+
+    def to_bytes(self) -> bytes:
+        """Header (z, x, y, bins, bands, cells) + uint16 cell indices + uint16 counts."""
+        header = _BINARY_HEADER.pack(self.z, self.x, self.y, self.bins, len(BAND_LABELS), len(self.cells))
+        counts = np.minimum(self.counts, 0xFFFF)
+        return header + self.cells.astype("<u2").tobytes() + counts.astype("<u2").tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DensityTile':
+        z, x, y, bins, bands, n = _BINARY_HEADER.unpack_from(data)
+        offset = _BINARY_HEADER.size
+        cells = np.frombuffer(data, dtype="<u2", count=n, offset=offset).astype(np.int64)
+        counts = np.frombuffer(data, dtype="<u2", count=n * bands, offset=offset + 2 * n)
+        return cls(z, x, y, bins, cells, counts.reshape(n, bands).astype(np.int64))
+
+
+def mercator_pixels(latitude, longitude, zoom: int, bins: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Global cell coordinates (x, y) at ``zoom`` with ``bins`` cells per tile
+    side, and the mask of valid positions.
+    """
+    lat = np.asarray(latitude, dtype=np.float64)
+    lon = np.asarray(longitude, dtype=np.float64)
+    valid = np.isfinite(lat) & np.isfinite(lon)
+    lat = np.clip(np.where(valid, lat, 0.0), -_MAX_LAT, _MAX_LAT)
+    lon = np.where(valid, lon, 0.0)
+    size = (1 << zoom) * bins
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - np.arcsinh(np.tan(np.radians(lat))) / np.pi) / 2.0
+    px = np.clip((x * size).astype(np.int64), 0, size - 1)
+    py = np.clip((y * size).astype(np.int64), 0, size - 1)
+    return px, py, valid
+
+
+def altitude_bands(altitude, on_ground) -> np.ndarray:
+    """Band index (``BAND_LABELS``) of each state; no altitude counts in the lowest airborne band."""
+    altitude = np.asarray(altitude, dtype=np.float64)
+    bands = 1 + np.searchsorted(np.asarray(ALTITUDE_BREAKS), np.nan_to_num(altitude, nan=0.0), side="right")
+    return np.where(np.asarray(on_ground) == 1, 0, bands)
+
+
+class DensityTiler:
+    """
+    Incremental density tiles at ``zooms``.
+
+    State per aircraft (slot): its cell/band key at every zoom and the time
+    it was last seen. Keys are tile-major
+    (``((tile_y * 2**z + tile_x) * bins**2 + cell) * bands + band``), so
+    sorting them groups the cells of each tile.
+    """
+
+    def __init__(self, zooms: Sequence[int] = (2, 4, 6), bins: int = 32, max_age_s: float = 60.0):
+        zooms = sorted(set(zooms))
+        if not zooms or zooms[0] < 0 or zooms[-1] > MAX_ZOOM:
+            raise ValueError(f"zooms must be between 0 and {MAX_ZOOM}")
+        if not 1 <= bins <= 256:
+            raise ValueError("bins must be between 1 and 256")
+        self.zooms = zooms
+        self.bins = bins
+        self.max_age_s = max_age_s
+        self.bands = len(BAND_LABELS)
+        self._per_tile = bins * bins * self.bands
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._keys = np.full((0, len(zooms)), -1, dtype=np.int64)
+        self._seen = np.zeros(0, dtype=np.float64)
+        # Tiles alterados desde o último drain, por zoom
+        self._dirty: List[set] = [set() for _ in zooms]
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @classmethod
+    def from_env(cls) -> 'DensityTiler':
+        zooms = [int(z) for z in os.environ.get("TILES_ZOOMS", "2,4,6").split(",") if z.strip()]
+        return cls(
+            zooms,
+            bins=int(os.environ.get("TILES_BINS", "32")),
+            max_age_s=float(os.environ.get("TILES_MAX_AGE_S", "60")),
+        )
+
+    def _slot_indices(self, icao24: Sequence[Optional[str]]) -> np.ndarray:
+        slots = np.full(len(icao24), -1, dtype=np.int64)
+        table = self._slots
+        free = self._free
+        grow = 0
+        for i, key in enumerate(icao24):
+            if key is None:
+                continue
+            slot = table.get(key)
+            if slot is None:
+                if free:
+                    slot = free.pop()
+                else:
+                    slot = len(self._seen) + grow
+                    grow += 1
+                table[key] = slot
+            slots[i] = slot
+        if grow:
+            self._keys = np.vstack([self._keys, np.full((grow, len(self.zooms)), -1, dtype=np.int64)])
+            self._seen = np.concatenate([self._seen, np.zeros(grow)])
+        return slots
+
+    def update(self, batch: StateBatch, now: Optional[float] = None) -> int:
+        """Move the aircraft of a (full or partial) snapshot to their new cells; returns how many changed cell."""
+        if not len(batch):
+            return 0
+        now = time.time() if now is None else now
+        slots = self._slot_indices(batch.icao24)
+        latitude = np.frombuffer(batch.latitude, dtype=np.float64)
+        longitude = np.frombuffer(batch.longitude, dtype=np.float64)
+        altitude = np.frombuffer(batch.altitude, dtype=np.float64)
+        on_ground = np.frombuffer(batch.on_ground, dtype=np.int8)
+
+        # Mesma aeronave repetida no lote: vale a última linha
+        rows = np.flatnonzero(slots >= 0)
+        _, last = np.unique(slots[rows][::-1], return_index=True)
+        rows = rows[len(rows) - 1 - last]
+        slots = slots[rows]
+
+        finest = self.zooms[-1]
+        px, py, valid = mercator_pixels(latitude[rows], longitude[rows], finest, self.bins)
+        band = altitude_bands(altitude[rows], np.where(on_ground[rows] == NO_FLAG, 0, on_ground[rows]))
+        new = np.full((len(rows), len(self.zooms)), -1, dtype=np.int64)
+        bins = self.bins
+        for zi, z in enumerate(self.zooms):
+            shift = finest - z
+            x, y = px >> shift, py >> shift
+            tile = (y // bins) * (1 << z) + x // bins
+            cell = (y % bins) * bins + x % bins
+            new[:, zi] = np.where(valid, (tile * bins * bins + cell) * self.bands + band, -1)
+
+        old = self._keys[slots]
+        changed = old != new
+        self._mark_dirty(old, changed)
+        self._mark_dirty(new, changed)
+        self._keys[slots] = new
+        self._seen[slots] = now
+        return int(changed.any(axis=1).sum())
+
+    def _mark_dirty(self, keys: np.ndarray, changed: np.ndarray) -> None:
+        for zi in range(len(self.zooms)):
+            column = keys[changed[:, zi], zi]
+            column = column[column >= 0]
+            if len(column):
+                self._dirty[zi].update(np.unique(column // self._per_tile).tolist())
+
+    def mark_dirty(self, keys: Iterable[str]) -> None:
+        """Emit the tiles ``z/x/y`` again on the next ``drain()`` (e.g. after a failed send)."""
+        zoom_index = {z: zi for zi, z in enumerate(self.zooms)}
+        for key in keys:
+            z, x, y = (int(part) for part in key.split("/"))
+            zi = zoom_index.get(z)
+            if zi is not None:
+                self._dirty[zi].add(y * (1 << z) + x)
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Remove aircraft not seen for ``max_age_s``; returns how many were removed."""
+        cutoff = (time.time() if now is None else now) - self.max_age_s
+        stale = [(key, slot) for key, slot in self._slots.items() if self._seen[slot] < cutoff]
+        if not stale:
+            return 0
+        slots = np.array([slot for _, slot in stale], dtype=np.int64)
+        old = self._keys[slots]
+        self._mark_dirty(old, old >= 0)
+        self._keys[slots] = -1
+        for key, slot in stale:
+            del self._slots[key]
+            self._free.append(slot)
+        return len(stale)
+
+    def drain(self, full: bool = False) -> List[DensityTile]:
+        """Tiles changed since the last call (``full``: every non-empty tile)."""
+        tiles = []
+        for zi, z in enumerate(self.zooms):
+            keys = self._keys[:, zi]
+            keys, counts = np.unique(keys[keys >= 0], return_counts=True)
+            if full:
+                wanted = np.unique(keys // self._per_tile)
+            else:
+                wanted = np.array(sorted(self._dirty[zi]), dtype=np.int64)
+            self._dirty[zi] = set()
+            if not len(wanted):
+                continue
+            selected = np.isin(keys // self._per_tile, wanted)
+            keys, counts = keys[selected], counts[selected]
+            tiles.extend(self._tiles(z, wanted, keys, counts))
+        return tiles
+
+    def _tiles(self, z: int, wanted: np.ndarray, keys: np.ndarray, counts: np.ndarray) -> List[DensityTile]:
+        bins, bands = self.bins, self.bands
+        cell_ids, inverse = np.unique(keys // bands, return_inverse=True)
+        matrix = np.zeros((len(cell_ids), bands), dtype=np.int64)
+        matrix[inverse, keys % bands] = counts
+        tile_of = cell_ids // (bins * bins)
+        starts = np.searchsorted(tile_of, wanted, side="left")
+        ends = np.searchsorted(tile_of, wanted, side="right")
+        side = 1 << z
+        out = []
+        for tile, start, end in zip(wanted.tolist(), starts.tolist(), ends.tolist()):
+            out.append(DensityTile(
+                z, tile % side, tile // side, bins,
+                cell_ids[start:end] % (bins * bins),
+                matrix[start:end],
+            ))
+        return out
+
+
+def encode_tiles(tiles: Sequence[DensityTile], fmt: str = "json") -> List[Tuple[str, bytes]]:
+    """(partition key ``z/x/y``, Data) per tile."""
+    if fmt not in TILE_FORMATS:
+        raise ValueError(f"Unknown tile format '{fmt}' (expected one of {TILE_FORMATS})")
+    if fmt == "binary":
+        return [(tile.key, tile.to_bytes()) for tile in tiles]
+    return [(tile.key, tile.to_json()) for tile in tiles]
@@ -0,0 +1,333 @@
+"""
+Simplification and compact encoding of flight tracks (numpy).
+
+- ``douglas_peucker`` / ``visvalingam``: indices of the points to keep for a
+  tolerance in meters (perpendicular distance / effective triangle height).
+- ``encode_polyline`` / ``decode_polyline``: Google encoded polyline of lat/lon.
+- ``compress_track`` / ``decompress_track``: delta + zigzag varint encoding of
+  time, lat, lon and altitude, after optional simplification.
+
+Distances are computed on a local equirectangular projection around the
+track's mean latitude, with longitudes unwrapped across the antimeridian.
+"""
+
+import heapq
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .models import FlightTrack, CompactFlightTrackPoint
+
+EARTH_RADIUS_M = 6371008.8
+
+# Resolução do formato compacto: 1e-5 grau (~1.1 m), altitude em metros, tempo em segundos
+COORD_SCALE = 100_000
+COMPRESSED_MAGIC = b"TRZ1"
+_HEADER = struct.Struct("<4s8s8sqI")
+
+
+def _epoch(point) -> int:
+    # CompactFlightTrackPoint guarda epoch; FlightTrackPoint, datetime
+    epoch = getattr(point, "timestamp_epoch", None)
+    return epoch if epoch is not None else int(point.timestamp.timestamp())
+
+
+def track_arrays(track: FlightTrack) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(epoch seconds, latitude, longitude, altitude with NaN = missing) arrays of a track."""
+    path = track.path
+    n = len(path)
+    t = np.fromiter((_epoch(p) for p in path), np.int64, n)
+    lat = np.fromiter((p.latitude for p in path), np.float64, n)
+    lon = np.fromiter((p.longitude for p in path), np.float64, n)
+    alt = np.fromiter((np.nan if p.altitude is None else p.altitude for p in path), np.float64, n)
+    return t, lat, lon, alt
+
+
+def project(lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Local planar (x, y) in meters, equirectangular around the mean latitude."""
+    lon = np.rad2deg(np.unwrap(np.deg2rad(lon)))
+    lat0 = np.deg2rad(np.mean(lat)) if len(lat) else 0.0
+    scale = np.deg2rad(1.0) * EARTH_RADIUS_M
+    return lon * scale * np.cos(lat0), lat * scale
+
+
+def _segment_distances(x: np.ndarray, y: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Distance of points start+1..end-1 to the segment start-end."""
+    px = x[start + 1:end] - x[start]
+    py = y[start + 1:end] - y[start]
+    dx = x[end] - x[start]
+    dy = y[end] - y[start]
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(px, py)
+    u = np.clip((px * dx + py * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - u * dx, py - u * dy)
+
+
+def douglas_peucker(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Indices kept by Douglas-Peucker with ``tolerance`` (same unit as x/y).
+
+    Iterative; each split scans its span with one vectorized distance pass.
+    """
+    n = len(x)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        distances = _segment_distances(x, y, start, end)
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            split = start + 1 + index
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return np.flatnonzero(keep)
+
+
+def _triangle_heights(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Distance of each interior point to the line through its two neighbours."""
+    cross = np.abs((x[:-2] - x[2:]) * (y[1:-1] - y[:-2]) - (x[:-2] - x[1:-1]) * (y[2:] - y[:-2]))
+    base = np.hypot(x[2:] - x[:-2], y[2:] - y[:-2])
+    return np.where(base > 0, cross / np.where(base > 0, base, 1.0), np.hypot(x[1:-1] - x[:-2], y[1:-1] - y[:-2]))
+
+
+def visvalingam(x: np.ndarray, y: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Indices kept by Visvalingam-Whyatt elimination.
+
+    The effective size of a point is the height of the triangle it forms
+    with its current neighbours (triangle area / half its base) instead of
+    the raw area, so ``tolerance`` is a distance, comparable with
+    Douglas-Peucker. Points are removed smallest first while below it.
+    """
+    n = len(x)
+    if n <= 2 or tolerance <= 0:
+        return np.arange(n)
+    sizes = np.full(n, np.inf)
+    sizes[1:-1] = _triangle_heights(x, y)
+    removed = np.zeros(n, dtype=bool)
+    heap = [(sizes[i], i) for i in np.flatnonzero(sizes < tolerance).tolist()]
+    heapq.heapify(heap)
+
+    xs, ys = x.tolist(), y.tolist()
+    prev_l = list(range(-1, n - 1))
+    next_l = list(range(1, n + 1))
+    size_l = sizes.tolist()
+
+    def height(i: int) -> float:
+        a, b = prev_l[i], next_l[i]
+        base = ((xs[b] - xs[a]) ** 2 + (ys[b] - ys[a]) ** 2) ** 0.5
+        cross = abs((xs[a] - xs[b]) * (ys[i] - ys[a]) - (xs[a] - xs[i]) * (ys[b] - ys[a]))
+        if base == 0:
+            return ((xs[i] - xs[a]) ** 2 + (ys[i] - ys[a]) ** 2) ** 0.5
+        return cross / base
+
+    # O tamanho efetivo nunca diminui ao remover vizinhos (evita remover fora de ordem)
+    floor = 0.0
+    while heap:
+        value, i = heapq.heappop(heap)
+        if removed[i] or value != size_l[i]:
+            continue
+        floor = max(floor, value)
+        removed[i] = True
+        a, b = prev_l[i], next_l[i]
+        next_l[a] = b
+        prev_l[b] = a
+        for j in (a, b):
+            if 0 < j < n - 1:
+                size_l[j] = max(height(j), floor)
+                if size_l[j] < tolerance:
+                    heapq.heappush(heap, (size_l[j], j))
+    return np.flatnonzero(~removed)
+
+
+def simplify(lat: np.ndarray, lon: np.ndarray, tolerance_m: float, method: str = "dp") -> np.ndarray:
+    """Indices of the points kept for a tolerance in meters (``dp`` or ``vw``)."""
+    x, y = project(lat, lon)
+    if method == "dp":
+        return douglas_peucker(x, y, tolerance_m)
+    if method == "vw":
+        return visvalingam(x, y, tolerance_m)
+    raise ValueError(f"Unknown simplification method '{method}' (expected 'dp' or 'vw')")
+
+
+def max_deviation(lat: np.ndarray, lon: np.ndarray, kept: np.ndarray) -> float:
+    """Largest distance (m) from an original point to the simplified line through ``kept``."""
+    if len(kept) == len(lat) or len(lat) < 3:
+        return 0.0
+    x, y = project(lat, lon)
+    # Segmento simplificado que cobre cada ponto original
+    segment = np.clip(np.searchsorted(kept, np.arange(len(lat)), side="right") - 1, 0, len(kept) - 2)
+    a, b = kept[segment], kept[segment + 1]
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    px, py = x - x[a], y - y[a]
+    length_sq = dx * dx + dy * dy
+    u = np.clip(np.divide(px * dx + py * dy, length_sq, out=np.zeros_like(px), where=length_sq > 0), 0.0, 1.0)
+    return float(np.max(np.hypot(px - u * dx, py - u * dy)))
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.uint64)
+    return ((values >> np.uint64(1)).astype(np.int64)) ^ -((values & np.uint64(1)).astype(np.int64))
+
+
+def _chunked(values: np.ndarray, bits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Little-endian ``bits``-bit groups of each value and a continuation mask, flattened in order."""
+    values = values.astype(np.uint64)
+    count = len(values)
+    if count == 0:
+        return np.zeros(0, np.uint8), np.zeros(0, bool)
+    top = int(values.max()).bit_length()
+    width = max(1, -(-top // bits))
+    shifts = np.arange(width, dtype=np.uint64) * np.uint64(bits)
+    groups = (values[:, None] >> shifts[None, :]) & np.uint64((1 << bits) - 1)
+    # Grupos necessários por valor: 1 + grupos acima do primeiro que ainda têm bits
+    needed = 1 + np.count_nonzero((values[:, None] >> shifts[None, 1:]) != 0, axis=1)
+    valid = np.arange(width)[None, :] < needed[:, None]
+    more = np.arange(width)[None, :] < (needed[:, None] - 1)
+    return groups[valid].astype(np.uint8), more[valid]
+
+
+def encode_varints(values: np.ndarray) -> bytes:
+    """Unsigned LEB128 (protobuf varint) encoding of an array of non-negative ints."""
+    groups, more = _chunked(values, 7)
+    return (groups | (more.astype(np.uint8) << 7)).astype(np.uint8).tobytes()
+
+
+def decode_varints(data: bytes, count: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """Decode varints; returns (values, bytes consumed). Reads ``count`` values, or all."""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero((raw & 0x80) == 0)
+    if count is not None:
+        ends = ends[:count]
+    if len(ends) == 0:
+        return np.zeros(0, np.uint64), 0
+    used = int(ends[-1]) + 1
+    raw = raw[:used]
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(used) - np.repeat(starts, ends - starts + 1)
+    parts = (raw & 0x7F).astype(np.uint64) << (position.astype(np.uint64) * np.uint64(7))
+    return np.add.reduceat(parts, starts), used
+
+
+def encode_polyline(lat: np.ndarray, lon: np.ndarray, precision: int = 5) -> str:
+    """Google encoded polyline of the coordinates (``precision`` decimal digits)."""
+    scale = 10 ** precision
+    coords = np.stack([np.round(np.asarray(lat) * scale), np.round(np.asarray(lon) * scale)], axis=1).astype(np.int64)
+    deltas = np.diff(coords, axis=0, prepend=np.zeros((1, 2), np.int64)).ravel()
+    groups, more = _chunked(_zigzag(deltas), 5)
+    return ((groups | (more.astype(np.uint8) << 5)) + 63).astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of ``encode_polyline``: (lat, lon) arrays."""
+    raw = np.frombuffer(encoded.encode("ascii"), dtype=np.uint8).astype(np.int64) - 63
+    if len(raw) == 0:
+        return np.zeros(0), np.zeros(0)
+    ends = np.flatnonzero((raw & 0x20) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    position = np.arange(len(raw)) - np.repeat(starts, ends - starts + 1)
+    values = np.add.reduceat((raw & 0x1F) << (5 * position), starts)
+    deltas = _unzigzag(values.astype(np.uint64)).reshape(-1, 2)
+    coords = np.cumsum(deltas, axis=0) / 10 ** precision
+    return coords[:, 0], coords[:, 1]
+
+
+def compress_track(track: FlightTrack, tolerance_m: float = 0.0, method: str = "dp") -> bytes:
+    """
+    Compact binary form of a track, simplified with ``tolerance_m`` first.
+
+    Layout: header (magic, icao24, callsign, start epoch, point count),
+    altitude presence bitmap, then zigzag varint deltas of time (s),
+    latitude and longitude (1e-5 degree) and altitude (m). ``on_ground``
+    and ``heading`` are not kept.
+    """
+    t, lat, lon, alt = track_arrays(track)
+    if tolerance_m > 0 and len(t) > 2:
+        kept = simplify(lat, lon, tolerance_m, method)
+        t, lat, lon, alt = t[kept], lat[kept], lon[kept], alt[kept]
+
+    n = len(t)
+    start = int(t[0]) if n else 0
+    has_alt = ~np.isnan(alt)
+    # Altitude ausente repete a anterior (delta 0) e fica marcada no bitmap
+    filled = alt.copy()
+    if n:
+        index = np.where(has_alt, np.arange(n), 0)
+        np.maximum.accumulate(index, out=index)
+        filled = np.where(has_alt[index], alt[index], 0.0)
+
+    columns = [
+        t - start,
+        np.round(lat * COORD_SCALE).astype(np.int64),
+        np.round(lon * COORD_SCALE).astype(np.int64),
+        np.round(filled).astype(np.int64),
+    ]
+    body = b"".join(encode_varints(_zigzag(np.diff(c, prepend=0))) for c in columns)
+    header = _HEADER.pack(
+        COMPRESSED_MAGIC,
+        track.icao24.encode("ascii", "replace")[:8],
+        (track.callsign or "").encode("ascii", "replace")[:8],
+        start,
+        n,
+    )
+    return header + np.packbits(has_alt).tobytes() + body
+
+
+def decompress_track(data: bytes) -> FlightTrack:
+    """Inverse of ``compress_track`` (coordinates at 1e-5 degree, altitude to the meter)."""
+    magic, icao24, callsign, start, n = _HEADER.unpack_from(data, 0)
+    if magic != COMPRESSED_MAGIC:
+        raise ValueError("Not a compressed track")
+    offset = _HEADER.size
+    bitmap_size = (n + 7) // 8
+    has_alt = np.unpackbits(np.frombuffer(data, np.uint8, bitmap_size, offset))[:n].astype(bool)
+    offset += bitmap_size
+    columns = []
+    for _ in range(4):
+        values, used = decode_varints(data[offset:], n)
+        offset += used
+        columns.append(np.cumsum(_unzigzag(values)))
+    t, lat, lon, alt = columns
+    path = [
+        CompactFlightTrackPoint(start + int(ti), la / COORD_SCALE, lo / COORD_SCALE, float(al) if present else None)
+        for ti, la, lo, al, present in zip(t.tolist(), lat.tolist(), lon.tolist(), alt.tolist(), has_alt.tolist())
+    ]
+    return FlightTrack(
+        icao24=icao24.rstrip(b"\x00").decode("ascii"),
+        callsign=callsign.rstrip(b"\x00").decode("ascii") or None,
+        start_time=path[0].timestamp if path else None,
+        end_time=path[-1].timestamp if path else None,
+        path=path,
+    )
+
+
+def simplified_geojson(track: FlightTrack, tolerance_m: float, method: str = "dp", digits: int = 5) -> dict:
+    """``FlightTrack.to_geojson`` over the simplified path, coordinates rounded to ``digits``."""
+    t, lat, lon, alt = track_arrays(track)
+    kept = simplify(lat, lon, tolerance_m, method) if len(t) > 2 else np.arange(len(t))
+    feature = FlightTrack(
+        icao24=track.icao24,
+        callsign=track.callsign,
+        start_time=track.start_time,
+        end_time=track.end_time,
+        path=[track.path[i] for i in kept.tolist()],
+    ).to_geojson()
+    feature["geometry"]["coordinates"] = [
+        [round(value, digits) if i < 2 else round(value) for i, value in enumerate(coords)]
+        for coords in feature["geometry"]["coordinates"]
+    ]
+    feature["properties"]["simplified_from"] = len(track.path)
+    return feature
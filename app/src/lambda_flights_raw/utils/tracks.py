@@ -0,0 +1,319 @@
+"""Incremental assembly of FlightTrack objects from the state stream."""
+
+import json
+import math
+import os
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from .columnar import StateBatch, NO_TIMESTAMP, NO_FLAG
+from .models import StateVector, FlightTrack, CompactFlightTrackPoint
+
+# Motivos de fechamento de um track
+CLOSED_GAP = "gap"
+CLOSED_LANDED = "landed"
+CLOSED_IDLE = "idle"
+CLOSED_EVICTED = "evicted"
+CLOSED_FLUSH = "flush"
+
+
+@dataclass(slots=True)
+class TrackLimits:
+    """When tracks are closed and how much memory they may use."""
+
+    gap_s: float = 900.0  # sem posição há N segundos: o voo terminou (ou saiu da cobertura)
+    max_points: int = 4000  # acima disso o track é decimado pela metade
+    max_tracks: int = 20000  # aeronaves abertas; as mais ociosas são despejadas (LRU)
+    min_points: int = 2  # tracks menores são descartados ao fechar
+
+    @classmethod
+    def from_env(cls) -> 'TrackLimits':
+        """Read TRACK_* overrides from the environment."""
+        defaults = cls()
+        return cls(
+            gap_s=float(os.environ.get("TRACK_GAP_S", defaults.gap_s)),
+            max_points=int(os.environ.get("TRACK_MAX_POINTS", defaults.max_points)),
+            max_tracks=int(os.environ.get("TRACK_MAX_TRACKS", defaults.max_tracks)),
+            min_points=int(os.environ.get("TRACK_MIN_POINTS", defaults.min_points)),
+        )
+
+
+@dataclass(slots=True)
+class CompletedTrack:
+    """A closed track and why it was closed."""
+
+    track: FlightTrack
+    reason: str
+    decimated: int = 0  # pontos descartados pelo limite por track
+
+    def to_geojson(self) -> Dict[str, Any]:
+        feature = self.track.to_geojson()
+        feature["properties"]["closed_reason"] = self.reason
+        feature["properties"]["points"] = len(self.track.path)
+        return feature
+
+    def to_bytes(self) -> bytes:
+        return encode_track(self.track)
+
+
+class _OpenTrack:
+    """Track being assembled for one aircraft."""
+
+    __slots__ = ("icao24", "callsign", "points", "last_ts", "airborne", "decimated")
+
+    def __init__(self, icao24: str, callsign: Optional[str]):
+        self.icao24 = icao24
+        self.callsign = callsign
+        self.points: List[CompactFlightTrackPoint] = []
+        self.last_ts = 0
+        self.airborne = False
+        self.decimated = 0
+
+
+class TrackBuilder:
+    """
+    Appends each new position to its aircraft's track (keyed by ``icao24``).
+
+    A track is closed when the aircraft lands (first on-ground point after
+    airborne points), when the time since its previous position exceeds
+    ``gap_s``, when it stays idle for ``gap_s`` (``expire``) or when it is
+    evicted as the least recently updated track above ``max_tracks``.
+    Closed tracks are collected in ``completed`` until ``drain()``.
+    """
+
+    def __init__(self, limits: Optional[TrackLimits] = None):
+        self.limits = limits or TrackLimits()
+        self.tracks: "OrderedDict[str, _OpenTrack]" = OrderedDict()
+        self.completed: List[CompletedTrack] = []
+        self.points_added = 0
+
+    @classmethod
+    def from_env(cls) -> 'TrackBuilder':
+        return cls(TrackLimits.from_env())
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def add(
+        self,
+        icao24: str,
+        timestamp: int,
+        latitude: float,
+        longitude: float,
+        altitude: Optional[float] = None,
+        heading: Optional[float] = None,
+        on_ground: Optional[bool] = None,
+        callsign: Optional[str] = None,
+    ) -> None:
+        """Add one position (``timestamp`` in epoch seconds)."""
+        track = self.tracks.get(icao24)
+        if track is not None:
+            if timestamp <= track.last_ts:
+                return  # posição repetida (a OpenSky reenvia a última conhecida)
+            if timestamp - track.last_ts > self.limits.gap_s:
+                self._close(icao24, CLOSED_GAP)
+                track = None
+            else:
+                self.tracks.move_to_end(icao24)
+        if track is None:
+            track = self.tracks[icao24] = _OpenTrack(icao24, callsign)
+            if len(self.tracks) > self.limits.max_tracks:
+                self._close(next(iter(self.tracks)), CLOSED_EVICTED)
+        elif callsign and not track.callsign:
+            track.callsign = callsign
+
+        point = CompactFlightTrackPoint(timestamp, latitude, longitude, altitude, heading, on_ground)
+        track.last_ts = timestamp
+        self.points_added += 1
+
+        if on_ground and not track.airborne:
+            # Ainda no solo (taxi): guarda só a última posição, início da decolagem
+            track.points[-1:] = [point]
+            return
+        track.points.append(point)
+        if len(track.points) > self.limits.max_points:
+            self._decimate(track)
+        if on_ground:
+            self._close(icao24, CLOSED_LANDED)
+        else:
+            track.airborne = True
+
+    def add_state(self, state: StateVector) -> None:
+        """Add a StateVector (ignored when it has no position)."""
+        if state.latitude is None or state.longitude is None:
+            return
+        ts = state.time_position or state.last_contact
+        if ts is None:
+            return
+        self.add(
+            state.icao24,
+            int(ts.timestamp()) if isinstance(ts, datetime) else int(ts),
+            state.latitude,
+            state.longitude,
+            state.altitude,
+            state.heading,
+            state.on_ground,
+            state.callsign,
+        )
+
+    def add_batch(self, batch: StateBatch) -> None:
+        """Add every positioned row of a StateBatch, reading its columns directly."""
+        add = self.add
+        for icao24, callsign, time_position, last_contact, lat, lon, alt, on_ground, heading in zip(
+            batch.icao24, batch.callsign, batch.time_position, batch.last_contact,
+            batch.latitude, batch.longitude, batch.altitude, batch.on_ground, batch.heading,
+        ):
+            if lat != lat or lon != lon or icao24 is None:
+                continue
+            ts = time_position if time_position != NO_TIMESTAMP else last_contact
+            if ts == NO_TIMESTAMP:
+                continue
+            add(
+                icao24, ts, lat, lon,
+                None if alt != alt else alt,
+                None if heading != heading else heading,
+                None if on_ground == NO_FLAG else bool(on_ground),
+                callsign,
+            )
+
+    def expire(self, now: Optional[float] = None) -> int:
+        """Close tracks idle for more than ``gap_s``; returns how many were closed."""
+        cutoff = (time.time() if now is None else now) - self.limits.gap_s
+        idle = [icao24 for icao24, track in self.tracks.items() if track.last_ts < cutoff]
+        for icao24 in idle:
+            self._close(icao24, CLOSED_IDLE)
+        return len(idle)
+
+    def flush(self) -> None:
+        """Close every open track (e.g. on shutdown)."""
+        for icao24 in list(self.tracks):
+            self._close(icao24, CLOSED_FLUSH)
+
+    def drain(self) -> List[CompletedTrack]:
+        """Return and forget the tracks completed so far."""
+        completed, self.completed = self.completed, []
+        return completed
+
+    def _decimate(self, track: _OpenTrack) -> None:
+        # Mantém um ponto a cada dois (sempre o primeiro e o último)
+        points = track.points
+        kept = points[:-1:2] + [points[-1]]
+        track.decimated += len(points) - len(kept)
+        track.points = kept
+
+    def _close(self, icao24: str, reason: str) -> None:
+        track = self.tracks.pop(icao24)
+        if len(track.points) < self.limits.min_points:
+            return
+        self.completed.append(CompletedTrack(
+            track=FlightTrack(
+                icao24=track.icao24,
+                callsign=track.callsign,
+                start_time=track.points[0].timestamp,
+                end_time=track.points[-1].timestamp,
+                path=track.points,
+            ),
+            reason=reason,
+            decimated=track.decimated,
+        ))
+
+
+# Formato binário compacto de um track:
+#   cabeçalho: magic, icao24 e callsign (8 bytes ASCII cada; a OpenSky usa "~xxxxxx"
+#              para endereços não-ICAO), início (epoch), nº de pontos
+#   ponto:     segundos desde o início, lat/lon (1e-7 grau), altitude (float32, NaN = nulo),
+#              heading (centésimos de grau, 0xFFFF = nulo), on_ground (0/1, 0xFF = nulo)
+TRACK_MAGIC = b"TRK1"
+_HEADER = struct.Struct("<4s8s8sqI")
+_POINT = struct.Struct("<IiifHB")
+_NO_HEADING = 0xFFFF
+_NO_GROUND = 0xFF
+_COORD_SCALE = 10_000_000
+
+
+def encode_track(track: FlightTrack) -> bytes:
+    """Compact binary form of a track (32-byte header + 19 bytes per point)."""
+    points = track.path
+    start = points[0].timestamp_epoch if points else 0
+    icao24 = track.icao24.encode("ascii", "replace")[:8]
+    callsign = (track.callsign or "").encode("ascii", "replace")[:8]
+    out = [_HEADER.pack(TRACK_MAGIC, icao24, callsign, start, len(points))]
+    pack = _POINT.pack
+    for point in points:
+        heading = point.heading
+        altitude = point.altitude
+        out.append(pack(
+            point.timestamp_epoch - start,
+            round(point.latitude * _COORD_SCALE),
+            round(point.longitude * _COORD_SCALE),
+            math.nan if altitude is None else altitude,
+            _NO_HEADING if heading is None else round(heading * 100) % 36000,
+            _NO_GROUND if point.on_ground is None else int(point.on_ground),
+        ))
+    return b"".join(out)
+
+
+def decode_track(data: bytes) -> FlightTrack:
+    """Inverse of ``encode_track`` (coordinates rounded to 1e-7 degree, altitude to float32)."""
+    magic, icao24, callsign, start, count = _HEADER.unpack_from(data, 0)
+    if magic != TRACK_MAGIC:
+        raise ValueError("Not an encoded track")
+    path = []
+    for offset, lat, lon, altitude, heading, on_ground in _POINT.iter_unpack(
+        data[_HEADER.size:_HEADER.size + count * _POINT.size]
+    ):
+        path.append(CompactFlightTrackPoint(
+            start + offset,
+            lat / _COORD_SCALE,
+            lon / _COORD_SCALE,
+            None if altitude != altitude else altitude,
+            None if heading == _NO_HEADING else heading / 100,
+            None if on_ground == _NO_GROUND else bool(on_ground),
+        ))
+    return FlightTrack(
+        icao24=icao24.rstrip(b"\x00").decode("ascii"),
+        callsign=callsign.rstrip(b"\x00").decode("ascii") or None,
+        start_time=path[0].timestamp if path else datetime.fromtimestamp(start),
+        end_time=path[-1].timestamp if path else datetime.fromtimestamp(start),
+        path=path,
+    )
+
+
+TRACK_FORMATS = ("geojson", "binary", "compressed")
+
+
+def encode_tracks(
+    completed: Iterable[CompletedTrack],
+    fmt: str = "geojson",
+    tolerance_m: float = 0.0,
+) -> List[Tuple[str, bytes]]:
+    """
+    (partition key, Data) per completed track.
+
+    ``geojson``: GeoJSON Feature (simplified and rounded when ``tolerance_m``
+    > 0); ``binary``: ``encode_track``; ``compressed``: simplified delta +
+    varint form of utils/track_compression.py.
+    """
+    if fmt not in TRACK_FORMATS:
+        raise ValueError(f"Unknown track format '{fmt}' (expected one of {TRACK_FORMATS})")
+    if fmt == "compressed" or tolerance_m > 0:
+        # numpy só é importado quando a compressão é usada
+        from .track_compression import compress_track, simplified_geojson
+    out = []
+    for item in completed:
+        if fmt == "binary":
+            data = item.to_bytes()
+        elif fmt == "compressed":
+            data = compress_track(item.track, tolerance_m)
+        elif tolerance_m > 0:
+            feature = simplified_geojson(item.track, tolerance_m)
+            feature["properties"]["closed_reason"] = item.reason
+            data = json.dumps(feature).encode("utf-8")
+        else:
+            data = json.dumps(item.to_geojson()).encode("utf-8")
+        out.append((item.track.icao24, data))
+    return out
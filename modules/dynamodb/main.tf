@@ -8,6 +8,34 @@ resource "aws_dynamodb_table" "table" {
     name = "id"
     type = "S"
   }
+
+  # Última posição por aeronave (positions_function): consulta por área pelo geohash.
+  # Só as chaves no índice: ele só é regravado quando a aeronave muda de célula
+  dynamic "attribute" {
+    for_each = each.key == "flights" ? ["geohash_cell"] : []
+    content {
+      name = attribute.value
+      type = "S"
+    }
+  }
+
+  dynamic "global_secondary_index" {
+    for_each = each.key == "flights" ? ["geohash-index"] : []
+    content {
+      name            = global_secondary_index.value
+      hash_key        = "geohash_cell"
+      projection_type = "KEYS_ONLY"
+    }
+  }
+
+  # Aeronaves que pararam de reportar saem sozinhas (POSITIONS_TTL_S)
+  dynamic "ttl" {
+    for_each = each.key == "flights" ? ["expires_at"] : []
+    content {
+      attribute_name = ttl.value
+      enabled        = true
+    }
+  }
 }
 
 output "table_arns" {
@@ -15,4 +43,4 @@ output "table_arns" {
     for table in var.tables :
     table => aws_dynamodb_table.table[table].arn
   }
-}
\ No newline at end of file
+}
@@ -114,4 +114,108 @@ resource "aws_cloudwatch_metric_alarm" "dynamodb_throttling" {
     Component   = "dynamodb"
     Response    = "enable-auto-scaling"
   }
-}
\ No newline at end of file
+}
+
+# Alarmes sobre as métricas EMF (utils/metrics.py) das Lambdas do pipeline
+resource "aws_cloudwatch_metric_alarm" "ingest_no_records" {
+  count               = var.enable_pipeline_alarms ? 1 : 0
+  alarm_name          = "${var.project_name}-ingest-no-records"
+  comparison_operator = "LessThanThreshold"
+  evaluation_periods  = 3
+  metric_name         = "RecordsDecoded"
+  namespace           = var.metrics_namespace
+  period              = 300
+  statistic           = "Sum"
+  threshold           = 1
+  treat_missing_data  = "breaching"  # sem métrica = ingestão parada
+  alarm_description   = "SEM DADOS: a ingestão não decodificou estados da OpenSky em 15 minutos"
+  alarm_actions       = [var.alerts_topic_arn]
+
+  dimensions = {
+    FunctionName = var.ingest_function_name
+  }
+
+  tags = {
+    Severity  = "critical"
+    Component = "lambda-ingest"
+    Response  = "check-opensky-auth"
+  }
+}
+
+resource "aws_cloudwatch_metric_alarm" "ingest_kinesis_failures" {
+  count               = var.enable_pipeline_alarms ? 1 : 0
+  alarm_name          = "${var.project_name}-ingest-kinesis-failures"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = 3
+  datapoints_to_alarm = 2
+  metric_name         = "KinesisRecordsFailed"
+  namespace           = var.metrics_namespace
+  period              = 300
+  statistic           = "Sum"
+  threshold           = 0  # records perdidos após todas as tentativas
+  treat_missing_data  = "notBreaching"
+  alarm_description   = "PERDA: records não entregues ao Kinesis após os retries"
+  alarm_actions       = [var.alerts_topic_arn]
+
+  dimensions = {
+    FunctionName = var.ingest_function_name
+  }
+
+  tags = {
+    Severity  = "high"
+    Component = "kinesis"
+    Response  = "scale-up-shards"
+  }
+}
+
+resource "aws_cloudwatch_metric_alarm" "ingest_download_latency" {
+  count               = var.enable_pipeline_alarms ? 1 : 0
+  alarm_name          = "${var.project_name}-ingest-download-latency"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = 5
+  datapoints_to_alarm = 3
+  metric_name         = "DownloadMs"
+  namespace           = var.metrics_namespace
+  period              = 300
+  extended_statistic  = "p99"
+  threshold           = var.download_p99_threshold_ms
+  treat_missing_data  = "notBreaching"
+  alarm_description   = "LATÊNCIA: download de /states/all da OpenSky acima do limite"
+  alarm_actions       = [var.alerts_topic_arn]
+
+  dimensions = {
+    FunctionName = var.ingest_function_name
+  }
+
+  tags = {
+    Severity  = "medium"
+    Component = "lambda-ingest"
+    Response  = "run-healthcheck"
+  }
+}
+
+resource "aws_cloudwatch_metric_alarm" "enrich_processing_failed" {
+  count               = var.enable_pipeline_alarms ? 1 : 0
+  alarm_name          = "${var.project_name}-enrich-processing-failed"
+  comparison_operator = "GreaterThanThreshold"
+  evaluation_periods  = 3
+  datapoints_to_alarm = 2
+  metric_name         = "RecordsFailed"
+  namespace           = var.metrics_namespace
+  period              = 300
+  statistic           = "Sum"
+  threshold           = 0  # ProcessingFailed vai para o prefixo de erro do Firehose
+  treat_missing_data  = "notBreaching"
+  alarm_description   = "FALHA: records inválidos no enriquecimento (ProcessingFailed)"
+  alarm_actions       = [var.alerts_topic_arn]
+
+  dimensions = {
+    FunctionName = var.enrich_function_name
+  }
+
+  tags = {
+    Severity  = "high"
+    Component = "lambda-enriched"
+    Response  = "check-firehose-error-prefix"
+  }
+}
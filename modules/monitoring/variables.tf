@@ -21,4 +21,34 @@ variable "flights_lambda_function_name" {
 variable "flights_table_name" {
   description = "Nome da tabela DynamoDB de flights."
   type        = string
-}
\ No newline at end of file
+}
+
+variable "metrics_namespace" {
+  description = "Namespace das métricas EMF emitidas pelas Lambdas (METRICS_NAMESPACE)."
+  type        = string
+  default     = "FlightRadar"
+}
+
+variable "enable_pipeline_alarms" {
+  description = "Cria os alarmes sobre as métricas EMF das Lambdas (exige METRICS_ENABLED=true nelas)."
+  type        = bool
+  default     = false
+}
+
+variable "ingest_function_name" {
+  description = "Nome da Lambda de ingestão (flights_raw), dimensão FunctionName das métricas EMF."
+  type        = string
+  default     = ""
+}
+
+variable "enrich_function_name" {
+  description = "Nome da Lambda de enriquecimento (flights_enriched), dimensão FunctionName das métricas EMF."
+  type        = string
+  default     = ""
+}
+
+variable "download_p99_threshold_ms" {
+  description = "Limite do p99 de DownloadMs (download de /states/all) em ms."
+  type        = number
+  default     = 10000
+}